@@ -3,9 +3,13 @@ import pandas as pd
 import geopandas as gpd
 import folium
 from streamlit_folium import folium_static
-from geopy.distance import geodesic
 from tempfile import TemporaryDirectory
 import os
+import datetime
+import fares
+import schedules
+import markers
+import ingest
 
 # Constants
 FARE_PER_KM = 5  # Fare rate per kilometer in Ksh
@@ -50,13 +54,9 @@ if uploaded_files:
     # Create a Folium map centered around the mean coordinates of the facilities
     m = folium.Map(location=[gdf.geometry.y.mean(), gdf.geometry.x.mean()], zoom_start=12)
     
-    # Add markers for each facility
-    for _, row in gdf.iterrows():
-        folium.Marker(
-            location=[row.geometry.y, row.geometry.x],
-            popup=row['facility_name'] if 'facility_name' in row else '',
-            tooltip=row['facility_name'] if 'facility_name' in row else ''
-        ).add_to(m)
+    # Add markers for each facility, clustered automatically for large files
+    names = gdf['facility_name'] if 'facility_name' in gdf else None
+    markers.add_point_layer(m, gdf.geometry.y.to_numpy(), gdf.geometry.x.to_numpy(), popups=names, tooltips=names)
     
     # Display the map
     folium_static(m)
@@ -135,6 +135,13 @@ places = {
     "Ol Kalou": (-0.273, 36.378)
 }
 
+# Function to build the all-pairs distance and fare table once per server process
+@st.cache_resource
+def load_fare_table():
+    return fares.FareTable(places, FARE_PER_KM)
+
+fare_table = load_fare_table()
+
 # Boarding and dropping points selection
 st.sidebar.title("Calculate Fare and Distance")
 boarding_point = st.sidebar.selectbox("Select Boarding Point", list(places.keys()))
@@ -146,9 +153,8 @@ if boarding_point and dropping_point:
         coords_1 = places[boarding_point]
         coords_2 = places[dropping_point]
         
-        # Calculate the distance
-        distance = geodesic(coords_1, coords_2).kilometers
-        fare = distance * FARE_PER_KM
+        # Look up the precomputed distance and fare
+        distance, fare = fare_table.lookup(boarding_point, dropping_point)
         
         # Display the distance and fare
         st.sidebar.write(f"Distance between {boarding_point} and {dropping_point} is {distance:.2f} km")
@@ -171,28 +177,60 @@ if boarding_point and dropping_point:
 else:
     st.sidebar.write("Please enter both boarding and dropping points.")
 
+# Full fare table
+with st.expander("Fare Table (Ksh)"):
+    st.dataframe(fare_table.to_frame().round(0))
+
+# Bulk fare quotes
+st.sidebar.title("Quote Trips in Bulk")
+trips_file = st.sidebar.file_uploader("Choose a CSV file with boarding_point and dropping_point columns", type="csv")
+
+# Function to quote every trip of an uploaded file once per file content
+@st.cache_data
+def quote_trips(file_hash, _file):
+    return fare_table.quote(pd.read_csv(_file))
+
+if trips_file:
+    quotes = quote_trips(ingest.content_hash(trips_file), trips_file)
+    st.write(f"Quoted {quotes['fare'].notna().sum()} of {len(quotes)} trips, total fare Ksh {quotes['fare'].sum():,.2f}")
+    st.write(quotes.head(100))
+    st.download_button("Download quotes as CSV", quotes.to_csv(index=False), file_name="quotes.csv", mime="text/csv")
+
 # Upload bus schedules
 st.sidebar.title("Upload Bus Schedules")
 bus_schedule_file = st.sidebar.file_uploader("Choose a CSV file with bus schedules", type="csv")
 
+# Function to parse and index the bus schedules once per uploaded file content
+@st.cache_resource
+def load_schedule_index(file_hash, _file):
+    return schedules.ScheduleIndex(pd.read_csv(_file), towns=places)
+
 if bus_schedule_file:
-    bus_schedules = pd.read_csv(bus_schedule_file)
-    st.write("Bus Schedules:")
-    st.write(bus_schedules)
+    schedule_index = load_schedule_index(ingest.content_hash(bus_schedule_file), bus_schedule_file)
+    st.write(f"Bus Schedules ({len(schedule_index)} departures):")
+    st.write(schedule_index.frame.head(100))
 
-    # Filter buses based on boarding and dropping points
+    # Look up buses based on boarding and dropping points
     if boarding_point and dropping_point:
-        available_buses = bus_schedules[
-            (bus_schedules['boarding_point'] == boarding_point) &
-            (bus_schedules['dropping_point'] == dropping_point)
-        ]
+        available_buses = schedule_index.buses(boarding_point, dropping_point)
         st.write(f"Available buses from {boarding_point} to {dropping_point}:")
         st.write(available_buses)
+
+        # Next departures after a given time, direct and with one transfer
+        depart_after = st.sidebar.time_input("Depart after", value=datetime.time(6, 0))
+        n_departures = st.sidebar.number_input("Number of departures", min_value=1, max_value=50, value=5)
+        st.write(f"Next {n_departures} buses from {boarding_point} to {dropping_point} after {depart_after:%H:%M}:")
+        st.write(schedule_index.next_departures(boarding_point, dropping_point, depart_after, n_departures))
+        if 'arrival_time' in schedule_index.frame:
+            st.write("Connections with one transfer:")
+            st.write(schedule_index.connections(boarding_point, dropping_point, depart_after, n_departures))
 else:
     st.sidebar.write("Please upload a CSV file containing bus schedules.")
 
 # Example template for bus schedules CSV upload
 st.sidebar.markdown("""
 ### Example Bus Schedules CSV Format
+- bus_id,boarding_point,dropping_point,departure_time,arrival_time
+- departure_time and arrival_time as HH:MM; arrival_time is only needed for transfers
 """)
 
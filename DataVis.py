@@ -1,8 +1,67 @@
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import ingest
+import stats
+import decimate
+import figcache
+
+BAR_PIXELS = 8  # target width of one bar; bar charts aggregate rows into width / BAR_PIXELS bins
+FIGURE_DPI = 200
+
+# Function to open the figure cache shared by all sessions (LRU, capped at figcache.MAX_BYTES)
+@st.cache_resource
+def load_figure_cache():
+    return figcache.FigureCache()
+
+# Function to show a Matplotlib figure as a PNG from the figure cache; draw(ax) only runs on a cache miss
+def show_figure(key, draw, figsize=None):
+    def render():
+        fig, ax = plt.subplots(figsize=figsize)
+        draw(ax)
+        png = io.BytesIO()
+        fig.savefig(png, format="png", bbox_inches="tight", dpi=FIGURE_DPI)
+        plt.close(fig)
+        return png.getvalue()
+    st.image(load_figure_cache().get(key, render))
+
+# Function to profile the numeric columns of the upload in one chunked pass, cached by its content hash
+@st.cache_data
+def load_profile(file_hash, _file):
+    return stats.profile_csv(_file)
+
+# Function to read the first rows of the upload for display
+@st.cache_data
+def load_preview(file_hash, _file):
+    return stats.preview(_file)
+
+# Function to bin a column's histogram for display, cached by file hash and column
+@st.cache_data
+def column_histogram(file_hash, column, _profile):
+    return _profile.histogram(column)
+
+# Function to get a column's box plot statistics, cached by file hash and column
+@st.cache_data
+def column_box(file_hash, column, _profile):
+    return _profile.box(column)
+
+# Function to read a single column for the row-by-row charts, shared (not copied) between reruns
+@st.cache_resource(max_entries=2)
+def load_column(file_hash, column, _file):
+    return stats.read_column(_file, column)
+
+# Function to downsample a column for a line chart, cached per column, width and method
+@st.cache_data
+def line_series(file_hash, column, width, method, _file):
+    return decimate.decimate(load_column(file_hash, column, _file), width, method)
+
+# Function to aggregate a column into bars, cached per column and width
+@st.cache_data
+def bar_series(file_hash, column, width, _file):
+    return decimate.bin_aggregate(load_column(file_hash, column, _file), max(1, width // BAR_PIXELS))
 
 #set the title
 st.title("Interactive data visualization app")
@@ -10,48 +69,73 @@ st.title("Interactive data visualization app")
 uploaded_file = st.file_uploader("Upload your CSV file",type=["csv"])
 if uploaded_file is not None:
     #Read the Uploaded file
-    data = pd.read_csv(uploaded_file)
+    file_hash = ingest.content_hash(uploaded_file)
+    profile = load_profile(file_hash, uploaded_file)
 
     #Display the data
     st.subheader("Raw Data")
-    st.write(data.head())
+    st.write(load_preview(file_hash, uploaded_file))
 
-    #Display Summary statistics
+    #Display Summary statistics (numeric columns; quartiles are approximate for large files)
     st.subheader("Summary Statistics")
-    st.write(data.describe())
+    st.write(profile.describe())
+    if not profile.columns:
+        st.warning("The file has no numeric columns to visualize")
+        st.stop()
 
     #Select column for Visualization
-    column = st.selectbox("Select a column for visualization",data.columns)
+    column = st.selectbox("Select a column for visualization",profile.columns)
     #Select type of plot
     plot_type = st.selectbox("Select the type of plot",["Histogram","Boxplot","Line Chart","Bar Chart"])
+    if plot_type in ("Line Chart", "Bar Chart"):
+        #Long columns are downsampled to the chart width before plotting
+        width = st.slider("Chart width (pixels)", 200, 3000, 800, step=100)
+        backend = st.radio("Render with", ["Matplotlib", "Streamlit chart (faster)"], horizontal=True)
 
     #Plot the selected column based on selected plot type
     st.subheader(f"{plot_type} of {column}")
 
+    #Figures are cached on (file, column, plot type, parameters)
     if plot_type == "Histogram":
-        fig,ax = plt.subplots()
-        ax.hist(data[column], bins=30,edgecolor='k')
-        st.pyplot(fig)
+        def draw_histogram(ax):
+            counts, edges = column_histogram(file_hash, column, profile)
+            ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='k')
+        show_figure((file_hash, column, plot_type, ()), draw_histogram)
     elif plot_type == "Boxplot":
-        fig,ax = plt.subplots()
-        sns.boxplot(data[column],ax=ax)
-        st.pyplot(fig)
+        show_figure((file_hash, column, plot_type, ()),
+                    lambda ax: ax.bxp([column_box(file_hash, column, profile)], showfliers=False))
 
     elif plot_type == "Line Chart":
-        fig,ax=plt.subplots()
-        ax.plot(data[column])
-        st.pyplot(fig)
+        method = st.radio("Downsampling", ["LTTB", "Min-max"], horizontal=True,
+                          help="LTTB keeps the shape of the line; min-max keeps every peak and trough")
+        method = "lttb" if method == "LTTB" else "minmax"
+        x, y = line_series(file_hash, column, width, method, uploaded_file)
+        if backend == "Matplotlib":
+            show_figure((file_hash, column, plot_type, (width, method)), lambda ax: ax.plot(x, y),
+                        figsize=(width / 100, 4.8))
+        else:
+            st.line_chart(pd.DataFrame({column: y}, index=x), width=width)
+        st.caption(f"{len(x):,} of {profile.rows:,} rows plotted")
 
     elif plot_type == "Bar Chart":
-        fig,ax=plt.subplots()
-        ax.bar(data.index,data[column])
-        st.pyplot(fig)
+        starts, size, means, lows, highs = bar_series(file_hash, column, width, uploaded_file)
+        if backend == "Matplotlib":
+            def draw_bars(ax):
+                ax.bar(starts, means, width=size, align='edge')
+                if size > 1:
+                    ax.vlines(starts + size / 2, lows, highs, color='k', linewidth=0.5)
+            show_figure((file_hash, column, plot_type, (width,)), draw_bars, figsize=(width / 100, 4.8))
+        else:
+            st.bar_chart(pd.DataFrame({column: means}, index=starts), width=width)
+        if size > 1:
+            st.caption(f"Each bar is the mean of {size:,} rows" + (" (lines show their min and max)"
+                                                                     if backend == "Matplotlib" else ""))
 
-    #Correlation heatmap
+    #Correlation heatmap (numeric columns, pairwise-complete like DataFrame.corr), only drawn when shown
     st.subheader("Correlation heatmap")
-    fig,ax = plt.subplots()
-    sns.heatmap(data.corr(),annot=True,cmap='coolwarm',ax=ax)
-    st.pyplot(fig)
+    if st.toggle("Show correlation heatmap"):
+        show_figure((file_hash, None, "Correlation heatmap", ()),
+                    lambda ax: sns.heatmap(profile.corr(),annot=True,cmap='coolwarm',ax=ax))
 
 else:
     st.write("Please Upload a CSV file to get started")
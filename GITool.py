@@ -1,34 +1,62 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import geopandas as gpd
 import folium
 from streamlit_folium import folium_static
 import networkx as nx
-import osmnx as ox
 from geopy.distance import geodesic
 from tempfile import TemporaryDirectory
 import os
+import roadnet
+import odmatrix
+import routing
+import service_area
+import markers
+import vrp
+import location_allocation
+import closest_facility
+import facilities
+import ingest
 
 
 # Constants
 FARE_PER_KM = 12  # Fare rate per kilometer in Ksh
+PLACE = 'Nairobi, Kenya'
+MAX_PLOTTED_ROUTES = 100  # OD pairs drawn on the map; the matrix itself has no limit
+MAX_ALLOCATION_LINES = 2000  # demand-to-site (or incident-to-facility) lines drawn on a map
+MAX_NEAREST = 5  # facilities listed by the closest-facility layer
+SERVICE_AREA_BANDS = {
+    'Distance': ('length', 1000, 'km', [1, 3, 5, 10]),
+    'Drive time': ('travel_time', 60, 'min', [5, 10, 15, 30]),
+}
+SERVICE_AREA_COLORS = ['#54278f', '#756bb1', '#9e9ac8', '#cbc9e2', '#f2f0f7']
+VRP_ROUTE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f',
+                    '#bcbd22', '#17becf']
 
 # Title of the Streamlit app
 st.title("GIS Facilities Database")
 
-# Function to add markers to the Folium map
+# Function to add markers for (latitude, longitude) points to the Folium map
 def add_markers_to_map(map_obj, points, color='blue'):
-    for point in points:
-        folium.Marker(
-            location=point[::-1],  # reverse the coordinates for Folium
-            icon=folium.Icon(color=color),
-        ).add_to(map_obj)
-
-# Function to plot route on the map
-def plot_route_on_map(map_obj, route_nodes, route_color='blue'):
-    route_coords = [(G.nodes[node]['y'], G.nodes[node]['x']) for node in route_nodes]
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    markers.add_point_layer(map_obj, points[:, 0], points[:, 1], color=color)
+
+# Function to plot a route (node positions in the road network) on the map
+def plot_route_on_map(map_obj, network, route, route_color='blue'):
+    route_coords = np.column_stack((network.y[route], network.x[route])).tolist()
     folium.PolyLine(locations=route_coords, color=route_color, weight=5).add_to(map_obj)
 
+# Function to parse the facilities CSV, cached by the content hash of the upload
+@st.cache_data
+def load_facilities(file_hash, _file):
+    return ingest.load_csv(_file, ingest.FACILITY_SCHEMA, digest=file_hash, encoding='utf-8', on_bad_lines='skip')
+
+# Function to build the name index of the facilities once per upload, shared by every layer and rerun
+@st.cache_resource
+def load_facility_registry(file_hash, _gdf):
+    return facilities.FacilityRegistry.from_frame(_gdf, key=file_hash)
+
 # Sidebar for uploading the facilities data
 st.sidebar.title("Upload Data")
 uploaded_file = st.sidebar.file_uploader(
@@ -38,7 +66,8 @@ uploaded_file = st.sidebar.file_uploader(
 if uploaded_file is not None:
     try:
         # Explicitly specify encoding and handle errors
-        gdf = pd.read_csv(uploaded_file, encoding='utf-8', error_bad_lines=False)
+        file_hash = ingest.content_hash(uploaded_file)
+        gdf = load_facilities(file_hash, uploaded_file)
         
         # Convert to GeoDataFrame assuming latitude and longitude columns are present
         gdf['geometry'] = gpd.points_from_xy(gdf['longitude'], gdf['latitude'])
@@ -51,17 +80,24 @@ if uploaded_file is not None:
         # Create a Folium map centered around the mean coordinates of the facilities
         m = folium.Map(location=[gdf.geometry.y.mean(), gdf.geometry.x.mean()], zoom_start=10)
 
-        # Add markers for each facility
-        for _, row in gdf.iterrows():
-            folium.Marker(
-                location=[row.geometry.y, row.geometry.x],
-                popup=row['facility_name'] if 'facility_name' in row else '',
-                tooltip=row['facility_name'] if 'facility_name' in row else ''
-            ).add_to(m)
+        # Add markers for each facility with coordinates, clustered automatically for large files
+        located = gdf[gdf['latitude'].notna() & gdf['longitude'].notna()]
+        names = located['facility_name'] if 'facility_name' in located else None
+        markers.add_point_layer(m, located.geometry.y.to_numpy(), located.geometry.x.to_numpy(), popups=names,
+                                tooltips=names)
 
         # Display the map
         folium_static(m)
 
+        # Index the facilities by name for the analysis layers
+        registry = load_facility_registry(file_hash, gdf)
+        if registry.duplicates:
+            st.warning(f"{len(registry.duplicates)} facility names occur more than once; repeats are listed as "
+                       f"'name (2)', 'name (3)', ... in the analysis layers.")
+        if not registry.located.all():
+            st.warning(f"{(~registry.located).sum()} facilities have no valid latitude/longitude and are left out "
+                       f"of the network analyses.")
+
     except UnicodeDecodeError:
         st.error("Error: Failed to decode the CSV file. Please ensure the file is encoded properly.")
     except Exception as e:
@@ -70,205 +106,492 @@ if uploaded_file is not None:
 else:
     st.write("Please upload a CSV file.")
 
-# Function to load road network from OpenStreetMap
-@st.cache
-def load_road_network(place):
-    G = ox.graph_from_place(place, network_type='drive')
-    return G
+# Optional local OSM extract (GraphML, .osm or .pbf) so the network can be built offline
+st.sidebar.title("Road Network")
+road_network_source = st.sidebar.text_input(
+    "Local OSM extract (GraphML, .osm or .pbf)", value=os.environ.get("ROADNET_SOURCE", "")
+).strip() or None
+
+# Function to load the road network, built once and then reloaded from the on-disk cache
+@st.cache_resource
+def load_road_network(place, source=None):
+    return roadnet.load_network(place, source=source, network_type='drive')
+
+# Function to load a routing backend; its preprocessing is stored next to the cached network
+@st.cache_resource
+def load_router(place, source, backend):
+    return routing.get_router(load_road_network(place, source), backend, weight='length')
+
+# Function to snap every facility to its nearest network node in a single vectorized query, once per upload and network
+# (-1 for facilities without valid coordinates)
+def facility_node_ids(registry, network):
+    return registry.node_ids(network.key,
+                             lambda longitudes, latitudes: network.node_ids[network.nearest_nodes(longitudes, latitudes)])
+
+# Function to map every facility to its network node position, -1 for facilities without valid coordinates
+def facility_positions(registry, network):
+    node_ids = facility_node_ids(registry, network)
+    positions = np.full(len(registry), -1, dtype=np.int64)
+    positions[registry.located] = network.positions(node_ids[registry.located])
+    return positions
+
+# Function to compute the service-area bands around one facility node (also cached on disk per graph version)
+@st.cache_data
+def compute_service_areas(place, source, node_id, weight, cutoffs, buffer_m):
+    network = load_road_network(place, source)
+    areas = service_area.service_areas(network, network.positions([node_id])[0], cutoffs, weight, buffer_m=buffer_m)
+    return gpd.GeoDataFrame({'cutoff': [cutoff for cutoff, _ in areas]},
+                            geometry=[polygon for _, polygon in areas], crs='EPSG:4326')
+
+# Function to compute the distance, travel time and fare matrix between snapped facility nodes
+@st.cache_data
+def compute_od_matrix(place, source, origin_nodes, destination_nodes):
+    network = load_road_network(place, source)
+    return odmatrix.od_matrix(network, network.positions(origin_nodes),
+                              network.positions(destination_nodes), FARE_PER_KM)
+
+# Function to compute the road distance matrix between a set of facility nodes, cached per (sorted) node set
+@st.cache_data
+def compute_vrp_matrix(place, source, nodes):
+    network = load_road_network(place, source)
+    positions = network.positions(nodes)
+    return odmatrix.cost_matrix(network, positions, positions, 'length')
+
+# Function to solve the VRP for a depot and stops over the cached matrix of their node set
+@st.cache_data
+def solve_vrp(place, source, depot_node, stop_nodes, demands, vehicles, capacity, time_budget):
+    nodes = tuple(sorted(set((depot_node,) + stop_nodes)))
+    index = np.searchsorted(nodes, (depot_node,) + stop_nodes)
+    distance = compute_vrp_matrix(place, source, nodes)[np.ix_(index, index)]
+    return vrp.solve(distance, depot=0, demands=(0,) + demands, vehicles=vehicles, capacity=capacity,
+                     time_budget=time_budget)
+
+# Function to find the road paths (node positions) of consecutive legs, cached so reruns redraw without routing
+@st.cache_data
+def compute_leg_paths(place, source, legs):
+    network = load_road_network(place, source)
+    router = load_router(place, source, 'alt')
+    return [router.route(*network.positions(leg))[1] for leg in legs]
+
+# Function to build the great-circle nearest-facility index over all facility coordinates, once per upload
+@st.cache_resource
+def load_straight_line_index(registry_key, _registry):
+    return closest_facility.StraightLineIndex(_registry.longitudes, _registry.latitudes)
+
+# Function to label every network node with its nearest facilities, once per upload and network
+@st.cache_resource
+def load_closest_facilities(registry_key, network_key, _registry, _network, k, to_facility):
+    return closest_facility.ClosestFacilities(_network, facility_positions(_registry, _network), k=k,
+                                              to_facility=to_facility)
+
+# Function to compute demand-to-candidate road distances: sparse within a cut-off, else the full matrix.
+# The candidates are the facilities with valid coordinates, in row order
+@st.cache_data
+def compute_allocation_costs(registry_key, network_key, demand_rows, cutoff, _registry, _network):
+    positions = facility_positions(_registry, _network)
+    demand, candidates = positions[demand_rows], positions[_registry.located]
+    if np.isfinite(cutoff):
+        return location_allocation.network_costs(_network, demand, candidates, 'length', cutoff)
+    return odmatrix.cost_matrix(_network, demand, candidates, 'length')
 
 # Route Analysis Layer
 st.sidebar.title("Route Analysis")
-route_analysis = st.sidebar.button("Perform Route Analysis")
+route_analysis = st.sidebar.toggle("Perform Route Analysis")
 
-if route_analysis and 'gdf' in locals():
+if route_analysis and 'registry' in locals():
     st.sidebar.subheader("Select Facilities for Route Analysis")
-    facility_names = gdf['facility_name'].tolist()
+    facility_names = registry.labels
     origin_facility = st.sidebar.selectbox("Select Origin Facility", facility_names)
     destination_facility = st.sidebar.selectbox("Select Destination Facility", facility_names)
+    routing_backend = st.sidebar.selectbox("Routing Backend", list(routing.ROUTERS))
 
     if origin_facility and destination_facility:
         try:
             st.subheader(f"Route from {origin_facility} to {destination_facility}")
 
-            # Load the road network for Nairobi from OpenStreetMap
-            G = load_road_network('Nairobi, Kenya')
+            # Load the road network for Nairobi and the selected routing backend
+            network = load_road_network(PLACE, road_network_source)
+            router = load_router(PLACE, road_network_source, routing_backend)
 
-            # Convert the coordinates to the nearest nodes in the graph
-            orig_node = ox.distance.nearest_nodes(G, gdf.loc[gdf['facility_name'] == origin_facility, 'latitude'].values[0], 
-                                                  gdf.loc[gdf['facility_name'] == origin_facility, 'longitude'].values[0])
-            dest_node = ox.distance.nearest_nodes(G, gdf.loc[gdf['facility_name'] == destination_facility, 'latitude'].values[0], 
-                                                  gdf.loc[gdf['facility_name'] == destination_facility, 'longitude'].values[0])
+            # Look up the precomputed nearest nodes in the graph
+            node_ids = facility_node_ids(registry, network)
+            orig_node = node_ids[registry.located_row(origin_facility)]
+            dest_node = node_ids[registry.located_row(destination_facility)]
 
             # Folium map for route analysis
-            route_map = folium.Map(location=[gdf.loc[gdf['facility_name'] == origin_facility, 'latitude'].values[0], 
-                                             gdf.loc[gdf['facility_name'] == origin_facility, 'longitude'].values[0]], zoom_start=12)
+            route_map = folium.Map(location=registry.location(origin_facility), zoom_start=12)
 
             # Plot route on the map
-            route = nx.shortest_path(G, orig_node, dest_node, weight='length')
-            plot_route_on_map(route_map, route, route_color='blue')
+            distance, route = router.route(*network.positions([orig_node, dest_node]))
+            if not route:
+                raise nx.NetworkXNoPath
+            st.write(f"Route length: {distance / 1000:.2f} km, estimated fare: Ksh {distance / 1000 * FARE_PER_KM:.2f}")
+            plot_route_on_map(route_map, network, route, route_color='blue')
 
             # Display the map with the route
             folium_static(route_map)
 
         except nx.NetworkXNoPath:
             st.error("No route found between the selected facilities.")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # Closest Facility Analysis Layer
 st.sidebar.title("Closest Facility Analysis")
-closest_facility_analysis = st.sidebar.button("Perform Closest Facility Analysis")
+closest_facility_analysis = st.sidebar.toggle("Perform Closest Facility Analysis")
 
-if closest_facility_analysis and 'gdf' in locals():
+if closest_facility_analysis and 'registry' in locals():
     st.sidebar.subheader("Select a Facility for Closest Facility Analysis")
-    facility_names = gdf['facility_name'].tolist()
+    facility_names = registry.labels
     selected_facility = st.sidebar.selectbox("Select a Facility", facility_names)
+    nearest_count = st.sidebar.slider("Facilities to find", 1, MAX_NEAREST, 1)
+    search_mode = st.sidebar.radio("Distance", ["Road network", "Straight line"])
+    travel_direction = st.sidebar.radio("Travel", ["To the facility", "From the facility"])
+    incident_file = st.sidebar.file_uploader("Incidents CSV (latitude, longitude) to assign", type=["csv"])
 
     if selected_facility:
         try:
             st.subheader(f"Closest Facility to {selected_facility}")
-
-            # Create a Folium map
-            closest_facility_map = folium.Map(location=[gdf.loc[gdf['facility_name'] == selected_facility, 'latitude'].values[0], 
-                                                        gdf.loc[gdf['facility_name'] == selected_facility, 'longitude'].values[0]], zoom_start=12)
-
-            # Add markers for all facilities
-            add_markers_to_map(closest_facility_map, gdf[['latitude', 'longitude']].values)
-
-            # Add marker for the closest facility point
-            add_markers_to_map(closest_facility_map, [[gdf.loc[gdf['facility_name'] == selected_facility, 'latitude'].values[0], 
-                                                       gdf.loc[gdf['facility_name'] == selected_facility, 'longitude'].values[0]]], color='red')
+            longitudes, latitudes = registry.longitudes, registry.latitudes
+            index = registry.located_row(selected_facility)
+            to_facility = travel_direction == "To the facility"
+
+            # Nearest other facilities: one more than asked, since the facility finds itself first
+            if search_mode == "Road network":
+                network = load_road_network(PLACE, road_network_source)
+                node_ids = facility_node_ids(registry, network)
+                closest = load_closest_facilities(registry.key, network.key, registry, network, MAX_NEAREST + 1,
+                                                  to_facility)
+                labels, costs = closest.nearest_to_nodes(network.positions([node_ids[index]]))
+            else:
+                costs, labels = load_straight_line_index(registry.key, registry).nearest(
+                    longitudes[index], latitudes[index], MAX_NEAREST + 1)
+            found = [(label, cost) for label, cost in zip(labels[0], costs[0]) if label >= 0 and label != index]
+            nearest = found[:nearest_count]
+            st.write(pd.DataFrame({
+                'facility_name': [facility_names[label] for label, _ in nearest],
+                'distance_km': [round(cost / 1000, 2) for _, cost in nearest],
+            }))
+
+            # Create a Folium map with every facility, the selected one in red and the closest ones in green
+            closest_facility_map = folium.Map(location=[latitudes[index], longitudes[index]], zoom_start=12)
+            add_markers_to_map(closest_facility_map, np.column_stack((latitudes, longitudes)))
+            add_markers_to_map(closest_facility_map, [[latitudes[index], longitudes[index]]], color='red')
+            add_markers_to_map(closest_facility_map, [[latitudes[label], longitudes[label]] for label, _ in nearest],
+                               color='green')
+
+            # Plot the routes to (or from) the closest facilities
+            if search_mode == "Road network":
+                legs = tuple((int(node_ids[index]), int(node_ids[label])) if to_facility
+                             else (int(node_ids[label]), int(node_ids[index])) for label, _ in nearest)
+                for path in compute_leg_paths(PLACE, road_network_source, legs):
+                    plot_route_on_map(closest_facility_map, network, path, route_color='green')
+
+            # Assign every incident to its nearest facility in one vectorized pass
+            if incident_file is not None:
+                incidents = ingest.load_csv(incident_file, {'latitude': 'float64', 'longitude': 'float64'},
+                                            digest=ingest.content_hash(incident_file))
+                if not {'latitude', 'longitude'} <= set(incidents.columns):
+                    raise ValueError("The incidents CSV needs 'latitude' and 'longitude' columns.")
+                if search_mode == "Road network":
+                    closest = load_closest_facilities(registry.key, network.key, registry, network, 1, to_facility)
+                else:
+                    closest = load_straight_line_index(registry.key, registry)
+                assigned, distance = closest.assign(incidents['longitude'], incidents['latitude'])
+                incidents['nearest_facility'] = np.where(assigned >= 0, np.asarray(facility_names, dtype=object)[assigned],
+                                                         None)
+                incidents['distance_km'] = np.round(distance / 1000, 3)
+                st.write(f"{len(incidents):,} incidents assigned:")
+                st.write(incidents['nearest_facility'].value_counts().rename('incidents'))
+                st.download_button("Download assigned incidents as CSV", incidents.to_csv(index=False),
+                                   file_name="incidents_assigned.csv", mime="text/csv")
+                served = np.flatnonzero(assigned >= 0)[:MAX_ALLOCATION_LINES]
+                if len(served):
+                    starts = incidents[['latitude', 'longitude']].to_numpy()[served]
+                    ends = np.column_stack((latitudes, longitudes))[assigned[served]]
+                    folium.PolyLine(locations=np.stack([starts, ends], axis=1).tolist(), color='gray',
+                                    weight=1).add_to(closest_facility_map)
 
             # Display the map with closest facility analysis
             folium_static(closest_facility_map)
 
-        except IndexError:
-            st.error("Facility not found.")
+        except ValueError as e:
+            st.error(f"Error: {e}")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # Service Area Analysis Layer
 st.sidebar.title("Service Area Analysis")
-service_area_analysis = st.sidebar.button("Perform Service Area Analysis")
+service_area_analysis = st.sidebar.toggle("Perform Service Area Analysis")
 
-if service_area_analysis and 'gdf' in locals():
+if service_area_analysis and 'registry' in locals():
     st.sidebar.subheader("Select a Facility for Service Area Analysis")
-    facility_names = gdf['facility_name'].tolist()
+    facility_names = registry.labels
     selected_facility = st.sidebar.selectbox("Select a Facility", facility_names)
+    band_type = st.sidebar.radio("Service Area Bands", list(SERVICE_AREA_BANDS))
+    weight, unit, unit_label, band_options = SERVICE_AREA_BANDS[band_type]
+    bands = st.sidebar.multiselect(f"Cut-offs ({unit_label})", band_options, default=band_options)
+    buffer_m = st.sidebar.slider("Road buffer (m)", 25, 300, service_area.BUFFER_M, step=25)
+    precompute_all = st.sidebar.checkbox("Precompute for all facilities")
 
-    if selected_facility:
+    if selected_facility and bands:
         try:
             st.subheader(f"Service Area around {selected_facility}")
 
+            # Load the road network and the precomputed nearest nodes of the facilities
+            network = load_road_network(PLACE, road_network_source)
+            node_ids = facility_node_ids(registry, network)
+            cutoffs = tuple(sorted(band * unit for band in bands))
+
+            # Bounded network search from the facility, one polygon per cut-off band
+            node_id = node_ids[registry.located_row(selected_facility)]
+            areas = compute_service_areas(PLACE, road_network_source, node_id, weight, cutoffs, buffer_m)
+
             # Create a Folium map
-            service_area_map = folium.Map(location=[gdf.loc[gdf['facility_name'] == selected_facility, 'latitude'].values[0], 
-                                                    gdf.loc[gdf['facility_name'] == selected_facility, 'longitude'].values[0]], zoom_start=12)
+            service_area_map = folium.Map(location=registry.location(selected_facility), zoom_start=12)
+
+            # Draw the bands from the largest to the smallest so the inner ones stay visible
+            for (_, area), color in zip(areas.iterrows(), SERVICE_AREA_COLORS):
+                folium.GeoJson(
+                    area.geometry.__geo_interface__,
+                    style_function=lambda _, color=color: {'fillColor': color, 'color': color, 'weight': 1, 'fillOpacity': 0.35},
+                    tooltip=f"{area['cutoff'] / unit:g} {unit_label}",
+                ).add_to(service_area_map)
+
+            # Precompute every facility's bands in parallel; the results land in the on-disk cache
+            if precompute_all:
+                with st.spinner("Computing service areas for all facilities..."):
+                    all_areas = service_area.batch_service_areas(network, network.positions(np.unique(node_ids)),
+                                                                 cutoffs, weight, buffer_m=buffer_m)
+                coverage = gpd.GeoDataFrame(
+                    [{'node_id': network.node_ids[node], 'cutoff': cutoff, 'geometry': polygon}
+                     for node, node_areas in all_areas.items() for cutoff, polygon in node_areas],
+                    geometry='geometry', crs='EPSG:4326')
+                coverage = pd.DataFrame({'facility_name': registry.labels, 'node_id': node_ids}).merge(coverage, on='node_id')
+                st.download_button("Download all service areas as GeoJSON",
+                                   gpd.GeoDataFrame(coverage, geometry='geometry', crs='EPSG:4326').to_json(),
+                                   file_name="service_areas.geojson", mime="application/geo+json")
 
             # Add marker for the service area center
-            add_markers_to_map(service_area_map, [[gdf.loc[gdf['facility_name'] == selected_facility, 'latitude'].values[0], 
-                                                   gdf.loc[gdf['facility_name'] == selected_facility, 'longitude'].values[0]]], color='purple')
+            add_markers_to_map(service_area_map, [registry.location(selected_facility)], color='purple')
 
             # Display the map with service area analysis
             folium_static(service_area_map)
 
-        except IndexError:
-            st.error("Facility not found.")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # OD Cost Matrix Analysis Layer
 st.sidebar.title("OD Cost Matrix Analysis")
-od_cost_matrix_analysis = st.sidebar.button("Perform OD Cost Matrix Analysis")
+od_cost_matrix_analysis = st.sidebar.toggle("Perform OD Cost Matrix Analysis")
 
-if od_cost_matrix_analysis and 'gdf' in locals():
+if od_cost_matrix_analysis and 'registry' in locals():
     st.sidebar.subheader("Select Origin and Destination Facilities for OD Cost Matrix Analysis")
-    facility_names = gdf['facility_name'].tolist()
-    origin_facility = st.sidebar.selectbox("Select Origin Facility", facility_names)
+    facility_names = registry.labels
+    origin_facilities = st.sidebar.multiselect("Select Origin Facilities", facility_names)
     destination_facilities = st.sidebar.multiselect("Select Destination Facilities", facility_names)
 
-    if origin_facility and destination_facilities:
+    if origin_facilities and destination_facilities:
         try:
-            st.subheader(f"OD Cost Matrix from {origin_facility} to {', '.join(destination_facilities)}")
+            st.subheader(f"OD Cost Matrix from {', '.join(origin_facilities)} to {', '.join(destination_facilities)}")
+
+            # Load the road network and the precomputed nearest nodes of the facilities
+            network = load_road_network(PLACE, road_network_source)
+            node_ids = facility_node_ids(registry, network)
+            origin_nodes = node_ids[registry.located_rows(origin_facilities)]
+            destination_nodes = node_ids[registry.located_rows(destination_facilities)]
+
+            # Compute the whole matrix with one shortest-path search per origin
+            od = compute_od_matrix(PLACE, road_network_source, tuple(origin_nodes), tuple(destination_nodes))
+            st.write(f"Fare (Ksh at {FARE_PER_KM} Ksh/km):")
+            st.write(pd.DataFrame(od.cost, index=origin_facilities, columns=destination_facilities))
+
+            # Export the long-format matrix
+            od_table = od.to_frame(origin_facilities, destination_facilities)
+            st.write(od_table)
+            st.download_button("Download OD matrix as CSV", od_table.to_csv(index=False),
+                               file_name="od_matrix.csv", mime="text/csv")
+            try:
+                st.download_button("Download OD matrix as Parquet", od_table.to_parquet(index=False),
+                                   file_name="od_matrix.parquet", mime="application/octet-stream")
+            except ImportError:
+                pass
 
            #create a folium map
-            od_cost_matrix_map = folium.Map(location=[gdf.loc[gdf['facility_name'] == origin_facility, 'latitude'].values[0], 
-                                                        gdf.loc[gdf['facility_name'] == origin_facility, 'longitude'].values[0]], zoom_start=8)
+            od_cost_matrix_map = folium.Map(location=registry.location(origin_facilities[0]), zoom_start=8)
 
             # Plot markers for origin and destination facilities
-            add_markers_to_map(od_cost_matrix_map, [[gdf.loc[gdf['facility_name'] == origin_facility, 'latitude'].values[0], 
-                                                     gdf.loc[gdf['facility_name'] == origin_facility, 'longitude'].values[0]]], color='green')
-
-            for dest_facility in destination_facilities:
-                add_markers_to_map(od_cost_matrix_map, [[gdf.loc[gdf['facility_name'] == dest_facility, 'latitude'].values[0], 
-                                                         gdf.loc[gdf['facility_name'] == dest_facility, 'longitude'].values[0]]], color='red')
-
-                # Calculate and plot routes from origin to each destination facility
-                orig_coords = (gdf.loc[gdf['facility_name'] == origin_facility, 'latitude'].values[0], 
-                               gdf.loc[gdf['facility_name'] == origin_facility, 'longitude'].values[0])
-                dest_coords = (gdf.loc[gdf['facility_name'] == dest_facility, 'latitude'].values[0], 
-                               gdf.loc[gdf['facility_name'] == dest_facility, 'longitude'].values[0])
-                route = ox.shortest_path(G, orig_coords, dest_coords, weight='length')
-                plot_route_on_map(od_cost_matrix_map, route, route_color='blue')
+            add_markers_to_map(od_cost_matrix_map, registry.locations(origin_facilities), color='green')
+            add_markers_to_map(od_cost_matrix_map, registry.locations(destination_facilities), color='red')
+
+            # Plot routes from each origin to each destination facility, reusing one shortest-path tree per origin
+            if len(od.origins) * len(od.destinations) <= MAX_PLOTTED_ROUTES:
+                for origin in set(od.origins.tolist()):
+                    tree = odmatrix.shortest_path_tree(network, origin)
+                    for destination in od.destinations:
+                        route = odmatrix.tree_path(tree, origin, destination)
+                        if route:
+                            plot_route_on_map(od_cost_matrix_map, network, route, route_color='blue')
+            else:
+                st.info(f"Routes are drawn for up to {MAX_PLOTTED_ROUTES} origin-destination pairs.")
 
             # Display the map with OD Cost Matrix analysis
             folium_static(od_cost_matrix_map)
 
-        except IndexError:
-            st.error("Facility not found.")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # Vehicle Routing Problem (VRP) Analysis Layer
 st.sidebar.title("Vehicle Routing Problem (VRP) Analysis")
-vrp_analysis = st.sidebar.button("Perform VRP Analysis")
+vrp_analysis = st.sidebar.toggle("Perform VRP Analysis")
 
-if vrp_analysis and 'gdf' in locals():
+if vrp_analysis and 'registry' in locals():
     st.sidebar.subheader("Select Facilities for VRP Analysis")
-    facility_names = gdf['facility_name'].tolist()
+    facility_names = registry.labels
     selected_facilities = st.sidebar.multiselect("Select Facilities", facility_names)
-
-    if selected_facilities:
+    depot_facility = st.sidebar.selectbox("Depot", selected_facilities)
+    demand_options = ["Equal (1 per stop)"] + [column for column in gdf.select_dtypes('number').columns
+                                               if column not in ('OBJECTID', 'latitude', 'longitude')]
+    demand_column = st.sidebar.selectbox("Demand per stop", demand_options)
+    vehicles = st.sidebar.number_input("Vehicles", min_value=1, value=15)
+    capacity = st.sidebar.number_input("Vehicle capacity (0 = unlimited)", min_value=0.0, value=20.0)
+    time_budget = st.sidebar.slider("Solver time budget (s)", 1, 60, int(vrp.TIME_BUDGET_S))
+
+    stop_facilities = [facility for facility in selected_facilities if facility != depot_facility]
+    if depot_facility and stop_facilities:
         try:
             st.subheader("Vehicle Routing Problem Analysis")
 
-            # Generate a list of coordinates for selected facilities
-            facility_coords = [(gdf.loc[gdf['facility_name'] == facility, 'latitude'].values[0], 
-                                gdf.loc[gdf['facility_name'] == facility, 'longitude'].values[0]) for facility in selected_facilities]
-
-            # Create a Folium map centered around the mean coordinates of selected facilities
-            vrp_map = folium.Map(location=[sum([coord[0] for coord in facility_coords])/len(facility_coords),
-                                           sum([coord[1] for coord in facility_coords])/len(facility_coords)], zoom_start=8)
-
-            # Add markers for selected facilities
-            add_markers_to_map(vrp_map, facility_coords, color='green')
+            # Load the road network and the precomputed nearest nodes of the facilities
+            network = load_road_network(PLACE, road_network_source)
+            node_ids = facility_node_ids(registry, network)
+            stop_rows = registry.located_rows(stop_facilities)
+            depot_node = node_ids[registry.located_row(depot_facility)]
+            stop_nodes = node_ids[stop_rows].tolist()
+            if demand_column == demand_options[0]:
+                demands = [1.0] * len(stop_facilities)
+            else:
+                demands = gdf[demand_column].fillna(0).to_numpy(dtype=float)[stop_rows].tolist()
+
+            # Solve over the road distance matrix of the selected facilities (computed once per facility set)
+            with st.spinner("Solving the vehicle routing problem..."):
+                solution = solve_vrp(PLACE, road_network_source, int(depot_node), tuple(int(node) for node in stop_nodes),
+                                     tuple(demands), int(vehicles), capacity or None, float(time_budget))
+            names = [depot_facility] + stop_facilities
+            nodes = [depot_node] + stop_nodes
+            if solution.unreachable:
+                st.warning("Not reachable by road from the depot: " + ", ".join(names[i] for i in solution.unreachable))
+            if solution.vehicles > vehicles:
+                st.warning(f"The demand does not fit in {vehicles} vehicles of capacity {capacity:g}: "
+                           f"the routes below need {solution.vehicles}.")
+            st.write(f"{solution.vehicles} vehicles, total distance {solution.cost / 1000:.2f} km, "
+                     f"estimated fare: Ksh {solution.cost / 1000 * FARE_PER_KM:.2f}")
+            st.write(pd.DataFrame({
+                'vehicle': range(1, solution.vehicles + 1),
+                'stops': [' -> '.join(names[i] for i in route) for route in solution.routes],
+                'load': solution.loads,
+                'distance_km': np.round(np.array(solution.distances) / 1000, 2),
+            }))
+
+            # Create a Folium map centered on the depot, with the depot in red and the stops in green
+            depot_location = registry.location(depot_facility)
+            vrp_map = folium.Map(location=depot_location, zoom_start=11)
+            add_markers_to_map(vrp_map, [depot_location], color='red')
+            add_markers_to_map(vrp_map, registry.locations(stop_facilities), color='green')
+
+            # Plot every route leg by leg on the road network, one color per vehicle
+            for vehicle, route in enumerate(solution.routes):
+                tour = [nodes[0]] + [nodes[i] for i in route] + [nodes[0]]
+                legs = tuple((int(a), int(b)) for a, b in zip(tour[:-1], tour[1:]) if a != b)
+                for path in compute_leg_paths(PLACE, road_network_source, legs):
+                    plot_route_on_map(vrp_map, network, path, route_color=VRP_ROUTE_COLORS[vehicle % len(VRP_ROUTE_COLORS)])
 
             # Display the map with VRP analysis
             folium_static(vrp_map)
 
-        except IndexError:
-            st.error("Facility not found.")
+        except ValueError as e:
+            st.error(f"Error: {e}")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # Location-Allocation Analysis Layer
 st.sidebar.title("Location-Allocation Analysis")
-location_allocation_analysis = st.sidebar.button("Perform Location-Allocation Analysis")
+location_allocation_analysis = st.sidebar.toggle("Perform Location-Allocation Analysis")
 
-if location_allocation_analysis and 'gdf' in locals():
+if location_allocation_analysis and 'registry' in locals():
     st.sidebar.subheader("Select Demand Points for Location-Allocation Analysis")
-    facility_names = gdf['facility_name'].tolist()
-    selected_facilities = st.sidebar.multiselect("Select Demand Points", facility_names)
+    facility_names = registry.labels
+    all_demand = st.sidebar.checkbox("Use every facility as a demand point")
+    selected_facilities = facility_names if all_demand else st.sidebar.multiselect("Select Demand Points", facility_names)
+    allocation_problem = st.sidebar.radio("Objective", ["Minimize weighted distance (p-median)",
+                                                        "Maximize coverage (MCLP)"])
+    sites_to_open = st.sidebar.number_input("Sites to open", min_value=1, max_value=len(registry),
+                                            value=min(5, len(registry)))
+    weight_options = ["Equal (1 per point)"] + [column for column in gdf.select_dtypes('number').columns
+                                                if column not in ('OBJECTID', 'latitude', 'longitude')]
+    weight_column = st.sidebar.selectbox("Demand weight", weight_options)
+    if allocation_problem.startswith("Maximize"):
+        cutoff_km = st.sidebar.number_input("Coverage cut-off (km)", min_value=0.1, value=5.0)
+    else:
+        cutoff_km = st.sidebar.number_input("Search radius (km, 0 = unlimited; a radius keeps the matrix sparse)",
+                                            min_value=0.0, value=0.0)
 
     if selected_facilities:
         try:
             st.subheader("Location-Allocation Analysis")
 
-            # Generate a list of coordinates for selected demand points
-            demand_coords = [(gdf.loc[gdf['facility_name'] == facility, 'latitude'].values[0], 
-                              gdf.loc[gdf['facility_name'] == facility, 'longitude'].values[0]) for facility in selected_facilities]
-
-            # Create a Folium map centered around the mean coordinates of selected demand points
-            location_allocation_map = folium.Map(location=[sum([coord[0] for coord in demand_coords])/len(demand_coords),
-                                                           sum([coord[1] for coord in demand_coords])/len(demand_coords)], zoom_start=8)
-
-            # Add markers for selected demand points
-            add_markers_to_map(location_allocation_map, demand_coords, color='blue')
+            # Demand points are the selected facilities; every uploaded facility is a candidate site
+            network = load_road_network(PLACE, road_network_source)
+            demand_rows = np.flatnonzero(registry.located) if all_demand else registry.located_rows(selected_facilities)
+            if weight_column == weight_options[0]:
+                weights = np.ones(len(demand_rows))
+            else:
+                weights = gdf[weight_column].fillna(0).to_numpy(dtype=float)[demand_rows]
+            cutoff = cutoff_km * 1000 if cutoff_km else np.inf
+            with st.spinner("Computing road distances and choosing sites..."):
+                costs = compute_allocation_costs(registry.key, network.key, demand_rows, cutoff, registry, network)
+                if allocation_problem.startswith("Maximize"):
+                    allocation = location_allocation.maximal_coverage(costs, int(sites_to_open), cutoff, weights)
+                    st.write(f"Covered demand within {cutoff_km:g} km: {allocation.objective:,.0f} "
+                             f"of {weights.sum():,.0f} ({allocation.objective / max(weights.sum(), 1e-9):.0%})")
+                else:
+                    allocation = location_allocation.p_median(costs, int(sites_to_open), weights)
+                    st.write(f"Total weighted distance: {allocation.objective / 1000:,.1f} km")
+
+            # Chosen sites with the demand they serve, mapped from candidate columns back to facility rows
+            candidate_rows = np.flatnonzero(registry.located)
+            sites = candidate_rows[allocation.sites]
+            assigned = np.where(allocation.assigned >= 0, candidate_rows[np.maximum(allocation.assigned, 0)], -1)
+            st.write(pd.DataFrame({
+                'facility_name': [registry.labels[site] for site in sites],
+                'demand_points': [(assigned == site).sum() for site in sites],
+                'demand_weight': [weights[assigned == site].sum() for site in sites],
+            }))
+            if (assigned < 0).any():
+                st.info(f"{(assigned < 0).sum()} demand points have no chosen site within reach.")
+
+            # Create a Folium map centered on the demand points, with the chosen sites in red
+            locations = np.column_stack((registry.latitudes, registry.longitudes))
+            demand_locations = locations[demand_rows]
+            location_allocation_map = folium.Map(location=demand_locations.mean(axis=0).tolist(), zoom_start=10)
+            add_markers_to_map(location_allocation_map, demand_locations, color='blue')
+            add_markers_to_map(location_allocation_map, locations[sites], color='red')
+
+            # Draw each demand point's allocation to its site as one multi-line layer
+            served = np.flatnonzero(assigned >= 0)[:MAX_ALLOCATION_LINES]
+            if len(served):
+                starts = demand_locations[served]
+                ends = locations[assigned[served]]
+                folium.PolyLine(locations=np.stack([starts, ends], axis=1).tolist(), color='gray',
+                                weight=1).add_to(location_allocation_map)
 
             # Display the map with Location-Allocation analysis
             folium_static(location_allocation_map)
 
-        except IndexError:
-            st.error("Demand point not found.")
+        except ValueError as e:
+            st.error(f"Error: {e}")
+        except KeyError as e:
+            st.error(f"Error: {e.args[0]}")
 
 # Example template for CSV upload
 st.sidebar.markdown("""
@@ -1,16 +1,25 @@
 import streamlit as st
-import pandas as pd
 import folium
 from streamlit_folium import st_folium
+import markers
+import ingest
+import search
 
-# Function to load the CSV file
-@st.cache
-def load_data(file):
-    data = pd.read_csv(file)
+MAX_SEARCH_RESULTS = 50
+
+# Function to load the CSV file, cached by the content hash of the upload
+@st.cache_data
+def load_data(file_hash, _file):
+    data = ingest.load_csv(_file, ingest.FACILITY_SCHEMA, digest=file_hash)
     # Drop rows with missing latitude or longitude
     data = data.dropna(subset=['latitude', 'longitude'])
     return data
 
+# Function to build the name search index once per loaded dataset
+@st.cache_resource
+def load_name_index(file_hash, _data):
+    return search.NameIndex.from_frame(_data, 'name', 'operator_type')
+
 # Function to create a Folium map with different layers
 def create_map(data):
     # Initialize the map centered around Kenya
@@ -35,12 +44,11 @@ def create_map(data):
         attr='&copy; <a href="https://www.esri.com">Esri</a> &mdash; Source: Esri, i-cubed, USDA, USGS, AEX, GeoEye, Getmapping, Aerogrid, IGN, IGP, UPR-EGP, and the GIS User Community'
     ).add_to(m)
     
-    # Add markers to the map
-    for idx, row in data.iterrows():
-        folium.Marker(
-            location=[row['latitude'], row['longitude']],
-            popup=folium.Popup(f"<b>Name:</b> {row['name']}<br><b>Type:</b> {row['operator_type']}<br><b>Amenity:</b> {row['amenity']}", max_width=300)
-        ).add_to(m)
+    # Add markers to the map, clustered automatically for large files
+    popups = ("<b>Name:</b> " + data['name'].astype(str) + "<br><b>Type:</b> " + data['operator_type'].astype(str)
+              + "<br><b>Amenity:</b> " + data['amenity'].astype(str))
+    markers.add_point_layer(m, data['latitude'].to_numpy(), data['longitude'].to_numpy(), popups=popups,
+                            name='Health Facilities')
     
     # Add layer control
     folium.LayerControl().add_to(m)
@@ -55,8 +63,9 @@ def main():
     uploaded_file = st.file_uploader("Upload CSV file", type="csv")
     
     if uploaded_file is not None:
-        # Load the data
-        data = load_data(uploaded_file)
+        # Load the data; the upload is hashed once per rerun and keys both caches
+        file_hash = ingest.content_hash(uploaded_file)
+        data = load_data(file_hash, uploaded_file)
         
         if data.empty:
             st.error("No valid data to display. Please check your CSV file.")
@@ -71,19 +80,21 @@ def main():
             
             # Query functionality
             st.write("### Query Health Facilities")
+            index = load_name_index(file_hash, data)
+            
+            # Filter by type, using the index's precomputed row positions per type
+            types = ['All'] + sorted(index.groups)
+            selected_type = st.selectbox("Filter by type:", options=types)
+            group = None if selected_type == 'All' else selected_type
             
-            # Search by name
+            # Search by name, within the selected type
             name = st.text_input("Search by name:")
+            fuzzy = st.checkbox("Include close spellings", value=False)
             if name:
-                result = data[data['name'].str.contains(name, case=False, na=False)]
+                result = data.iloc[index.search(name, k=MAX_SEARCH_RESULTS, fuzzy=fuzzy, group=group)]
                 st.write(result)
-            
-            # Filter by type
-            types = data['operator_type'].unique()
-            selected_type = st.selectbox("Filter by type:", options=types)
-            if selected_type:
-                filtered_data = data[data['operator_type'] == selected_type]
-                st.write(filtered_data)
+            elif group is not None:
+                st.write(data.iloc[index.group(group)])
 
 if __name__ == "__main__":
     main()
@@ -4,60 +4,90 @@ Created on Wed Jun  5 08:31:53 2024
 
 @author: Olwith
 """
-import streamlit as st
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point
-import tempfile
-import zipfile
 import os
+import time
+import streamlit as st
+import export
+import ingest
 
-def csv_to_gdf(csv_file):
-    df = pd.read_csv(csv_file)
-    gdf = gpd.GeoDataFrame(df,geometry=gpd.points_from_xy(df.longitude,df.latitude))
-    gdf.crs = "EPSG:4326"
-    return gdf
-def gdf_to_kml(gdf):
-    kml_file = tempfile.NamedTemporaryFile(suffix='.kml',delete=False)
-    gdf.to_file(kml_file.name,driver='KML')
-    return kml_file.name
-def gdf_to_shapefile_zip(gdf):
-    with tempfile.TemporaryDirectory()as tmpdir:
-        shapefile_path = os.path.join(tmpdir,"data.shp")
-        gdf.to_file(shapefile_path,driver="ESRI Shapefile")
-        
-        zip_path = tempfile.NamedTemporaryFile(suffix='.zip',delete=False)
-        with zipfile.Zipfile(zip_path.name,'w') as zf:
-            for filename in os.listdir(tmpdir):
-                zf.write(os.path.join(tmpdir,filename), arcname=filename)
-        return zip_path.name
+MAP_PREVIEW_POINTS = 50000
+POLL_SECONDS = 0.5
+DOWNLOAD_MAX_BYTES = 200 << 20  # larger files would exceed Streamlit's default message size
+EXPORT_LABELS = {
+    "kml": "KML",
+    "shapefile": "Shapefile ZIP",
+    "geojson": "GeoJSON",
+    "gpkg": "GeoPackage",
+    "fgb": "FlatGeobuf",
+}
+
+# Function to load only the coordinates for the map preview, sampled for large files
+def csv_to_points(csv_file, file_hash):
+    points = ingest.load_csv(csv_file, ingest.FACILITY_SCHEMA, digest=file_hash,
+                             usecols=['latitude', 'longitude']).dropna()
+    if len(points) > MAP_PREVIEW_POINTS:
+        points = points.sample(MAP_PREVIEW_POINTS, random_state=0)
+    return points
+# Function to get the export job runner shared by all sessions
+@st.cache_resource
+def get_export_jobs():
+    return export.ExportJobs()
+# Function to show download buttons for finished exports and progress bars for running ones
+def show_exports(jobs, uploaded_file, file_hash, formats):
+    progress_bars = {}
+    for fmt in formats:
+        label = EXPORT_LABELS[fmt]
+        # Touch first: eviction by other sessions' jobs skips recently used artifacts while this one is served
+        jobs.touch(file_hash, fmt)
+        state, fraction, error = jobs.status(file_hash, fmt)
+        if state == "done":
+            _, extension, mime = export.FORMATS[fmt]
+            path = jobs.artifact_path(file_hash, fmt)
+            try:
+                size = os.path.getsize(path)
+                if size > DOWNLOAD_MAX_BYTES:
+                    st.warning(f"The {label} export ({size / 2**20:,.0f} MB) is too large to download through the "
+                               f"browser; it is saved on the server as {path}.")
+                    continue
+                with open(path, "rb") as file:
+                    st.download_button(
+                          label=f"Download {label}",
+                          data = file,
+                          file_name="data" + extension,
+                          mime = mime
+                        )
+            except FileNotFoundError:
+                # Evicted in the meantime: convert it again
+                jobs.submit(uploaded_file, file_hash, [fmt])
+                progress_bars[fmt] = st.progress(0.0, text=f"Exporting {label}...")
+        elif state == "running":
+            progress_bars[fmt] = st.progress(fraction, text=f"Exporting {label}...")
+        elif state == "failed":
+            st.error(f"{label} export failed: {error}")
+    # Poll running jobs; interacting with the page interrupts this loop with a rerun
+    while progress_bars:
+        time.sleep(POLL_SECONDS)
+        for fmt in list(progress_bars):
+            state, fraction, _ = jobs.status(file_hash, fmt)
+            if state != "running":
+                st.rerun()
+            progress_bars[fmt].progress(fraction, text=f"Exporting {EXPORT_LABELS[fmt]}...")
 def main():
     st.title("CSV to Map,KML and Shapefile Converter")
     
     uploaded_file =st.file_uploader("Choose a CSV file",type="csv")
     if uploaded_file is not None:
-        gdf = csv_to_gdf(uploaded_file)
+        file_hash = ingest.content_hash(uploaded_file)
+        points = csv_to_points(uploaded_file, file_hash)
         
-        st.map(gdf)
+        st.map(points)
         
-        if st.button("Export as KML"):
-            kml_path = gdf_to_kml(gdf)
-            with open(kml_path,"rb") as file:
-                btn = st.download_button(
-                      label="Download KML",
-                      data = file,
-                      file_name="data.kml",
-                      mime ="application/vnd.google-earth.kml+xml"
-                    )
-        if st.button("Export as Shapefile ZIP"):
-            shapefile_zip_path = gdf_to_shapefile_zip(gdf)
-            with open(shapefile_zip_path,"rb") as file:
-                btn = st.download_button(
-                      label="Download Shapefile ZIP",
-                      data = file,
-                      file_name="data.zip",
-                      mime ="application/zip"
-                    )
+        jobs = get_export_jobs()
+        formats = st.multiselect("Export formats", options=list(EXPORT_LABELS),
+                                 default=["kml", "shapefile", "geojson"], format_func=EXPORT_LABELS.get)
+        if st.button("Export"):
+            jobs.submit(uploaded_file, file_hash, formats)
+        show_exports(jobs, uploaded_file, file_hash, formats)
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,94 @@
+"""Closest-facility benchmark: one search per incident vs the precomputed nearest-facility labels.
+
+    python benchmarks/bench_closest_facility.py --grid 300 --facilities 500 --incidents 100000
+
+Builds a synthetic grid road network (``--grid`` x ``--grid`` nodes, about
+100 m apart, random edge lengths) with random facility nodes and incident
+points. "per incident" runs a Dijkstra from each incident's node and takes
+the nearest facility (timed on ``--sample`` incidents and extrapolated).
+"labels" runs one multi-source Dijkstra from all facilities and then
+assigns every incident with a single snap query. The straight-line
+BallTree is compared with a brute-force haversine scan.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import closest_facility  # noqa: E402
+import roadnet  # noqa: E402
+
+
+def grid_network(size, rng):
+    n = size * size
+    column, row = np.arange(n) % size, np.arange(n) // size
+    right = np.flatnonzero(column < size - 1)
+    down = np.flatnonzero(row < size - 1)
+    u = np.concatenate([right, right + 1, down, down + size])
+    v = np.concatenate([right + 1, right, down + size, down])
+    length = rng.uniform(80, 150, len(u))
+    return roadnet.RoadNetwork.from_edges(np.arange(n), 36.7 + column * 0.001, -1.3 + row * 0.001, u, v,
+                                          length, length / 10)
+
+
+def haversine_brute(lon, lat, facility_lon, facility_lat):
+    nearest = np.empty(len(lon), dtype=np.int64)
+    phi, facility_phi = np.radians(lat), np.radians(facility_lat)
+    for i in range(len(lon)):
+        a = (np.sin((facility_phi - phi[i]) / 2) ** 2
+             + np.cos(phi[i]) * np.cos(facility_phi) * np.sin(np.radians(facility_lon - lon[i]) / 2) ** 2)
+        nearest[i] = np.argmin(a)
+    return nearest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, default=300)
+    parser.add_argument("--facilities", type=int, default=500)
+    parser.add_argument("--incidents", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    network = grid_network(args.grid, rng)
+    facilities = rng.choice(network.n_nodes, args.facilities, replace=False)
+    lon = rng.uniform(network.x.min(), network.x.max(), args.incidents)
+    lat = rng.uniform(network.y.min(), network.y.max(), args.incidents)
+    print(f"{network.n_nodes:,} nodes, {args.facilities} facilities, {args.incidents:,} incidents")
+    print(f"{'method':<36} {'time':>11}")
+
+    # Road network: cost from the incident to the facility, so search the reversed graph from the facilities
+    nodes = network.nearest_nodes(lon, lat)
+    forward = network.csr("length")
+    t0 = time.perf_counter()
+    sample = [facilities[np.argmin(dijkstra(forward, indices=node)[facilities])] for node in nodes[:args.sample]]
+    per_incident = (time.perf_counter() - t0) / args.sample * args.incidents
+    print(f"{'per incident Dijkstra (before)':<36} {per_incident:>9.1f} s (extrapolated)")
+    t0 = time.perf_counter()
+    closest = closest_facility.ClosestFacilities(network, facilities)
+    assigned, _ = closest.assign(lon, lat)
+    print(f"{'multi-source labels + assign':<36} {time.perf_counter() - t0:>9.2f} s")
+    print(f"  agree on the sample: {np.mean(facilities[assigned[:args.sample]] == np.array(sample)):.0%}")
+    t0 = time.perf_counter()
+    closest_facility.ClosestFacilities(network, facilities, k=3)
+    print(f"{'3 nearest labels':<36} {time.perf_counter() - t0:>9.2f} s")
+
+    # Straight line
+    facility_lon, facility_lat = network.x[facilities], network.y[facilities]
+    t0 = time.perf_counter()
+    brute = haversine_brute(lon, lat, facility_lon, facility_lat)
+    print(f"{'brute-force haversine (before)':<36} {time.perf_counter() - t0:>9.2f} s")
+    t0 = time.perf_counter()
+    nearest, _ = closest_facility.StraightLineIndex(facility_lon, facility_lat).assign(lon, lat)
+    print(f"{'straight-line index':<36} {time.perf_counter() - t0:>9.2f} s")
+    print(f"  agree: {np.mean(nearest == brute):.2%}")
+
+
+if __name__ == "__main__":
+    main()
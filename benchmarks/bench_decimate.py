@@ -0,0 +1,89 @@
+"""Chart downsampling benchmark: plotting every row vs ``decimate`` at the chart width.
+
+    python benchmarks/bench_decimate.py --rows 1000000 10000000
+
+Times drawing a line chart of a random walk with Matplotlib (Agg, saved as
+PNG like ``st.pyplot`` does) from all rows, and from the LTTB and min-max
+subsets for ``--width`` pixels, including the decimation itself. Bar charts
+are timed the same way against ``bin_aggregate``; one bar per row is only
+drawn up to ``--bar-max`` rows.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import decimate  # noqa: E402
+
+BAR_PIXELS = 8
+
+
+def render(draw, width):
+    fig, ax = plt.subplots(figsize=(width / 100, 4.8))
+    draw(ax)
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+def timed(label, rows, run):
+    t0 = time.perf_counter()
+    points = run()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {rows:>12,} {points:>10,} {elapsed:>9.2f} s")
+
+
+def line_all(y, width):
+    render(lambda ax: ax.plot(y), width)
+    return len(y)
+
+
+def line_decimated(y, width, method):
+    x, v = decimate.decimate(y, width, method)
+    render(lambda ax: ax.plot(x, v), width)
+    return len(x)
+
+
+def bar_all(y, width):
+    render(lambda ax: ax.bar(np.arange(len(y)), y), width)
+    return len(y)
+
+
+def bar_binned(y, width):
+    starts, size, means, lows, highs = decimate.bin_aggregate(y, width // BAR_PIXELS)
+
+    def draw(ax):
+        ax.bar(starts, means, width=size, align="edge")
+        ax.vlines(starts + size / 2, lows, highs, color="k", linewidth=0.5)
+    render(draw, width)
+    return len(starts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--bar-max", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'chart':<28} {'rows':>12} {'drawn':>10} {'time':>11}")
+    for rows in args.rows:
+        y = np.cumsum(np.random.default_rng(0).normal(size=rows))
+        timed("line, every row (before)", rows, lambda: line_all(y, args.width))
+        timed("line, LTTB", rows, lambda: line_decimated(y, args.width, "lttb"))
+        timed("line, min-max", rows, lambda: line_decimated(y, args.width, "minmax"))
+        if rows <= args.bar_max:
+            timed("bar, every row (before)", rows, lambda: bar_all(y, args.width))
+        timed("bar, binned", rows, lambda: bar_binned(y, args.width))
+
+
+if __name__ == "__main__":
+    main()
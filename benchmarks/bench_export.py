@@ -0,0 +1,106 @@
+"""Point export benchmark: whole-frame GeoPandas ``to_file`` vs the streaming ``export`` module.
+
+    python benchmarks/bench_export.py --rows 10000000
+
+Writes a synthetic facility CSV to a temporary directory, then runs every
+(method, format) pair in a fresh child process and reports wall time and
+the child's peak RSS. "geopandas" is the old path: read the whole CSV,
+build a GeoDataFrame and write it with ``to_file``. Skip it with
+``--streaming-only`` when the input does not fit in memory.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import export  # noqa: E402
+
+WRITE_CHUNK = 500_000
+
+
+def write_csv(path, rows, rng):
+    for start in range(0, rows, WRITE_CHUNK):
+        n = min(WRITE_CHUNK, rows - start)
+        pd.DataFrame({
+            "name": [f"Facility {i}" for i in range(start, start + n)],
+            "latitude": rng.uniform(-4.7, 4.6, n).round(6),
+            "longitude": rng.uniform(33.9, 41.9, n).round(6),
+            "operator_type": rng.choice(["public", "private", "community", "religious"], n),
+            "amenity": rng.choice(["hospital", "clinic", "pharmacy", "doctors", "dentist"], n),
+        }).to_csv(path, mode="a", header=start == 0, index=False)
+
+
+def run_geopandas(csv_path, fmt, out_dir):
+    import geopandas as gpd
+    import zipfile
+
+    df = pd.read_csv(csv_path)
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.longitude, df.latitude), crs="EPSG:4326")
+    driver, extension, _ = export.FORMATS[fmt]
+    if fmt == "shapefile":
+        gdf.to_file(os.path.join(out_dir, "data.shp"), driver=driver)
+        with zipfile.ZipFile(os.path.join(out_dir, "data.zip"), "w", zipfile.ZIP_DEFLATED) as zf:
+            for filename in os.listdir(out_dir):
+                if not filename.endswith(".zip"):
+                    zf.write(os.path.join(out_dir, filename), arcname=filename)
+    else:
+        gdf.to_file(os.path.join(out_dir, "data" + extension), driver=driver)
+
+
+def run_streaming(csv_path, fmt, out_dir):
+    with open(csv_path, "rb") as f, export.export_csv(f, fmt) as artifact:
+        artifact.seek(0, os.SEEK_END)
+
+
+def peak_rss_mb():
+    # VmHWM is reset by exec; ru_maxrss also counts the parent's peak at fork
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(method, fmt, csv_path):
+    with tempfile.TemporaryDirectory() as out_dir:
+        t0 = time.perf_counter()
+        {"geopandas": run_geopandas, "streaming": run_streaming}[method](csv_path, fmt, out_dir)
+        elapsed = time.perf_counter() - t0
+    print(elapsed, peak_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--streaming-only", action="store_true")
+    parser.add_argument("--child", nargs=3, metavar=("METHOD", "FORMAT", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    methods = ["streaming"] if args.streaming_only else ["geopandas", "streaming"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "facilities.csv")
+        write_csv(csv_path, args.rows, np.random.default_rng(0))
+        print(f"{args.rows:,} rows, {os.path.getsize(csv_path) / 1e6:.0f} MB CSV")
+        print(f"{'format':<10} {'method':<10} {'time':>10} {'peak RSS':>10}")
+        for fmt in export.FORMATS:
+            for method in methods:
+                out = subprocess.run([sys.executable, __file__, "--child", method, fmt, csv_path],
+                                     capture_output=True, text=True, check=True)
+                elapsed, rss = map(float, out.stdout.split()[-2:])
+                print(f"{fmt:<10} {method:<10} {elapsed:>8.1f} s {rss:>7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Facility lookup benchmark: boolean-mask ``gdf.loc`` scans vs the ``FacilityRegistry`` index.
+
+    python benchmarks/bench_facilities.py --facilities 100000 --selected 20
+
+Builds a facilities frame shaped like the GITool upload (with about 1% of
+the names repeated) and times one rerun of an analysis layer that resolves
+``--selected`` facilities. The "before" layer looks up the snapped node and
+each coordinate with its own full-column mask, as the layers did (four
+scans per facility). The registry is built once per upload, and every
+rerun after that is dict lookups and array reads.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import facilities  # noqa: E402
+
+
+def facilities_frame(rows, rng):
+    names = np.array([f"Facility {i}" for i in range(rows)], dtype=object)
+    names[rng.choice(rows, rows // 100, replace=False)] = names[rng.choice(rows, rows // 100)]
+    return pd.DataFrame({
+        "facility_name": names,
+        "latitude": rng.uniform(-1.45, -1.15, rows).astype("float32"),
+        "longitude": rng.uniform(36.65, 37.05, rows).astype("float32"),
+        "node_id": rng.integers(1, 10**9, rows),
+    })
+
+
+def mask_lookups(gdf, selected):
+    node_ids = [gdf.loc[gdf["facility_name"] == name, "node_id"].values[0] for name in selected]
+    center = [gdf.loc[gdf["facility_name"] == selected[0], "latitude"].values[0],
+              gdf.loc[gdf["facility_name"] == selected[0], "longitude"].values[0]]
+    points = [[gdf.loc[gdf["facility_name"] == name, "latitude"].values[0],
+               gdf.loc[gdf["facility_name"] == name, "longitude"].values[0]] for name in selected]
+    return node_ids, center, points
+
+
+def registry_lookups(registry, node_ids, selected):
+    return node_ids[registry.rows(selected)], registry.location(selected[0]), registry.locations(selected)
+
+
+def timed(label, run, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    elapsed = (time.perf_counter() - t0) / repeat
+    print(f"{label:<32} {elapsed * 1000:>10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facilities", type=int, default=100_000)
+    parser.add_argument("--selected", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    gdf = facilities_frame(args.facilities, rng)
+    selected = gdf["facility_name"].drop_duplicates().sample(args.selected, random_state=0).tolist()
+    print(f"{args.facilities:,} facilities, {args.selected} selected per rerun")
+    print(f"{'step':<32} {'time':>13}")
+
+    timed("rerun, gdf.loc masks (before)", lambda: mask_lookups(gdf, selected), args.repeat)
+    t0 = time.perf_counter()
+    registry = facilities.FacilityRegistry.from_frame(gdf)
+    node_ids = registry.node_ids("network", lambda lon, lat: gdf["node_id"].to_numpy())
+    print(f"{'registry build (once per upload)':<32} {(time.perf_counter() - t0) * 1000:>10.2f} ms")
+    timed("rerun, registry", lambda: registry_lookups(registry, node_ids, selected), args.repeat * 100)
+    print(f"{len(registry.duplicates):,} duplicated names get numbered labels")
+
+    before = mask_lookups(gdf, selected)
+    after = registry_lookups(registry, node_ids, selected)
+    assert list(before[0]) == list(after[0]) and np.allclose(before[2], after[2])
+
+
+if __name__ == "__main__":
+    main()
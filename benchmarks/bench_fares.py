@@ -0,0 +1,61 @@
+"""Fare table benchmark: precomputed matrix vs a per-trip geodesic loop.
+
+    python benchmarks/bench_fares.py --trips 100000
+
+Uses 63 random towns inside Kenya's bounding box, the same size as BuApp's
+``places``. The per-trip loop is timed on a sample and extrapolated.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fares  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=63)
+    parser.add_argument("--trips", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    places = {f"Town {i}": (rng.uniform(-4.7, 4.6), rng.uniform(33.9, 41.9)) for i in range(args.places)}
+    names = np.array(list(places))
+    trips = pd.DataFrame({"boarding_point": rng.choice(names, args.trips),
+                          "dropping_point": rng.choice(names, args.trips)})
+
+    for refine in (False, True):
+        t0 = time.perf_counter()
+        table = fares.FareTable(places, fare_per_km=5, refine=refine)
+        print(f"build ({'geodesic' if refine else 'haversine'}): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    t0 = time.perf_counter()
+    for a, b in zip(trips["boarding_point"][:args.sample], trips["dropping_point"][:args.sample]):
+        table.lookup(a, b)
+    lookup = (time.perf_counter() - t0) / args.sample
+    print(f"single pair lookup: {lookup * 1e6:.2f} us")
+
+    t0 = time.perf_counter()
+    quotes = table.quote(trips)
+    bulk = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for a, b in zip(trips["boarding_point"][:args.sample], trips["dropping_point"][:args.sample]):
+        geodesic(places[a], places[b]).kilometers
+    loop = (time.perf_counter() - t0) / args.sample * args.trips
+
+    print(f"bulk quote of {args.trips:,} trips: {bulk * 1000:.1f} ms | "
+          f"geodesic loop ~{loop * 1000:,.0f} ms | speed-up x{loop / bulk:,.0f}")
+    print(f"total fare: Ksh {quotes['fare'].sum():,.0f}")
+
+
+if __name__ == "__main__":
+    main()
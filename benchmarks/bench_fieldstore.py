@@ -0,0 +1,79 @@
+"""Field store benchmark: concurrent submitting sessions and bounding-box queries.
+
+    python benchmarks/bench_fieldstore.py --rows 20000 --writers 1 4 16
+
+Each writer thread stands for one session pressing "Add Data": it appends
+rows one at a time and waits until each is committed. With more writers,
+more rows share each group commit. The bounding-box query over the R*Tree
+is compared with loading every row and filtering it in pandas.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fieldstore  # noqa: E402
+
+BBOX = (36.6, -1.5, 37.0, -1.1)  # around Nairobi
+
+
+def rows(n, rng):
+    lat, lon, quantity = rng.uniform(-4.7, 4.6, n), rng.uniform(33.9, 41.9, n), rng.integers(0, 500, n)
+    return [{"ID": str(i), "name": f"Point {i}", "latitude": float(lat[i]), "longitude": float(lon[i]),
+             "class": "survey", "quantity": int(quantity[i])} for i in range(n)]
+
+
+def write_concurrently(dataset, data, writers):
+    def submit(part):
+        for row in part:
+            dataset.append(row)
+
+    threads = [threading.Thread(target=submit, args=(data[i::writers],)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    data = rows(args.rows, np.random.default_rng(0))
+    with tempfile.TemporaryDirectory() as path:
+        store = fieldstore.FieldStore(os.path.join(path, "field.db"))
+        print(f"{'writers':>8} {'rows':>9} {'time':>10} {'rows/s':>10}")
+        for writers in args.writers:
+            dataset = store.dataset(f"bench_{writers}")
+            t0 = time.perf_counter()
+            write_concurrently(dataset, data, writers)
+            elapsed = time.perf_counter() - t0
+            assert len(dataset) == args.rows
+            print(f"{writers:>8} {args.rows:>9,} {elapsed:>8.2f} s {args.rows / elapsed:>10,.0f}")
+
+        t0 = time.perf_counter()
+        for _ in range(args.queries):
+            found = dataset.query(BBOX)
+        indexed = (time.perf_counter() - t0) / args.queries
+        t0 = time.perf_counter()
+        for _ in range(args.queries):
+            _, everything, _ = store.rows(dataset.name, dataset.version[0])
+            scanned = [row for row in everything if BBOX[0] <= row["longitude"] <= BBOX[2]
+                       and BBOX[1] <= row["latitude"] <= BBOX[3]]
+        scan = (time.perf_counter() - t0) / args.queries
+        assert len(found) == len(scanned)
+        print(f"bbox query: {len(found):,} of {args.rows:,} rows, R*Tree {indexed * 1e3:.2f} ms, "
+              f"full scan {scan * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""CSV ingestion benchmark: default ``pd.read_csv`` vs typed pyarrow parse vs Parquet sidecar reload.
+
+    python benchmarks/bench_ingest.py --rows 500000
+
+Writes a synthetic health-facility CSV (the columns HCF.py expects) to a
+temporary directory and reports parse time and in-memory footprint.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest  # noqa: E402
+
+
+def facilities_csv(rows, rng):
+    frame = pd.DataFrame({
+        "name": [f"Facility {i}" for i in range(rows)],
+        "latitude": rng.uniform(-4.7, 4.6, rows).round(6),
+        "longitude": rng.uniform(33.9, 41.9, rows).round(6),
+        "operator_type": rng.choice(["public", "private", "community", "religious"], rows),
+        "amenity": rng.choice(["hospital", "clinic", "pharmacy", "doctors", "dentist"], rows),
+        "County": rng.choice([f"County {i}" for i in range(47)], rows),
+    })
+    return frame.to_csv(index=False).encode()
+
+
+def measure(label, load):
+    t0 = time.perf_counter()
+    frame = load()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms {frame.memory_usage(deep=True).sum() / 1e6:>9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    payload = facilities_csv(args.rows, np.random.default_rng(0))
+    print(f"{args.rows:,} rows, {len(payload) / 1e6:.1f} MB CSV")
+    print(f"{'':<28} {'time':>12} {'memory':>12}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        measure("pd.read_csv (before)", lambda: pd.read_csv(io.BytesIO(payload)))
+        measure("ingest, first upload", lambda: ingest.load_csv(io.BytesIO(payload), ingest.FACILITY_SCHEMA,
+                                                                cache_dir=cache_dir))
+        measure("ingest, Parquet sidecar", lambda: ingest.load_csv(io.BytesIO(payload), ingest.FACILITY_SCHEMA,
+                                                                   cache_dir=cache_dir))
+
+
+if __name__ == "__main__":
+    main()
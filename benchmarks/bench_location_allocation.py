@@ -0,0 +1,87 @@
+"""Location-allocation benchmark: Teitz-Bart with full objective recomputation vs incremental swap scoring.
+
+    python benchmarks/bench_location_allocation.py --demand 5000 --candidates 200 --sites 10
+
+Random demand points in a 10 km square and candidate sites among them,
+with Euclidean costs. "full" is the textbook interchange: greedy start,
+then every swap is scored by recomputing the whole objective. The engine
+(``location_allocation.p_median``) scores swaps from running totals; it
+runs on the dense matrix and on a sparse one that keeps only the pairs
+within ``--radius`` metres, where pairs beyond the radius count as
+unreached, so its objective is higher. The sparse engine is also run at
+``--large`` demand points.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import location_allocation  # noqa: E402
+
+
+def random_costs(demand, candidates, seed):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 10_000, (demand, 2))
+    sites = points[rng.choice(demand, candidates, replace=False)]
+    return np.linalg.norm(points[:, None] - sites[None], axis=2)
+
+
+def full_recompute(costs, k):
+    objective = lambda sites: costs[:, sites].min(axis=1).sum()  # noqa: E731
+    sites = []
+    for _ in range(k):
+        closed = [j for j in range(costs.shape[1]) if j not in sites]
+        sites.append(min(closed, key=lambda j: objective(sites + [j])))
+    best = objective(sites)
+    improved = True
+    while improved:
+        improved = False
+        for j in range(costs.shape[1]):
+            if j in sites:
+                continue
+            value, slot = min((objective(sites[:slot] + [j] + sites[slot + 1:]), slot) for slot in range(k))
+            if value < best - 1e-9 * best:
+                sites[slot], best, improved = j, value, True
+    return best
+
+
+def timed(label, rows, run):
+    t0 = time.perf_counter()
+    objective = run()
+    print(f"{label:<30} {rows:>9,} {objective / 1000:>16,.1f} km {time.perf_counter() - t0:>9.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--demand", type=int, default=5_000)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--sites", type=int, default=10)
+    parser.add_argument("--radius", type=float, default=3_000)
+    parser.add_argument("--large", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    costs = random_costs(args.demand, args.candidates, args.seed)
+    # Unreached pairs count at twice the largest cost in both runs, so the objectives compare
+    unreached = 2 * costs.max()
+    within = lambda c: sparse.csr_matrix(np.where(c <= args.radius, c, 0))  # noqa: E731
+    print(f"{args.candidates} candidates, {args.sites} sites")
+    print(f"{'method':<30} {'demand':>9} {'objective':>19} {'time':>11}")
+    timed("full recomputation (before)", args.demand, lambda: full_recompute(costs, args.sites))
+    timed("incremental, dense", args.demand,
+          lambda: location_allocation.p_median(costs, args.sites, unreached=unreached).objective)
+    timed("incremental, sparse", args.demand,
+          lambda: location_allocation.p_median(within(costs), args.sites, unreached=unreached).objective)
+    if args.large:
+        large = within(random_costs(args.large, args.candidates, args.seed))
+        timed("incremental, sparse", args.large,
+              lambda: location_allocation.p_median(large, args.sites, unreached=unreached).objective)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Map rendering benchmark: HTML payload size and build time per point layer mode.
+
+    python benchmarks/bench_markers.py --legacy-max 10000
+
+"legacy" is the old one-``folium.Marker``-per-``iterrows()``-row loop. It is
+skipped above ``--legacy-max`` points because it takes minutes there.
+"""
+import argparse
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markers  # noqa: E402
+
+
+def legacy(m, data):
+    for _, row in data.iterrows():
+        folium.Marker(
+            location=[row['latitude'], row['longitude']],
+            popup=folium.Popup(f"<b>Name:</b> {row['name']}", max_width=300)
+        ).add_to(m)
+
+
+def layer(mode):
+    def build(m, data):
+        markers.add_point_layer(m, data['latitude'].to_numpy(), data['longitude'].to_numpy(),
+                                popups="<b>Name:</b> " + data['name'], mode=mode)
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    builders = {"legacy": legacy, "auto": layer("auto"), "cluster": layer("cluster"), "canvas": layer("canvas")}
+    print(f"{'points':>8} {'mode':>8} {'build + render':>15} {'HTML size':>12}")
+    for n in (1_000, 10_000, 100_000):
+        data = pd.DataFrame({"latitude": rng.uniform(-4.7, 4.6, n), "longitude": rng.uniform(33.9, 41.9, n),
+                             "name": [f"Facility {i}" for i in range(n)]})
+        for mode, build in builders.items():
+            if mode == "legacy" and n > args.legacy_max:
+                continue
+            t0 = time.perf_counter()
+            m = folium.Map(location=[0.0, 37.9], zoom_start=6)
+            build(m, data)
+            html = m.get_root().render()
+            print(f"{n:>8,} {mode:>8} {time.perf_counter() - t0:>13.2f} s {len(html) / 1e6:>9.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""OD cost-matrix benchmark: CSR Dijkstra engine vs a per-pair NetworkX loop.
+
+    python benchmarks/bench_odmatrix.py --size 500                 # synthetic grid network
+    python benchmarks/bench_odmatrix.py --place "Nairobi, Kenya" --source nairobi.osm.pbf
+
+The per-pair loop is timed on a handful of pairs and extrapolated.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import odmatrix  # noqa: E402
+import roadnet  # noqa: E402
+
+
+def grid_network(n, rng):
+    """Jittered n x n street grid with two-way edges and mixed speeds."""
+    ii, jj = np.divmod(np.arange(n * n), n)
+    x = 36.7 + jj * 0.002 + rng.normal(0, 2e-4, n * n)
+    y = -1.35 + ii * 0.002 + rng.normal(0, 2e-4, n * n)
+    right = np.flatnonzero(jj + 1 < n)
+    up = np.flatnonzero(ii + 1 < n)
+    u = np.concatenate([right, right + 1, up, up + n])
+    v = np.concatenate([right + 1, right, up + n, up])
+    length = np.hypot((x[u] - x[v]) * 111320, (y[u] - y[v]) * 110540)
+    travel_time = length / (rng.choice([30, 50, 80], len(u)) / 3.6)
+    return roadnet.RoadNetwork.from_edges(np.arange(n * n, dtype=np.int64), x, y, u, v, length, travel_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--source", default=None)
+    parser.add_argument("--grid", type=int, default=180, help="synthetic grid side (nodes = grid^2)")
+    parser.add_argument("--size", type=int, default=500, help="number of origins and destinations")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sample", type=int, default=20, help="pairs timed in the per-pair loop")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    network = roadnet.load_network(args.place, args.source) if args.place else grid_network(args.grid, rng)
+    origins = rng.integers(0, network.n_nodes, args.size)
+    destinations = rng.integers(0, network.n_nodes, args.size)
+    print(f"nodes={network.n_nodes} edges={network.n_edges} matrix={args.size}x{args.size}")
+
+    t0 = time.perf_counter()
+    od = odmatrix.od_matrix(network, origins, destinations, fare_per_km=12, workers=args.workers)
+    engine = time.perf_counter() - t0
+    print(f"engine (distance + time): {engine:.2f} s, reachable pairs {np.isfinite(od.distance).mean():.1%}")
+
+    import networkx as nx
+
+    G = network.graph
+    ids = network.node_ids
+    t0 = time.perf_counter()
+    for i in range(args.sample):
+        try:
+            nx.shortest_path(G, int(ids[origins[i]]), int(ids[destinations[i]]), weight="length")
+        except nx.NetworkXNoPath:
+            pass
+    per_pair = (time.perf_counter() - t0) / args.sample
+    loop = per_pair * args.size * args.size
+    print(f"per-pair nx.shortest_path loop (distance only): ~{loop:,.0f} s ({per_pair * 1000:.1f} ms/pair)")
+    print(f"speed-up x{loop / engine:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
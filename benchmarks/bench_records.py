@@ -0,0 +1,70 @@
+"""Record append benchmark: ``pd.concat`` per submitted row vs ``records.RecordBuffer``.
+
+    python benchmarks/bench_records.py --rows 100000
+
+"concat" is the old odk/students submit path. Its cost grows with the
+number of rows already collected, so it only runs up to ``--concat-max``
+rows. The buffer is timed appending every row, then materializing the
+DataFrame once.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import records  # noqa: E402
+
+COLUMNS = ["ID", "name", "latitude", "longitude", "class", "quantity"]
+
+
+def rows(n, rng):
+    lat, lon, quantity = rng.uniform(-4.7, 4.6, n), rng.uniform(33.9, 41.9, n), rng.integers(0, 500, n)
+    for i in range(n):
+        yield {"ID": str(i), "name": f"Point {i}", "latitude": float(lat[i]), "longitude": float(lon[i]),
+               "class": "survey", "quantity": int(quantity[i])}
+
+
+def timed(label, n, run):
+    t0 = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<34} {n:>9,} {elapsed:>9.2f} s {elapsed / n * 1e6:>9.1f} us/row")
+    return result
+
+
+def concat(data):
+    frame = pd.DataFrame(columns=COLUMNS)
+    for row in data:
+        frame = pd.concat([frame, pd.DataFrame([row])], ignore_index=True)
+    return frame
+
+
+def append_all(buffer, data):
+    for row in data:
+        buffer.append(row)
+    return buffer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--concat-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    data = list(rows(args.rows, np.random.default_rng(0)))
+    print(f"{'':<34} {'rows':>9} {'time':>11} {'per row':>15}")
+    n = min(args.rows, args.concat_max)
+    timed("pd.concat per row (before)", n, lambda: concat(data[:n]))
+
+    buffer = timed("RecordBuffer, in memory", args.rows, lambda: append_all(records.RecordBuffer(COLUMNS), data))
+    frame = timed("  materialize DataFrame", args.rows, buffer.frame)
+    assert len(frame) == args.rows and list(frame.columns) == COLUMNS
+
+
+if __name__ == "__main__":
+    main()
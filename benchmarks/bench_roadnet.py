@@ -0,0 +1,55 @@
+"""Cold-start vs warm-start benchmark for the road network store.
+
+    python benchmarks/bench_roadnet.py --place "Nairobi, Kenya" --source nairobi.osm.pbf
+
+Cold start builds the network from the source (or downloads it when no
+source is given) into an empty cache directory. Warm starts reload the
+memory-mapped arrays in a fresh interpreter, which is what a new Streamlit
+process pays.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import roadnet  # noqa: E402
+
+WARM = """
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import roadnet
+network = roadnet.load_network({place!r}, {source!r}, cache_dir={cache_dir!r})
+network.csr('length')
+print(time.perf_counter() - t0)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--place", default="Nairobi, Kenya")
+    parser.add_argument("--source", default=None, help="GraphML, .osm or .pbf extract (default: download)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        network = roadnet.load_network(args.place, args.source, cache_dir=cache_dir)
+        cold = time.perf_counter() - t0
+        print(f"nodes={network.n_nodes} edges={network.n_edges}")
+        print(f"cold start: {cold:.2f} s")
+
+        code = WARM.format(root=root, place=args.place, source=args.source, cache_dir=cache_dir)
+        warm = [float(subprocess.check_output([sys.executable, "-c", code]).decode().strip())
+                for _ in range(args.repeat)]
+        print(f"warm start (new process, incl. import): best {min(warm) * 1000:.1f} ms, "
+              f"mean {sum(warm) / len(warm) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Routing backend benchmark and correctness check: ALT vs reference Dijkstra.
+
+    python benchmarks/bench_routing.py --queries 200
+    python benchmarks/bench_routing.py --place "Nairobi, Kenya" --source nairobi.osm.pbf
+
+Every ALT answer is compared with the reference; the script exits non-zero on
+any cost mismatch.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import roadnet  # noqa: E402
+import routing  # noqa: E402
+from bench_odmatrix import grid_network  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--source", default=None)
+    parser.add_argument("--grid", type=int, default=180, help="synthetic grid side (nodes = grid^2)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--weight", default="length", choices=["length", "travel_time"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    network = roadnet.load_network(args.place, args.source) if args.place else grid_network(args.grid, rng)
+    print(f"nodes={network.n_nodes} edges={network.n_edges}")
+
+    t0 = time.perf_counter()
+    alt = routing.get_router(network, "alt", args.weight)
+    print(f"ALT preprocessing: {time.perf_counter() - t0:.2f} s")
+    reference = routing.get_router(network, "dijkstra", args.weight)
+    reference.route(0, 0)  # build the NetworkX view outside the timed loop
+
+    pairs = rng.integers(0, network.n_nodes, (args.queries, 2))
+    timings = {"alt": 0.0, "dijkstra": 0.0}
+    mismatches = 0
+    for origin, destination in pairs:
+        t0 = time.perf_counter()
+        cost, _ = alt.route(origin, destination)
+        timings["alt"] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        expected, _ = reference.route(origin, destination)
+        timings["dijkstra"] += time.perf_counter() - t0
+        mismatches += cost != expected
+
+    for name, total in timings.items():
+        print(f"{name:>8}: {total / args.queries * 1000:.2f} ms/query")
+    print(f"cost mismatches: {mismatches}/{args.queries}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
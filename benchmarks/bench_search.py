@@ -0,0 +1,58 @@
+"""Facility name search benchmark: ``str.contains`` scan vs the trigram ``search.NameIndex``.
+
+    python benchmarks/bench_search.py --rows 500000
+
+Times one index build, then each query as a full scan and as a top-k index
+lookup (plain, fuzzy and restricted to one ``operator_type``).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search  # noqa: E402
+
+WORDS = ["St.", "Mary's", "Mission", "Health", "Centre", "Dispensary", "Hospital", "Clinic", "Medical",
+         "Nursing", "Home", "Maternity", "Community", "Nairobi", "Kisumu", "Mombasa", "Nakuru", "Eldoret"]
+QUERIES = ["mission home 4711", "kisumu", "dispensary", "71", "hospitl nakuru"]
+
+
+def timed(run, repeat=5):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return (time.perf_counter() - t0) / repeat * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("-k", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = rng.choice(WORDS, (args.rows, 3))
+    data = pd.DataFrame({
+        "name": [" ".join(row) + f" {i}" for i, row in enumerate(words.tolist())],
+        "operator_type": pd.Categorical(rng.choice(["public", "private", "community", "religious"], args.rows)),
+    })
+
+    t0 = time.perf_counter()
+    index = search.NameIndex.from_frame(data, "name", "operator_type")
+    print(f"{args.rows:,} names, index built in {time.perf_counter() - t0:.2f} s")
+    print(f"{'query':<20} {'str.contains':>14} {'index top-k':>14} {'fuzzy':>10} {'by type':>10}")
+    for query in QUERIES:
+        scan, _ = timed(lambda: data[data["name"].str.contains(query, case=False, na=False)], repeat=1)
+        top, _ = timed(lambda: index.search(query, k=args.k))
+        fuzzy, _ = timed(lambda: index.search(query, k=args.k, fuzzy=True))
+        grouped, _ = timed(lambda: index.search(query, k=args.k, group="public"))
+        print(f"{query:<20} {scan:>11.1f} ms {top:>11.2f} ms {fuzzy:>7.2f} ms {grouped:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
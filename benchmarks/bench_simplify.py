@@ -0,0 +1,84 @@
+"""Polygon rendering benchmark: raw ``folium.GeoJson(gdf)`` vs zoom-level simplification vs vector tiles.
+
+    python benchmarks/bench_simplify.py --cells 2000
+
+Builds a synthetic ward-like coverage (Voronoi cells over Kenya with
+wiggly, densified shared edges), then reports HTML payload and build +
+render time of the raw GeoJson map, the same for each precomputed
+``simplify.SimplifiedLayer`` level (clipped to a map view from
+``CLIP_ZOOM``), and the time and size of an MVT tile set.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import folium
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simplify  # noqa: E402
+import vectortiles  # noqa: E402
+
+KENYA = (33.9, -4.7, 41.9, 4.6)
+
+
+def coverage(cells, spacing, rng):
+    extent = shapely.box(*KENYA)
+    seeds = shapely.multipoints(np.column_stack((rng.uniform(KENYA[0], KENYA[2], cells),
+                                                 rng.uniform(KENYA[1], KENYA[3], cells))))
+    polygons = shapely.intersection(shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=extent)), extent)
+    # Densify, snap so neighbours share identical vertices, then bend every edge the same way on both sides
+    polygons = shapely.set_precision(shapely.segmentize(polygons, spacing), 1e-7)
+    polygons = shapely.transform(polygons, lambda c: c + 0.2 * spacing * np.sin(c[:, ::-1] * 300))
+    return gpd.GeoDataFrame({"ward": [f"Ward {i}" for i in range(len(polygons))]}, geometry=polygons, crs=4326)
+
+
+def render(gdf_or_json):
+    t0 = time.perf_counter()
+    m = folium.Map(location=[0.0, 37.9], zoom_start=6)
+    folium.GeoJson(gdf_or_json).add_to(m)
+    html = m.get_root().render()
+    return time.perf_counter() - t0, len(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=2000)
+    parser.add_argument("--spacing", type=float, default=0.001, help="vertex spacing along edges, degrees")
+    parser.add_argument("--tile-max-zoom", type=int, default=10)
+    args = parser.parse_args()
+
+    gdf = coverage(args.cells, args.spacing, np.random.default_rng(0))
+    print(f"{len(gdf):,} polygons, {shapely.get_num_coordinates(gdf.geometry.values).sum():,} vertices, "
+          f"valid coverage: {shapely.coverage_is_valid(gdf.geometry.values)}")
+
+    elapsed, size = render(gdf)
+    print(f"{'raw GeoJson':<22} {elapsed:>8.2f} s {size / 1e6:>9.2f} MB")
+
+    t0 = time.perf_counter()
+    layer = simplify.SimplifiedLayer(gdf)
+    print(f"{'precompute levels':<22} {time.perf_counter() - t0:>8.2f} s")
+    for zoom in layer.zooms:
+        # A 700 x 500 px map centred on Nairobi; deep levels only send the padded view
+        half_x, half_y = 350 * simplify.degrees_per_pixel(zoom), 250 * simplify.degrees_per_pixel(zoom)
+        _, clip = layer.view(zoom, (36.82 - half_x, -1.29 - half_y, 36.82 + half_x, -1.29 + half_y))
+        elapsed, size = render(layer.geojson(zoom, clip))
+        label = f"level z{zoom}" + (" (clipped)" if clip else "")
+        print(f"{label:<22} {elapsed:>8.2f} s {size / 1e6:>9.2f} MB")
+
+    with tempfile.TemporaryDirectory() as tile_dir:
+        t0 = time.perf_counter()
+        path = vectortiles.build_tiles(gdf, "bench", tile_dir=tile_dir, max_zoom=args.tile_max_zoom)
+        elapsed = time.perf_counter() - t0
+        sizes = [os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names]
+        print(f"{f'MVT z0-{args.tile_max_zoom}':<22} {elapsed:>8.2f} s {sum(sizes) / 1e6:>9.2f} MB "
+              f"in {len(sizes):,} tiles (largest {max(sizes) / 1e3:.0f} kB)")
+
+
+if __name__ == "__main__":
+    main()
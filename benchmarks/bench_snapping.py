@@ -0,0 +1,66 @@
+"""Facility-to-node snapping benchmark: one vectorized KD-tree query vs a per-facility loop.
+
+    python benchmarks/bench_snapping.py                       # synthetic 30k-node network
+    python benchmarks/bench_snapping.py --place "Nairobi, Kenya" --source nairobi.osm.pbf
+
+The per-facility loop is timed on a sample and extrapolated, since running it
+over a million facilities would take minutes.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import roadnet  # noqa: E402
+
+
+def synthetic_network(n_nodes, rng):
+    x = rng.uniform(36.65, 37.10, n_nodes)
+    y = rng.uniform(-1.45, -1.15, n_nodes)
+    empty = np.array([], dtype=np.int64)
+    return roadnet.RoadNetwork.from_edges(np.arange(n_nodes, dtype=np.int64), x, y,
+                                          empty, empty, empty.astype(float), empty.astype(float))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--source", default=None)
+    parser.add_argument("--nodes", type=int, default=30000, help="synthetic network size")
+    parser.add_argument("--sample", type=int, default=2000, help="facilities timed in the per-facility loop")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.place:
+        network = roadnet.load_network(args.place, args.source)
+    else:
+        network = synthetic_network(args.nodes, rng)
+
+    t0 = time.perf_counter()
+    network.snap_index
+    print(f"nodes={network.n_nodes} index build: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    for n in (10_000, 100_000, 1_000_000):
+        lon = rng.uniform(network.x.min(), network.x.max(), n)
+        lat = rng.uniform(network.y.min(), network.y.max(), n)
+
+        t0 = time.perf_counter()
+        network.nearest_nodes(lon, lat)
+        batch = time.perf_counter() - t0
+
+        k = min(n, args.sample)
+        t0 = time.perf_counter()
+        for i in range(k):
+            network.nearest_nodes(lon[i:i + 1], lat[i:i + 1])
+        loop = (time.perf_counter() - t0) / k * n
+
+        print(f"{n:>9,} facilities: vectorized {batch * 1000:9.1f} ms | "
+              f"per-facility loop ~{loop * 1000:11.1f} ms | speed-up x{loop / batch:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
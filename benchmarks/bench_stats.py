@@ -0,0 +1,110 @@
+"""CSV profiling benchmark: pandas ``describe()``/``corr()`` vs ``stats.profile_csv``.
+
+    python benchmarks/bench_stats.py --rows 5000000
+
+Writes a synthetic CSV (numeric columns with missing values plus a text
+column) to a temporary directory. Each method runs in a fresh child
+process, which reports wall time and peak RSS. "pandas" is the old DataVis
+path: read the whole file, then ``describe()`` and ``corr()``. The streaming
+profile also reports how far its approximate quartiles are from the exact
+ones, in rank (fraction of rows).
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import stats  # noqa: E402
+
+WRITE_CHUNK = 500_000
+COLUMNS = 8
+
+
+def write_csv(path, rows, rng):
+    for start in range(0, rows, WRITE_CHUNK):
+        n = min(WRITE_CHUNK, rows - start)
+        frame = pd.DataFrame({f"x{i}": rng.normal(i, 1 + i, n).round(4) for i in range(COLUMNS)})
+        frame["x1"] = (frame["x0"] * 3 + rng.normal(0, 1, n)).round(4)
+        frame["x2"] = rng.exponential(2.0, n).round(4)
+        frame.loc[rng.random(n) < 0.05, "x3"] = np.nan
+        frame["label"] = rng.choice(["north", "south", "east", "west"], n)
+        frame.to_csv(path, mode="a", header=start == 0, index=False)
+
+
+def run_pandas(csv_path):
+    data = pd.read_csv(csv_path)
+    return data.describe(), data.corr(numeric_only=True)
+
+
+def run_streaming(csv_path):
+    profile = stats.profile_csv(csv_path)
+    return profile.describe(), profile.corr()
+
+
+def peak_rss_mb():
+    # VmHWM is reset by exec; ru_maxrss also counts the parent's peak at fork
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(method, csv_path, out_path):
+    t0 = time.perf_counter()
+    described, corr = {"pandas": run_pandas, "streaming": run_streaming}[method](csv_path)
+    elapsed = time.perf_counter() - t0
+    pd.concat([described, corr]).to_pickle(out_path)
+    print(elapsed, peak_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--streaming-only", action="store_true")
+    parser.add_argument("--child", nargs=3, metavar=("METHOD", "CSV", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    methods = ["streaming"] if args.streaming_only else ["pandas", "streaming"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "data.csv")
+        write_csv(csv_path, args.rows, np.random.default_rng(0))
+        print(f"{args.rows:,} rows, {os.path.getsize(csv_path) / 1e6:.0f} MB CSV")
+        print(f"{'method':<10} {'time':>10} {'peak RSS':>10}")
+        results = {}
+        for method in methods:
+            out_path = os.path.join(tmpdir, method + ".pkl")
+            out = subprocess.run([sys.executable, __file__, "--child", method, csv_path, out_path],
+                                 capture_output=True, text=True, check=True)
+            elapsed, rss = map(float, out.stdout.split()[-2:])
+            results[method] = pd.read_pickle(out_path)
+            print(f"{method:<10} {elapsed:>8.1f} s {rss:>7.0f} MB")
+
+        if len(results) == 2:
+            exact, approx = results["pandas"], results["streaming"]
+            moments = ["count", "mean", "std", "min", "max"]
+            print(f"largest relative difference of count/mean/std/min/max: "
+                  f"{((approx.loc[moments] - exact.loc[moments]).abs() / exact.loc[moments].abs()).max().max():.2e}")
+            data = pd.read_csv(csv_path, usecols=list(approx.columns))
+            errors = [abs((data[column].dropna() < approx.loc[q, column]).mean() - float(q[:-1]) / 100)
+                      for q in ["25%", "50%", "75%"] for column in approx.columns]
+            print(f"largest quartile rank error: {max(errors):.4f}")
+            corr = list(approx.columns)
+            print(f"largest correlation difference: "
+                  f"{(approx.loc[corr, corr] - exact.loc[corr, corr]).abs().max().max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
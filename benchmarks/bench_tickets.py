@@ -0,0 +1,85 @@
+"""Support-ticket benchmark: the session DataFrame vs ``tickets.TicketStore``.
+
+    python benchmarks/bench_tickets.py --tickets 10000 100000 1000000
+
+Times the two things the Support Ticket Workflow app does most often.
+Submitting a ticket was ``pd.concat`` plus a full ``sort_values`` by
+Status/ID; in the store it is a blocked sorted-key insert with counter updates. A
+dashboard rerun counted the open tickets with a boolean mask and had
+Altair parse the string dates to aggregate tickets per month and status
+(emulated here in pandas); the store reads its counters instead. Loading
+the store is a one-off cost per session.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tickets  # noqa: E402
+
+SUBMISSIONS = 20
+
+
+def random_tickets(n, rng):
+    dates = pd.date_range("2021-01-01", "2023-12-20")
+    return pd.DataFrame({
+        "ID": [f"TICKET-{i}" for i in range(1000, 1000 + n)],
+        "Issue": "Printer not responding to print commands",
+        "Status": rng.choice(tickets.STATUSES, n),
+        "Priority": rng.choice(tickets.PRIORITIES, n),
+        "Date Submitted": dates[rng.integers(len(dates), size=n)].strftime("%m-%d-%Y"),
+    }).sort_values(by=["Status", "ID"], ascending=[False, False])
+
+
+def frame_submit(df, number):
+    row = pd.DataFrame([{"ID": f"TICKET-{number}", "Issue": "VPN connection problems", "Status": "Open",
+                         "Priority": "High", "Date Submitted": "12-20-2023"}])
+    return pd.concat([df, row], axis=0).sort_values(by=["Status", "ID"], ascending=[False, False])
+
+
+def frame_dashboard(df):
+    open_tickets = len(df[df.Status == "Open"])
+    month = pd.to_datetime(df["Date Submitted"], format="%m-%d-%Y").dt.month
+    return open_tickets, df.groupby([month, "Status"]).size(), df.groupby("Priority").size()
+
+
+def store_dashboard(store):
+    return store.count("Open"), store.status_by_month(), store.priority_counts()
+
+
+def timed(label, n, run, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    print(f"{label:<34} {n:>10,} {(time.perf_counter() - t0) / repeat * 1000:>11.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'operation':<34} {'tickets':>10} {'time':>14}")
+    for n in args.tickets:
+        df = random_tickets(n, np.random.default_rng(0))
+        t0 = time.perf_counter()
+        store = tickets.TicketStore.from_frame(df)
+        print(f"{'store load (once per session)':<34} {n:>10,} {(time.perf_counter() - t0) * 1000:>11.2f} ms")
+
+        submitted = {"frame": df}
+
+        def submit_frame():
+            submitted["frame"] = frame_submit(submitted["frame"], 1000 + len(submitted["frame"]))
+        timed("submit, concat + sort (before)", n, submit_frame, SUBMISSIONS)
+        timed("submit, store insert", n, lambda: store.add("VPN connection problems", "High"), SUBMISSIONS)
+        timed("dashboard, full frame (before)", n, lambda: frame_dashboard(df))
+        timed("dashboard, store counters", n, lambda: store_dashboard(store), 100)
+
+
+if __name__ == "__main__":
+    main()
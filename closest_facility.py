@@ -0,0 +1,139 @@
+"""Closest-facility search for every facility at once.
+
+* Straight line: ``StraightLineIndex`` is a BallTree with the haversine
+  metric over the facility coordinates (scikit-learn). When that is not
+  installed, a KD-tree over unit vectors is used instead; it orders points
+  the same way.
+* Road network: ``ClosestFacilities`` runs one multi-source Dijkstra from all
+  facility nodes together. That labels every graph node with its nearest
+  facility and the cost to reach it. With ``k > 1``, a label-setting search
+  keeps the ``k`` nearest distinct facilities of each node.
+
+A query point is snapped to its nearest node and reads that node's labels.
+Any number of points, such as every row of an incident file, costs one
+KD-tree lookup each and no further graph search.
+
+Costs run from the node to the facility (``to_facility=True``, e.g. patients
+travelling to a clinic) or from the facility out (e.g. ambulances
+dispatched to incidents).
+"""
+import heapq
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+import roadnet
+
+
+def _assign(nearest, lon, lat):
+    """Nearest facility and cost of every point in one pass; -1 and ``inf`` for missing coordinates."""
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    facility, cost = np.full(len(lon), -1), np.full(len(lon), np.inf)
+    labels, costs = nearest(lon[valid], lat[valid], 1)
+    facility[valid], cost[valid] = labels[:, 0], costs[:, 0]
+    return facility, cost
+
+
+class StraightLineIndex:
+    """Great-circle k-nearest facilities of arbitrary (lon, lat) points."""
+
+    def __init__(self, lon, lat):
+        lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+        # Facilities without coordinates are left out of the tree; indices map back to the input order
+        self.rows = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        lon, lat = lon[self.rows], lat[self.rows]
+        self.size = len(lon)
+        try:
+            from sklearn.neighbors import BallTree
+
+            self.tree = BallTree(np.radians(np.column_stack((lat, lon))), metric="haversine")
+            self.haversine = True
+        except ImportError:
+            from scipy.spatial import cKDTree
+
+            self.tree = cKDTree(roadnet.unit_vectors(lon, lat))
+            self.haversine = False
+
+    def nearest(self, lon, lat, k=1):
+        """``(distance in metres, facility index)``, each of shape (points, k), nearest first."""
+        lon, lat = np.atleast_1d(lon).astype(np.float64), np.atleast_1d(lat).astype(np.float64)
+        k = min(k, self.size)
+        if self.haversine:
+            angle, index = self.tree.query(np.radians(np.column_stack((lat, lon))), k=k)
+            return angle * roadnet.EARTH_RADIUS_M, self.rows[index]
+        chord, index = self.tree.query(roadnet.unit_vectors(lon, lat), k=list(range(1, k + 1)), workers=-1)
+        return 2 * roadnet.EARTH_RADIUS_M * np.arcsin(np.minimum(chord / 2, 1.0)), self.rows[index]
+
+    def assign(self, lon, lat):
+        return _assign(lambda *args: self.nearest(*args)[::-1], lon, lat)
+
+
+def _nearest_label(graph, facility_nodes):
+    """Nearest facility and its cost for every node: a single multi-source Dijkstra."""
+    located = np.flatnonzero(facility_nodes >= 0)
+    sources, first = np.unique(facility_nodes[located], return_index=True)
+    costs, _, reached_from = dijkstra(graph, directed=True, indices=sources, min_only=True,
+                                      return_predecessors=True)
+    facility_of_node = np.full(graph.shape[0], -1)
+    facility_of_node[sources] = located[first]  # several facilities on one node: the first one in the list
+    labels = np.where(reached_from >= 0, facility_of_node[np.maximum(reached_from, 0)], -1)
+    return labels[:, None], costs[:, None]
+
+
+def _k_nearest_labels(graph, facility_nodes, k):
+    """The ``k`` nearest distinct facilities of every node (label-setting Dijkstra, ``k`` labels per node)."""
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.data.tolist()
+    n = graph.shape[0]
+    found = [[] for _ in range(n)]  # (cost, facility) in settling order, i.e. nearest first
+    heap = [(0.0, int(node), facility) for facility, node in enumerate(facility_nodes) if node >= 0]
+    heapq.heapify(heap)
+    while heap:
+        cost, node, facility = heapq.heappop(heap)
+        labels = found[node]
+        if len(labels) == k or any(f == facility for _, f in labels):
+            continue
+        labels.append((cost, facility))
+        for e in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[e]
+            if len(found[neighbour]) < k:
+                heapq.heappush(heap, (cost + weights[e], neighbour, facility))
+
+    labels, costs = np.full((n, k), -1), np.full((n, k), np.inf)
+    for node, node_labels in enumerate(found):
+        for rank, (cost, facility) in enumerate(node_labels):
+            labels[node, rank], costs[node, rank] = facility, cost
+    return labels, costs
+
+
+class ClosestFacilities:
+    """The ``k`` nearest facilities (by network cost) of every node of ``network``.
+
+    ``facility_nodes`` are node positions, one per facility, or -1 for a
+    facility that is not on the network; labels are indices into that list,
+    -1 (with cost ``inf``) where fewer than ``k`` facilities can be reached.
+    """
+
+    def __init__(self, network, facility_nodes, k=1, weight="length", to_facility=True):
+        graph = network.csr(weight)
+        if to_facility:
+            graph = graph.T.tocsr()
+        facility_nodes = np.asarray(facility_nodes, dtype=np.int64)
+        self.network = network
+        self.k = k
+        if k == 1:
+            self.labels, self.costs = _nearest_label(graph, facility_nodes)
+        else:
+            self.labels, self.costs = _k_nearest_labels(graph, facility_nodes, k)
+
+    def nearest(self, lon, lat, k=None):
+        """``(facility index, cost)``, each of shape (points, k), for (lon, lat) points snapped to the network."""
+        nodes = self.network.nearest_nodes(np.atleast_1d(lon), np.atleast_1d(lat))
+        return self.nearest_to_nodes(nodes, k)
+
+    def nearest_to_nodes(self, nodes, k=None):
+        k = self.k if k is None else min(k, self.k)
+        return self.labels[nodes, :k], self.costs[nodes, :k]
+
+    def assign(self, lon, lat):
+        return _assign(self.nearest, lon, lat)
@@ -0,0 +1,89 @@
+"""Level-of-detail downsampling of long series for charts.
+
+A chart a few hundred pixels wide cannot show millions of points; drawing
+them all only costs time. These functions pick or aggregate a subset sized
+to the target width:
+
+* ``lttb``: Largest-Triangle-Three-Buckets (Steinarsson, 2013). It keeps
+  one point per bucket, the one that forms the largest triangle with the
+  previously kept point and the average of the next bucket, which
+  preserves the visual shape of a line.
+* ``minmax``: the minimum and maximum of each bucket, so every spike is kept
+  (what a line drawn through all points shows at one value per pixel).
+* ``bin_aggregate``: mean, min and max per bin, for bar charts.
+
+Missing values (NaN) are skipped; the returned x positions are row numbers
+of the original series.
+"""
+import warnings
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(y, n_out, x=None):
+    """Indices of the ``n_out`` points of ``(x, y)`` kept by LTTB (all points if there are fewer)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # n_out - 2 buckets between the first and the last point, which are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Twice the triangle area between the last kept point, a candidate and the next bucket's average
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y, n_buckets):
+    """Sorted indices of the minimum and maximum of each of ``n_buckets`` equal buckets of ``y``."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    pad = -n % size
+    low = np.pad(y, (0, pad), constant_values=np.inf).reshape(-1, size)
+    high = np.pad(y, (0, pad), constant_values=-np.inf).reshape(-1, size)
+    starts = np.arange(len(low)) * size
+    return np.unique(np.concatenate([starts + low.argmin(axis=1), starts + high.argmax(axis=1)]))
+
+
+def decimate(y, width, method="lttb"):
+    """``(x, y)`` of about ``width`` points of ``y`` (``2 * width`` for ``minmax``), NaN skipped."""
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    x = np.arange(len(y)) if valid.all() else np.flatnonzero(valid)
+    y = y[x]
+    if method == "lttb":
+        keep = lttb(y, width, x)
+    elif method == "minmax":
+        keep = minmax(y, width)
+    else:
+        raise ValueError(f"Unknown decimation method '{method}', expected one of {METHODS}")
+    return x[keep], y[keep]
+
+
+def bin_aggregate(y, bins):
+    """``(starts, size, mean, min, max)`` of ``y`` cut into at most ``bins`` bins of ``size`` consecutive rows."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    size = max(1, -(-n // bins))
+    grid = np.pad(y, (0, -n % size), constant_values=np.nan).reshape(-1, size)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # bins that are all NaN
+        return np.arange(len(grid)) * size, size, np.nanmean(grid, axis=1), np.nanmin(grid, axis=1), \
+            np.nanmax(grid, axis=1)
@@ -0,0 +1,288 @@
+"""Streaming CSV point exports (KML, zipped Shapefile, GeoPackage, FlatGeobuf, GeoJSON).
+
+The CSV is read in blocks with the pyarrow streaming reader. Each block gets
+a WKB point column built directly from its longitude/latitude arrays, and the
+blocks are handed to GDAL (``pyogrio.raw.write_arrow``) as one Arrow stream,
+so every format is written incrementally in a single dataset session and at
+most one block of parsed rows is held in memory.
+
+GDAL writes into a private temporary directory that is removed afterwards.
+The result is copied into a ``SpooledTemporaryFile``, which stays in memory
+for small exports and rolls over to disk for large ones; Shapefile parts are
+zipped straight into that spool.
+
+``ExportJobs`` runs several formats at once on a process pool. The upload is
+parsed once, in the background, into a memory-mapped Arrow file that every
+worker reads. Progress is reported through a shared dict, and finished files
+are kept on disk under the upload's content hash. The oldest cached files are
+evicted beyond ``CACHE_MAX_BYTES`` or ``CACHE_MAX_AGE_S``.
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from pyogrio.raw import write_arrow
+
+import ingest
+
+BLOCK_BYTES = 16 << 20  # CSV bytes parsed per block
+DATASET_BATCH_ROWS = 65536  # rows per batch in the shared Arrow file
+SPOOL_MAX = 64 << 20  # exports larger than this are spooled to disk
+CRS = "EPSG:4326"
+CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR", ".export_cache")
+CACHE_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", 4 << 30))
+CACHE_MAX_AGE_S = int(os.environ.get("EXPORT_CACHE_MAX_AGE_S", 7 * 24 * 3600))
+SERVE_GRACE_S = 300  # files used this recently may be being served and are never evicted
+
+# format: (GDAL driver, file extension, MIME type)
+FORMATS = {
+    "kml": ("KML", ".kml", "application/vnd.google-earth.kml+xml"),
+    "shapefile": ("ESRI Shapefile", ".zip", "application/zip"),
+    "gpkg": ("GPKG", ".gpkg", "application/geopackage+sqlite3"),
+    "fgb": ("FlatGeobuf", ".fgb", "application/octet-stream"),
+    "geojson": ("GeoJSON", ".geojson", "application/geo+json"),
+}
+
+# Creation options per driver: shrink Shapefile text fields to their longest
+# value on close instead of the fixed default width, and skip the FlatGeobuf
+# spatial index, which GDAL builds from per-feature entries held in memory
+LAYER_OPTIONS = {"ESRI Shapefile": {"RESIZE": "YES"}, "FlatGeobuf": {"SPATIAL_INDEX": "NO"}}
+
+# Little-endian WKB Point: byte order, geometry type, x, y (21 bytes, no padding)
+_WKB_POINT = np.dtype([("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def wkb_points(x, y):
+    """Binary Arrow array of WKB points, built without creating geometry objects."""
+    records = np.empty(len(x), dtype=_WKB_POINT)
+    records["order"] = 1
+    records["type"] = 1
+    records["x"] = x
+    records["y"] = y
+    fixed = pa.FixedSizeBinaryArray.from_buffers(pa.binary(_WKB_POINT.itemsize), len(records),
+                                                 [None, pa.py_buffer(records.tobytes())])
+    return fixed.cast(pa.binary())
+
+
+def point_batches(source, lon_column="longitude", lat_column="latitude", block_bytes=BLOCK_BYTES):
+    """Yield record batches of ``source`` with a WKB ``geometry`` column; rows without coordinates are dropped.
+
+    Column types are inferred from the first block (coordinates are always
+    float64) and kept for the rest of the file.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    reader = pv.open_csv(source, read_options=pv.ReadOptions(block_size=block_bytes),
+                         convert_options=pv.ConvertOptions(column_types={lon_column: pa.float64(),
+                                                                         lat_column: pa.float64()}))
+    for batch in reader:
+        valid = pc.and_(pc.is_valid(batch[lon_column]), pc.is_valid(batch[lat_column]))
+        batch = batch.filter(valid)
+        if not batch.num_rows:
+            continue
+        geometry = wkb_points(batch[lon_column].to_numpy(), batch[lat_column].to_numpy())
+        yield pa.RecordBatch.from_arrays(batch.columns + [geometry], names=batch.schema.names + ["geometry"])
+
+
+def write_points(batches, path, driver, layer="data", progress=None):
+    """Stream ``batches`` into one GDAL dataset at ``path``; returns the number of features written.
+
+    ``progress``, if given, is called with the running feature count after
+    each batch is handed to GDAL.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("No rows with both latitude and longitude to export")
+    written = [0]
+
+    def counted():
+        for batch in itertools.chain([first], batches):
+            yield batch
+            written[0] += batch.num_rows
+            if progress is not None:
+                progress(written[0])
+
+    reader = pa.RecordBatchReader.from_batches(first.schema, counted())
+    write_arrow(reader, path, layer=layer, driver=driver, geometry_name="geometry", geometry_type="Point",
+                crs=CRS, layer_options=LAYER_OPTIONS.get(driver))
+    return written[0]
+
+
+def write_artifact(batches, out, fmt, name="data", progress=None):
+    """Write ``batches`` as ``fmt`` (a key of ``FORMATS``) into the binary file object ``out``."""
+    driver, extension, _ = FORMATS[fmt]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if fmt == "shapefile":
+            write_points(batches, os.path.join(tmpdir, name + ".shp"), driver, layer=name, progress=progress)
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+                for filename in sorted(os.listdir(tmpdir)):
+                    zf.write(os.path.join(tmpdir, filename), arcname=filename)
+        else:
+            path = os.path.join(tmpdir, name + extension)
+            write_points(batches, path, driver, layer=name, progress=progress)
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+
+
+def export_csv(source, fmt, name="data", **kwargs):
+    """Export the points in CSV ``source`` as ``fmt`` (a key of ``FORMATS``).
+
+    Returns a spooled temporary file positioned at the start; close it when
+    done. Extra keyword arguments go to ``point_batches``.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    write_artifact(point_batches(source, **kwargs), out, fmt, name)
+    out.seek(0)
+    return out
+
+
+def prepare_dataset(source, path, **kwargs):
+    """Parse CSV ``source`` once into an Arrow IPC file at ``path`` (with geometry); returns its row count.
+
+    Export workers memory-map this file, so every format reads the same
+    parsed batches without re-parsing the CSV or copying it between processes.
+    """
+    rows = 0
+    tmp = path + ".tmp"
+    batches = point_batches(source, **kwargs)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("No rows with both latitude and longitude to export")
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, first.schema) as writer:
+        for batch in itertools.chain([first], batches):
+            # Smaller batches than the CSV blocks give workers finer progress steps
+            for offset in range(0, batch.num_rows, DATASET_BATCH_ROWS):
+                writer.write_batch(batch.slice(offset, DATASET_BATCH_ROWS))
+            rows += batch.num_rows
+    os.replace(tmp, path)
+    return rows
+
+
+def dataset_batches(path):
+    """Record batches of a file written by ``prepare_dataset``, memory-mapped."""
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+
+
+def _export_job(dataset_path, fmt, out_path, progress, key):
+    def report(rows):
+        progress[key] = rows
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as out:
+        write_artifact(dataset_batches(dataset_path), out, fmt, progress=report)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+class ExportJobs:
+    """Background export jobs on a process pool, with finished artifacts cached by (input hash, format).
+
+    One instance is meant to be shared by all sessions. ``submit`` only
+    queues work and returns at once. A background thread parses the upload
+    (``prepare_dataset``), and each format is then converted on the process
+    pool. ``status`` reports progress from the workers. Finished artifacts
+    stay in ``cache_dir`` and are served again without converting, until
+    ``ingest.evict`` removes them.
+    """
+
+    def __init__(self, workers=None, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE_S,
+                 grace=SERVE_GRACE_S):
+        self.workers = workers or min(len(FORMATS), os.cpu_count() or 1)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.grace = grace
+        self._pool = None
+        self._preparer = None
+        self._waiters = None
+        self._manager = None
+        self._progress = None
+        self._futures = {}
+        self._datasets = {}
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._pool is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            # Parsing has its own thread so it never queues behind format jobs waiting for it
+            self._preparer = ThreadPoolExecutor(max_workers=1)
+            self._waiters = ThreadPoolExecutor(max_workers=self.workers)
+
+    def dataset_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:32] + ".arrow")
+
+    def artifact_path(self, digest, fmt):
+        return os.path.join(self.cache_dir, f"{digest[:32]}-{fmt}{FORMATS[fmt][1]}")
+
+    def submit(self, source, digest, formats):
+        """Queue exports of ``source`` (content hash ``digest``) for every format not already done or running."""
+        if hasattr(source, "getbuffer"):
+            # Read the upload through its own zero-copy view, not the file position the script also uses
+            source = pa.BufferReader(pa.py_buffer(source.getbuffer()))
+        with self._lock:
+            pending = [fmt for fmt in formats
+                       if not os.path.isfile(self.artifact_path(digest, fmt))
+                       and not ((digest, fmt) in self._futures and not self._futures[digest, fmt].done())]
+            if not pending:
+                return
+            self._start()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prepared = self._datasets.get(digest)
+            if prepared is None or (prepared.done() and (prepared.exception() is not None
+                                                         or not os.path.isfile(self.dataset_path(digest)))):
+                prepared = self._datasets[digest] = self._preparer.submit(self._prepare, source, digest)
+            for fmt in pending:
+                key = f"{digest}:{fmt}"
+                self._progress[key] = 0
+                self._futures[digest, fmt] = self._waiters.submit(self._export, prepared, digest, fmt, key)
+
+    def _prepare(self, source, digest):
+        dataset = self.dataset_path(digest)
+        if not os.path.isfile(dataset) or digest not in self._rows:
+            self._rows[digest] = prepare_dataset(source, dataset)
+        return dataset
+
+    def _export(self, prepared, digest, fmt, key):
+        out_path = self.artifact_path(digest, fmt)
+        try:
+            return self._pool.submit(_export_job, prepared.result(), fmt, out_path, self._progress, key).result()
+        finally:
+            self._evict(out_path)
+
+    def _evict(self, *keep):
+        with self._lock:
+            running = {digest for (digest, _), future in self._futures.items() if not future.done()}
+        keep = set(keep) | {self.dataset_path(digest) for digest in running}
+        ingest.evict(self.cache_dir, self.max_bytes, self.max_age, keep=keep, grace=self.grace)
+
+    def touch(self, digest, fmt):
+        """Mark an artifact as just used, so eviction leaves it alone for ``grace`` seconds and then removes it last."""
+        try:
+            os.utime(self.artifact_path(digest, fmt))
+        except FileNotFoundError:
+            pass
+
+    def status(self, digest, fmt):
+        """``(state, fraction, error)`` with state ``"done"``, ``"running"``, ``"failed"`` or ``"idle"``."""
+        future = self._futures.get((digest, fmt))
+        if future is None or (future.done() and future.exception() is None):
+            return ("done", 1.0, None) if os.path.isfile(self.artifact_path(digest, fmt)) else ("idle", 0.0, None)
+        if future.done():
+            return "failed", 0.0, future.exception()
+        rows = self._rows.get(digest) or 1
+        return "running", min(self._progress.get(f"{digest}:{fmt}", 0) / rows, 1.0), None
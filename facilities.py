@@ -0,0 +1,116 @@
+"""Name index over the uploaded facilities, built once per upload.
+
+The GIS layers turn the facilities picked in their widgets into rows,
+coordinates and snapped network nodes. Scanning the name column for every
+lookup costs O(rows) per facility per rerun. The registry instead hashes
+each name to its row position once and keeps the coordinates in contiguous
+float64 arrays, so a lookup is one dict access plus an array read.
+
+Real uploads repeat facility names, so every row gets a unique label. The
+first occurrence keeps its name, and later ones become ``"name (2)"``,
+``"name (3)"`` and so on. Every row can then be picked in a widget, and no
+lookup silently returns another row of the same name. ``duplicates`` lists
+the names that needed a suffix.
+
+Rows with a missing latitude or longitude stay in the registry, so row
+positions still match the upload, but ``located`` marks them. They are never
+snapped to the network. Selecting one for an analysis raises a ``KeyError``
+that names the facility.
+"""
+from collections import Counter
+
+import numpy as np
+
+
+def unique_labels(names):
+    """One distinct label per name, numbering repeats; returns ``(labels, duplicated names)``."""
+    counts = Counter(names)
+    taken = set(counts)
+    last_suffix = {}
+    labels = []
+    for name in names:
+        if name not in last_suffix:
+            last_suffix[name] = 1
+            labels.append(name)
+            continue
+        suffix = last_suffix[name] + 1
+        while f"{name} ({suffix})" in taken:  # a real name already looks like a numbered repeat
+            suffix += 1
+        last_suffix[name] = suffix
+        label = f"{name} ({suffix})"
+        taken.add(label)
+        labels.append(label)
+    return labels, sorted(name for name, count in counts.items() if count > 1)
+
+
+class FacilityRegistry:
+    """Row position, coordinates and snapped node of every facility, addressed by label.
+
+    ``key`` identifies the upload (e.g. its content hash), so caches of
+    results over all facilities can be keyed on it instead of on the arrays.
+    """
+
+    def __init__(self, names, latitudes, longitudes, key=None):
+        self.key = key
+        self.names = np.asarray(names, dtype=object)
+        self.latitudes = np.ascontiguousarray(latitudes, dtype=np.float64)
+        self.longitudes = np.ascontiguousarray(longitudes, dtype=np.float64)
+        self.located = np.isfinite(self.latitudes) & np.isfinite(self.longitudes)
+        self.labels, self.duplicates = unique_labels(self.names.tolist())
+        self._rows = {label: row for row, label in enumerate(self.labels)}
+        self._node_ids = {}
+
+    @classmethod
+    def from_frame(cls, frame, name_column="facility_name", key=None):
+        return cls(frame[name_column].astype(str).to_numpy(), frame["latitude"].to_numpy(),
+                   frame["longitude"].to_numpy(), key=key)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self._rows
+
+    def row(self, label):
+        """Row position of ``label``; ``KeyError`` if there is no such facility."""
+        try:
+            return self._rows[label]
+        except KeyError:
+            raise KeyError(f"Unknown facility '{label}'") from None
+
+    def rows(self, labels):
+        return np.array([self.row(label) for label in labels], dtype=np.int64)
+
+    def located_rows(self, labels):
+        """Row positions of ``labels``; ``KeyError`` naming the first facility without valid coordinates."""
+        rows = self.rows(labels)
+        missing = rows[~self.located[rows]]
+        if len(missing):
+            raise KeyError(f"Facility '{self.labels[missing[0]]}' has no valid latitude/longitude")
+        return rows
+
+    def located_row(self, label):
+        return int(self.located_rows([label])[0])
+
+    def location(self, label):
+        """``[latitude, longitude]`` of one facility, the order Folium expects."""
+        row = self.row(label)
+        return [self.latitudes[row], self.longitudes[row]]
+
+    def locations(self, labels):
+        """(n, 2) array of ``[latitude, longitude]`` for ``labels``."""
+        rows = self.rows(labels)
+        return np.column_stack((self.latitudes[rows], self.longitudes[rows]))
+
+    def node_ids(self, key, snap):
+        """Snapped network node of every facility, from ``snap(longitudes, latitudes)`` once per network ``key``.
+
+        Facilities without valid coordinates are not snapped and get node -1.
+        """
+        if key not in self._node_ids:
+            nodes = np.full(len(self), -1, dtype=np.int64)
+            rows = np.flatnonzero(self.located)
+            if len(rows):
+                nodes[rows] = snap(self.longitudes[rows], self.latitudes[rows])
+            self._node_ids[key] = nodes
+        return self._node_ids[key]
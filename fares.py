@@ -0,0 +1,55 @@
+"""Precomputed all-pairs distance and fare table over a fixed set of named places.
+
+Distances start as a vectorized haversine matrix and are optionally refined to
+ellipsoidal geodesic distances (what BuApp has always shown) for every
+pair. Built once, the table answers single pairs with two dict lookups and
+whole trip files with one fancy-indexing pass.
+"""
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast like NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class FareTable:
+    """Symmetric distance (km) and fare matrices between the places of a ``{name: (lat, lon)}`` dict."""
+
+    def __init__(self, places, fare_per_km, refine=True):
+        self.names = list(places)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.fare_per_km = fare_per_km
+        coords = np.array([places[name] for name in self.names], dtype=np.float64).reshape(-1, 2)
+        lat, lon = coords[:, 0], coords[:, 1]
+        self.distance_km = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+        if refine:
+            from geopy.distance import geodesic
+
+            for i, j in zip(*np.triu_indices(len(self.names), k=1)):
+                d = geodesic(coords[i], coords[j]).kilometers
+                self.distance_km[i, j] = self.distance_km[j, i] = d
+        self.fare = self.distance_km * fare_per_km
+
+    def lookup(self, origin, destination):
+        """``(distance_km, fare)`` between two place names."""
+        i, j = self.index[origin], self.index[destination]
+        return self.distance_km[i, j], self.fare[i, j]
+
+    def quote(self, trips, origin_column="boarding_point", destination_column="dropping_point"):
+        """Add ``distance_km`` and ``fare`` columns to a trips frame; unknown places get NaN."""
+        origin = pd.Categorical(trips[origin_column], categories=self.names).codes
+        destination = pd.Categorical(trips[destination_column], categories=self.names).codes
+        known = (origin >= 0) & (destination >= 0)
+        distance = np.full(len(trips), np.nan)
+        distance[known] = self.distance_km[origin[known], destination[known]]
+        return trips.assign(distance_km=distance, fare=distance * self.fare_per_km)
+
+    def to_frame(self, values="fare"):
+        """Square table of fares (or ``values="distance_km"``) labelled by place name."""
+        return pd.DataFrame(getattr(self, values), index=self.names, columns=self.names)
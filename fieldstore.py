@@ -0,0 +1,323 @@
+"""Durable, shared storage for collected field data (SQLite in WAL mode).
+
+Rows of every dataset live in one ``records`` table. Attributes are stored
+as JSON, so forms can gain columns, and digitized geometries as WKB. Every
+located row (latitude/longitude, or the bounds of its geometry) also has an
+entry in an R*Tree, so "records in this bounding box" is an index lookup
+instead of a table scan.
+
+All writes of a ``FieldStore`` go through one writer thread. It drains the
+queue and commits whatever has accumulated (up to ``BATCH_ROWS`` rows) in a
+single transaction, so many sessions writing at once share commits (group
+commit) rather than contend for the database lock. ``append(..., wait=True)``
+returns once its row is committed. WAL mode lets readers, each on its own
+thread-local connection, read while the writer commits. ``busy_timeout``
+covers writers in other processes.
+
+A ``Dataset`` handle has the interface of ``records.RecordBuffer``, which it
+uses as its in-memory cache: ``frame()`` only fetches rows added since the
+last call, unless the dataset was replaced in the meantime.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import records
+
+DATA_DIR = os.environ.get("RECORDS_DIR", ".records")
+DEFAULT_PATH = os.environ.get("FIELDSTORE_PATH", os.path.join(DATA_DIR, "field.db"))
+BATCH_ROWS = 1000  # most rows committed in one write transaction
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    name TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    defaults TEXT NOT NULL DEFAULT '{}',
+    epoch INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    geometry BLOB
+);
+CREATE INDEX IF NOT EXISTS records_dataset ON records (dataset, epoch, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS records_rtree USING rtree(id, minx, maxx, miny, maxy);
+"""
+
+
+def _json_value(value):
+    """JSON form of the values ``json`` cannot encode itself: NumPy scalars, dates, anything else as text."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _location(row, geometry, lat_column, lon_column):
+    """``(minx, maxx, miny, maxy)`` of a row, or ``None`` when it has no usable location."""
+    if geometry is not None:
+        minx, miny, maxx, maxy = shapely.bounds(geometry)
+        return None if np.isnan(minx) else (minx, maxx, miny, maxy)
+    try:
+        x, y = float(row[lon_column]), float(row[lat_column])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return None if np.isnan(x) or np.isnan(y) else (x, x, y, y)
+
+
+class FieldStore:
+    """SQLite field data store with a batching writer thread; one instance per process and database."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="fieldstore-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable across app crashes; WAL keeps commits cheap
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def dataset(self, name, columns=(), lat_column="latitude", lon_column="longitude"):
+        """Handle on dataset ``name``, created with ``columns`` if it does not exist yet."""
+        return Dataset(self, name, columns, lat_column, lon_column)
+
+    # Writer thread
+
+    def submit(self, op, *args, wait=True):
+        """Queue a write operation; with ``wait``, block until it is committed (re-raising its error)."""
+        done = threading.Event() if wait else None
+        item = [op, args, done, None]
+        self._queue.put(item)
+        if done is not None:
+            done.wait()
+            if item[3] is not None:
+                raise item[3]
+
+    def flush(self):
+        """Block until every write queued so far is committed."""
+        self.submit("noop")
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Group every insert already waiting into the same transaction
+            while batch[-1][0] == "insert" and len(batch) < BATCH_ROWS:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if len(batch) > 1 and batch[-1][0] != "insert":
+                self._commit(conn, batch[:-1])
+                self._commit(conn, batch[-1:])
+            else:
+                self._commit(conn, batch)
+
+    def _commit(self, conn, items):
+        """Run queued operations in one transaction; if it fails, retry them one by one."""
+        try:
+            with conn:
+                if items[0][0] == "insert":
+                    self._insert(conn, [item[1] for item in items])
+                else:
+                    getattr(self, "_" + items[0][0])(conn, *items[0][1])
+        except Exception as e:  # reported to the waiting callers
+            if len(items) > 1:
+                for item in items:
+                    self._commit(conn, [item])
+                return
+            items[0][3] = e
+        for item in items:
+            if item[2] is not None:
+                item[2].set()
+
+    def _noop(self, conn):
+        pass
+
+    def _insert(self, conn, inserts):
+        meta = {}
+        for dataset, row, geometry, location in inserts:
+            if dataset not in meta:
+                columns, epoch = conn.execute("SELECT columns, epoch FROM datasets WHERE name = ?",
+                                              (dataset,)).fetchone()
+                meta[dataset] = [json.loads(columns), set(json.loads(columns)), epoch, 0]
+            columns, known, epoch, _ = meta[dataset]
+            columns.extend(key for key in row if key not in known)
+            known.update(row)
+            cursor = conn.execute("INSERT INTO records (dataset, epoch, data, geometry) VALUES (?, ?, ?, ?)",
+                                  (dataset, epoch, json.dumps(row, default=_json_value), geometry))
+            if location is not None:
+                conn.execute("INSERT INTO records_rtree VALUES (?, ?, ?, ?, ?)", (cursor.lastrowid,) + location)
+            meta[dataset][3] += 1
+        for dataset, (columns, _, _, added) in meta.items():
+            conn.execute("UPDATE datasets SET columns = ?, version = version + 1, rows = rows + ? WHERE name = ?",
+                         (json.dumps(columns), added, dataset))
+
+    def _create(self, conn, dataset, columns):
+        conn.execute("INSERT OR IGNORE INTO datasets (name, columns) VALUES (?, ?)", (dataset, json.dumps(columns)))
+
+    def _add_column(self, conn, dataset, name, default):
+        columns, defaults = conn.execute("SELECT columns, defaults FROM datasets WHERE name = ?",
+                                         (dataset,)).fetchone()
+        columns, defaults = json.loads(columns), json.loads(defaults)
+        defaults[name] = default
+        conn.execute("UPDATE datasets SET columns = ?, defaults = ?, version = version + 1 WHERE name = ?",
+                     (json.dumps(columns + ([name] if name not in columns else [])), json.dumps(defaults), dataset))
+
+    def _clear(self, conn, dataset, columns=None):
+        conn.execute("DELETE FROM records_rtree WHERE id IN (SELECT id FROM records WHERE dataset = ?)", (dataset,))
+        conn.execute("DELETE FROM records WHERE dataset = ?", (dataset,))
+        conn.execute("UPDATE datasets SET epoch = epoch + 1, version = version + 1, rows = 0 WHERE name = ?",
+                     (dataset,))
+        if columns is not None:
+            conn.execute("UPDATE datasets SET columns = ?, defaults = '{}' WHERE name = ?",
+                         (json.dumps(columns), dataset))
+
+    # Reading
+
+    def meta(self, dataset):
+        """``(columns, defaults, epoch, version, rows)`` of a dataset."""
+        columns, defaults, epoch, version, rows = self._reader().execute(
+            "SELECT columns, defaults, epoch, version, rows FROM datasets WHERE name = ?", (dataset,)).fetchone()
+        return json.loads(columns), json.loads(defaults), epoch, version, rows
+
+    def rows(self, dataset, epoch, after_id=0, bbox=None):
+        """``(ids, attribute dicts, WKB geometries)`` of a dataset's rows, optionally only inside ``bbox``."""
+        if bbox is None:
+            cursor = self._reader().execute(
+                "SELECT id, data, geometry FROM records WHERE dataset = ? AND epoch = ? AND id > ? ORDER BY id",
+                (dataset, epoch, after_id))
+        else:
+            minx, miny, maxx, maxy = bbox
+            # CROSS JOIN keeps the R*Tree as the outer loop (SQLite does not reorder it)
+            cursor = self._reader().execute(
+                "SELECT r.id, r.data, r.geometry FROM records_rtree t CROSS JOIN records r ON r.id = t.id "
+                "WHERE t.minx <= ? AND t.maxx >= ? AND t.miny <= ? AND t.maxy >= ? "
+                "AND r.dataset = ? AND r.epoch = ? AND r.id > ? ORDER BY r.id",
+                (maxx, minx, maxy, miny, dataset, epoch, after_id))
+        fetched = cursor.fetchall()
+        return ([row[0] for row in fetched], [json.loads(row[1]) for row in fetched], [row[2] for row in fetched])
+
+
+class Dataset:
+    """One named dataset of a ``FieldStore``, with the interface of ``records.RecordBuffer``."""
+
+    def __init__(self, store, name, columns=(), lat_column="latitude", lon_column="longitude"):
+        self.store = store
+        self.name = name
+        self.lat_column = lat_column
+        self.lon_column = lon_column
+        self._lock = threading.Lock()
+        self._cache = None  # (epoch, last id, RecordBuffer, WKB geometries)
+        store.submit("create", name, list(columns))
+
+    @property
+    def columns(self):
+        return self.store.meta(self.name)[0]
+
+    @property
+    def version(self):
+        _, _, epoch, version, _ = self.store.meta(self.name)
+        return epoch, version
+
+    def __len__(self):
+        return self.store.meta(self.name)[4]
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def append(self, row, geometry=None, wait=True):
+        """Add one row, optionally with a shapely ``geometry``; with ``wait``, return once it is committed."""
+        row = dict(row)
+        location = _location(row, geometry, self.lat_column, self.lon_column)
+        wkb = shapely.to_wkb(geometry) if geometry is not None else None
+        self.store.submit("insert", self.name, row, wkb, location, wait=wait)
+
+    def extend(self, rows, geometries=None):
+        """Append many rows (dicts or a DataFrame), committed in batches."""
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict("records")
+        rows = list(rows)
+        geometries = [None] * len(rows) if geometries is None else list(geometries)
+        for row, geometry in zip(rows, geometries):
+            self.append(row, geometry, wait=False)
+        self.store.flush()
+
+    def add_column(self, name, default=""):
+        """Add a column; rows that do not set it read as ``default``."""
+        self.store.submit("add_column", self.name, name, default)
+
+    def clear(self):
+        """Remove all rows, keeping the column list."""
+        self.store.submit("clear", self.name)
+
+    def replace(self, frame, geometries=None):
+        """Replace all rows (and the column list) with ``frame``."""
+        self.store.submit("clear", self.name, [str(column) for column in frame.columns])
+        self.extend(frame, geometries)
+
+    def _refresh(self):
+        columns, defaults, epoch, version, _ = self.store.meta(self.name)
+        cache = self._cache
+        if cache is None or cache[0] != epoch:
+            cache = (epoch, 0, records.RecordBuffer(columns), [])
+        buffer = cache[2]
+        ids, rows, geometries = self.store.rows(self.name, epoch, after_id=cache[1])
+        buffer.extend(rows)
+        for column in columns:
+            if column not in buffer.columns:
+                buffer.add_column(column, defaults.get(column, np.nan))
+        for column, default in defaults.items():
+            if buffer.defaults.get(column) != default:
+                buffer.add_column(column, default)
+        cache[3].extend(geometries)
+        self._cache = (epoch, ids[-1] if ids else cache[1], buffer, cache[3])
+        return self._cache
+
+    def frame(self, geometry=False):
+        """All rows as a DataFrame; with ``geometry``, plus a ``geometry`` column of shapely objects."""
+        with self._lock:
+            _, _, buffer, geometries = self._refresh()
+            frame = buffer.frame()
+        if geometry:
+            frame = frame.assign(geometry=shapely.from_wkb(np.array(geometries, dtype=object)))
+        return frame
+
+    def query(self, bbox, geometry=False):
+        """Rows located inside ``bbox`` (minx, miny, maxx, maxy), found through the R*Tree."""
+        columns, defaults, epoch, _, _ = self.store.meta(self.name)
+        _, rows, geometries = self.store.rows(self.name, epoch, bbox=bbox)
+        frame = pd.DataFrame.from_records(rows).reindex(columns=columns)
+        for column, default in defaults.items():
+            frame[column] = frame[column].fillna(default)
+        if geometry:
+            frame["geometry"] = shapely.from_wkb(np.array(geometries, dtype=object))
+        return frame
@@ -0,0 +1,71 @@
+"""Byte-capped LRU cache of rendered figures, shared by the sessions of an app.
+
+Figures are keyed on ``(dataset version, column, chart type, parameters)``,
+so a rerun that changes neither the data nor the selection reuses the
+figure instead of building (and for Matplotlib, rasterizing) it again.
+When the cached figures exceed ``max_bytes``, the least recently used ones
+are evicted.
+"""
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 64 << 20
+
+
+def size_of(value):
+    """Approximate size in bytes: PNG bytes or JSON text as is, Plotly figures by their JSON."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if hasattr(value, "to_json"):
+        return len(value.to_json())
+    raise TypeError(f"Cannot size a {type(value).__name__} for the figure cache")
+
+
+class FigureCache:
+    """LRU mapping of figure keys to rendered figures, capped at ``max_bytes``; safe to share."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (figure, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, render):
+        """The figure for ``key``, made with ``render()`` if it is not cached.
+
+        Rendering runs outside the lock, so other sessions are not blocked;
+        two sessions missing the same key at once both render it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        figure = render()
+        size = size_of(figure)
+        with self._lock:
+            if size <= self.max_bytes:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.bytes -= previous[1]
+                self._entries[key] = (figure, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
@@ -0,0 +1,132 @@
+"""Shared, schema-aware CSV ingestion for the apps.
+
+Uploads are parsed with the pyarrow CSV engine (falling back to the C engine
+where pyarrow is missing or rejects an option), cast to a declared schema,
+and written to a Parquet sidecar named after the content hash of the upload.
+Uploading the same file again, in any session or after a restart, reads the
+sidecar instead of re-parsing the CSV. Sidecars are evicted, least recently
+used first, beyond ``CACHE_MAX_BYTES`` or ``CACHE_MAX_AGE_S``.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("INGEST_CACHE_DIR", ".ingest_cache")
+CACHE_MAX_BYTES = int(os.environ.get("INGEST_CACHE_MAX_BYTES", 2 << 30))
+CACHE_MAX_AGE_S = int(os.environ.get("INGEST_CACHE_MAX_AGE_S", 7 * 24 * 3600))
+
+# Health facility / GIS facility uploads
+FACILITY_SCHEMA = {
+    "latitude": "float32",
+    "longitude": "float32",
+    "operator_type": "category",
+    "amenity": "category",
+    "County": "category",
+}
+
+
+def content_hash(source):
+    """SHA-256 of an uploaded file (or any object with ``getvalue``/``read``) or of a file path."""
+    h = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    elif hasattr(source, "getvalue"):
+        h.update(source.getvalue())
+    else:
+        position = source.tell()
+        h.update(source.read())
+        source.seek(position)
+    return h.hexdigest()
+
+
+def evict(cache_dir, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE_S, keep=(), grace=0):
+    """Delete cached files older than ``max_age`` seconds, then the oldest until ``max_bytes`` are left.
+
+    Age is the modification time, which callers refresh when they serve a
+    file (``load_csv`` on a sidecar hit, ``export.ExportJobs.touch``). Paths in ``keep``, partial ``.tmp`` files and
+    files modified in the last ``grace`` seconds are never deleted (their
+    size still counts). Returns the number of files removed.
+    """
+    entries = []
+    now = time.time()
+    total = 0
+    with os.scandir(cache_dir) as scan:
+        for entry in scan:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.path not in keep and stat.st_mtime < now - grace:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+    cutoff = now - max_age
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+def apply_schema(frame, schema):
+    """Cast the schema columns present in ``frame``; other columns keep their inferred dtypes."""
+    present = {column: dtype for column, dtype in (schema or {}).items() if column in frame}
+    return frame.astype(present) if present else frame
+
+
+def read_csv(source, schema=None, **kwargs):
+    """Parse a CSV with the pyarrow engine when possible and apply ``schema``."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    try:
+        frame = pd.read_csv(source, engine="pyarrow", **kwargs)
+    except (ImportError, ValueError):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        frame = pd.read_csv(source, **kwargs)
+    return apply_schema(frame, schema)
+
+
+def load_csv(source, schema=None, digest=None, cache_dir=CACHE_DIR, **kwargs):
+    """Parsed, typed frame for ``source``, served from its Parquet sidecar when one exists.
+
+    ``digest`` may be passed when the caller already hashed the upload.
+    """
+    digest = digest or content_hash(source)
+    options = json.dumps([schema or {}, kwargs], sort_keys=True, default=str)
+    key = hashlib.sha256((digest + options).encode()).hexdigest()[:32]
+    sidecar = os.path.join(cache_dir, key + ".parquet")
+    if os.path.isfile(sidecar):
+        try:
+            frame = pd.read_parquet(sidecar)
+            os.utime(sidecar)  # recently used sidecars are evicted last
+            return frame
+        except (ImportError, OSError, ValueError):
+            pass
+
+    frame = read_csv(source, schema, **kwargs)
+    tmp = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # A private temporary name, since several sessions may write the same sidecar at once
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        os.close(fd)
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, sidecar)
+        evict(cache_dir, keep={sidecar})
+    except (ImportError, OSError, TypeError, ValueError):
+        pass  # no Parquet engine or read-only cache: still return the parsed frame
+    finally:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return frame
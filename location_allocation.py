@@ -0,0 +1,239 @@
+"""Location-allocation: choose ``k`` sites among candidates to serve weighted demand points.
+
+* ``p_median``: minimize the total weighted cost from every demand point to
+  its nearest open site.
+* ``maximal_coverage`` (MCLP): maximize the weight of the demand points
+  within ``cutoff`` of an open site. It is the p-median of the 0/1 "not
+  covered" cost, so both share one engine.
+
+Sites are opened greedily and then improved by Teitz-Bart vertex
+substitution: every closed candidate is tried in place of each open site,
+and a swap is made whenever it improves, until a full pass finds none.
+A swap is scored in O(k) from running totals rather than by recomputing
+the objective (Whitaker's fast interchange, with the "extra" matrix of
+Resende and Werneck):
+
+* ``gain[j]``: the decrease if ``j`` were opened;
+* ``loss[r]``: the increase if open site ``r`` were closed;
+* ``extra[j, r]``: the correction for demand points served by ``r`` that
+  ``j`` would take over.
+
+A swap only changes these totals for the demand points whose nearest or
+second-nearest site changes, so only those rows are re-evaluated.
+
+Costs are a dense (demand x candidate) array or a ``scipy.sparse`` matrix
+that holds only the pairs within reach (e.g. from ``network_costs`` with a
+cutoff). Pairs that are not stored or are not finite count as
+``unreached``. Internally costs are stored as ``cost - unreached`` (< 0),
+so a missing sparse entry (0) is exactly "unreached" and contributes
+nothing.
+"""
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+
+BLOCK_ROWS = 4096
+CHUNK_SIZE = 64
+EPS = 1e-9
+
+
+class Allocation:
+    """Open sites (candidate indices) and the site serving each demand point (-1 if none in reach)."""
+
+    def __init__(self, sites, assigned, objective):
+        self.sites = sites
+        self.assigned = assigned
+        self.objective = objective
+
+
+def network_costs(network, demand, candidates, weight="length", cutoff=np.inf):
+    """Sparse (demand x candidate) network costs of the pairs within ``cutoff``, from node positions.
+
+    Searches run backwards from the candidates over the reversed graph, one
+    bounded Dijkstra per candidate, so the cost runs from the demand point to
+    the site and only the reachable neighbourhood of each site is explored.
+    """
+    reverse = network.csr(weight).T.tocsr()
+    demand, candidates = np.asarray(demand), np.asarray(candidates)
+    rows, cols, values = [], [], []
+    for start in range(0, len(candidates), CHUNK_SIZE):
+        chunk = candidates[start:start + CHUNK_SIZE]
+        distances = dijkstra(reverse, directed=True, indices=chunk, limit=cutoff)[:, demand]
+        column, row = np.nonzero(np.isfinite(distances))
+        rows.append(row)
+        cols.append(column + start)
+        values.append(distances[column, row])
+    return sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(len(demand), len(candidates)))
+
+
+def _shift(costs, unreached):
+    if sparse.issparse(costs):
+        shifted = sparse.csr_matrix(costs, dtype=np.float64, copy=True)
+        shifted.data = np.where(np.isfinite(shifted.data), shifted.data - unreached, 0.0)
+        shifted.eliminate_zeros()
+        return shifted
+    costs = np.asarray(costs, dtype=np.float64)
+    return np.where(np.isfinite(costs), costs - unreached, 0.0)
+
+
+class _Interchange:
+    """Open sites with the nearest/second-nearest site of every demand point and the swap totals."""
+
+    def __init__(self, costs, weights, k):
+        self.costs = costs
+        self.columns = costs.tocsc() if sparse.issparse(costs) else None
+        n, m = costs.shape
+        self.weights = weights
+        self.open = []
+        self.slot = np.full(m, -1)
+        self.d1, self.d2 = np.zeros(n), np.zeros(n)
+        self.f1, self.f2 = np.full(n, -1), np.full(n, -1)
+        self.gain, self.loss, self.extra = np.zeros(m), np.zeros(k), np.zeros((m, k))
+        self._contribute(np.arange(n), 1)
+
+    @property
+    def objective(self):
+        return float(self.weights @ self.d1)
+
+    def _blocks(self, rows):
+        for start in range(0, len(rows), BLOCK_ROWS):
+            yield rows[start:start + BLOCK_ROWS]
+
+    def _contribute(self, rows, sign):
+        m, k = self.extra.shape
+        for block in self._blocks(rows):
+            weight, d1, d2, f1 = self.weights[block], self.d1[block], self.d2[block], self.f1[block]
+            served = np.flatnonzero(f1 >= 0)
+            if self.columns is None:
+                costs = self.costs[block]
+                self.gain += sign * (weight @ np.maximum(d1[:, None] - costs, 0))
+                extra = weight[:, None] * np.maximum(d2[:, None] - np.maximum(costs, d1[:, None]), 0)
+                by_slot = sparse.csr_matrix((np.ones(len(served)), (self.slot[f1[served]], served)),
+                                            shape=(k, len(block)))
+                self.extra += sign * (by_slot @ extra).T
+            else:
+                entries = self.costs[block].tocoo()
+                row, column, cost = entries.row, entries.col, entries.data
+                self.gain += sign * np.bincount(column, weight[row] * np.maximum(d1[row] - cost, 0), minlength=m)
+                extra = weight[row] * np.maximum(d2[row] - np.maximum(cost, d1[row]), 0)
+                keep = (f1[row] >= 0) & (extra > 0)
+                self.extra += sign * np.bincount(column[keep] * k + self.slot[f1[row[keep]]], extra[keep],
+                                                 minlength=m * k).reshape(m, k)
+        served = rows[self.f1[rows] >= 0]
+        self.loss += sign * np.bincount(self.slot[self.f1[served]],
+                                        self.weights[served] * (self.d2[served] - self.d1[served]), minlength=k)
+
+    def _assign(self, rows):
+        sites = np.array(self.open)
+        for block in self._blocks(rows):
+            if self.columns is None:
+                costs = self.costs[np.ix_(block, sites)]
+            else:
+                costs = self.costs[block][:, sites].toarray()
+            order = np.argsort(costs, axis=1, kind="stable")[:, :2]
+            index = np.arange(len(block))
+            self.d1[block], self.f1[block] = costs[index, order[:, 0]], sites[order[:, 0]]
+            if len(sites) > 1:
+                self.d2[block], self.f2[block] = costs[index, order[:, 1]], sites[order[:, 1]]
+
+    def _column_rows(self, j):
+        """Demand points for which candidate ``j`` is nearer than their second-nearest open site."""
+        if self.columns is None:
+            return np.flatnonzero(self.costs[:, j] < self.d2)
+        start, stop = self.columns.indptr[j], self.columns.indptr[j + 1]
+        rows, costs = self.columns.indices[start:stop], self.columns.data[start:stop]
+        return rows[costs < self.d2[rows]]
+
+    def _update(self, rows, change):
+        self._contribute(rows, -1)
+        change()
+        self._assign(rows)
+        self._contribute(rows, 1)
+
+    def add(self, j):
+        def change():
+            self.slot[j] = len(self.open)
+            self.open.append(j)
+        self._update(self._column_rows(j), change)
+
+    def swap(self, j, r):
+        def change():
+            slot = self.slot[r]
+            self.slot[j], self.slot[r] = slot, -1
+            self.open[slot] = j
+        rows = np.union1d(np.flatnonzero((self.f1 == r) | (self.f2 == r)), self._column_rows(j))
+        self._update(rows, change)
+
+    def rebuild(self):
+        """Recompute the running totals from scratch (they drift slightly with floating point)."""
+        self.gain[:], self.loss[:], self.extra[:] = 0, 0, 0
+        self._contribute(np.arange(len(self.d1)), 1)
+
+    def greedy(self, k):
+        while len(self.open) < k:
+            self.add(int(np.argmax(np.where(self.slot < 0, self.gain, -np.inf))))
+
+    def teitz_bart(self):
+        improved = True
+        while improved:
+            improved = False
+            for j in np.flatnonzero(self.slot < 0):
+                if self.slot[j] >= 0:
+                    continue
+                delta = self.loss - self.gain[j] - self.extra[j]
+                slot = int(np.argmin(delta))
+                before = self.objective
+                if delta[slot] >= -EPS * (abs(before) + 1):
+                    continue
+                r = self.open[slot]
+                self.swap(j, r)
+                if self.objective < before - EPS * (abs(before) + 1):
+                    improved = True
+                else:
+                    self.swap(r, j)
+                    self.rebuild()
+            self.rebuild()
+
+
+def _solve(shifted, k, weights):
+    n, m = shifted.shape
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    if not 1 <= k <= m:
+        raise ValueError(f"Cannot open {k} of {m} candidate sites")
+    state = _Interchange(shifted, weights, k)
+    state.greedy(k)
+    state.teitz_bart()
+    assigned = np.where(state.d1 < 0, state.f1, -1)
+    return state, Allocation(np.array(state.open), assigned, state.objective)
+
+
+def p_median(costs, k, weights=None, unreached=None):
+    """Open ``k`` sites minimizing the weighted cost to the nearest site.
+
+    Demand points with no open site in reach count at ``unreached``, which
+    defaults to twice the largest finite cost. ``objective`` is the total
+    weighted cost.
+    """
+    finite = costs.data if sparse.issparse(costs) else np.asarray(costs, dtype=np.float64)
+    finite = finite[np.isfinite(finite)]
+    if unreached is None:
+        unreached = 2 * float(finite.max(initial=0)) or 1.0
+    elif finite.size and finite.max() >= unreached:
+        raise ValueError("'unreached' must be larger than every finite cost")
+    state, allocation = _solve(_shift(costs, unreached), k, weights)
+    allocation.objective = allocation.objective + float(state.weights.sum()) * unreached
+    return allocation
+
+
+def maximal_coverage(costs, k, cutoff, weights=None):
+    """Open ``k`` sites maximizing the weight of demand points within ``cutoff``; ``objective`` is that weight."""
+    if sparse.issparse(costs):
+        covered = sparse.csr_matrix(costs, dtype=np.float64, copy=True)
+        covered.data = np.where(covered.data <= cutoff, -1.0, 0.0)
+        covered.eliminate_zeros()
+    else:
+        covered = np.where(np.asarray(costs, dtype=np.float64) <= cutoff, -1.0, 0.0)
+    _, allocation = _solve(covered, k, weights)
+    allocation.objective = -allocation.objective
+    return allocation
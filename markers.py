@@ -0,0 +1,154 @@
+"""Shared point-layer rendering for the Folium maps.
+
+Layers are built straight from coordinate arrays instead of ``iterrows()``.
+Large layers are emitted as one compact JSON array that the browser turns
+into markers itself. That is either a client-side marker cluster or circle
+markers drawn on a single canvas, with popups built only when clicked.
+Small layers keep ordinary ``folium.Marker`` objects.
+"""
+import json
+
+import folium
+import numpy as np
+from branca.element import Element
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
+
+CLUSTER_THRESHOLD = 500  # above this many points "auto" switches from markers to clustering
+COORD_DECIMALS = 6  # ~0.1 m, keeps the JSON payload short
+
+_CLUSTER_CALLBACK = """(function () {
+    var icon = L.AwesomeMarkers.icon({markerColor: %(color)s, iconColor: "white", icon: "info-sign",
+                                      prefix: "glyphicon"});
+    return function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+        if (row.length > 2) {
+            marker.bindPopup(function () { return row[2]; }, {maxWidth: 300});
+        }
+        return marker;
+    };
+})()"""
+_CLUSTER_ICON = """function (cluster) {
+    var count = cluster.getChildCount();
+    var size = count < 100 ? 32 : count < 1000 ? 38 : 46;
+    return L.divIcon({
+        html: '<div style="background-color: ' + %(fill)s + '; width: ' + size + 'px; height: ' + size
+              + 'px; line-height: ' + size + 'px; border-radius: 50%%; opacity: 0.8; color: white;'
+              + ' font-weight: bold; text-align: center;">' + count + '</div>',
+        className: "", iconSize: L.point(size, size)
+    });
+}"""
+# Fill of the cluster bubbles for the folium.Icon marker colors (other values are used as CSS colors)
+_CLUSTER_FILLS = {
+    "red": "#d63e2a", "darkred": "#a23336", "lightred": "#ff8e7f", "orange": "#f69730", "beige": "#ffcb92",
+    "green": "#72b026", "darkgreen": "#728224", "lightgreen": "#bbf970", "blue": "#38aadd",
+    "darkblue": "#0067a3", "cadetblue": "#436978", "lightblue": "#8adaff", "purple": "#d252b9",
+    "darkpurple": "#5b396b", "pink": "#ff91ea", "white": "#fbfbfb", "gray": "#575757",
+    "lightgray": "#a3a3a3", "black": "#303030",
+}
+
+
+class _RawScript(Element):
+    """Script added to the page as is (``Element(text)`` would compile the text as a Jinja template)."""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs):
+        return self.script
+
+
+class CanvasPointLayer(folium.map.Layer):
+    """Circle markers drawn on one shared canvas renderer from a JSON array of ``[lat, lon(, popup)]`` rows.
+
+    ``data`` is a list of rows or that list already serialized by ``rows_json``.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var renderer = L.canvas({padding: 0.5});
+                var layer = L.featureGroup();
+                var data = {{ this.data }};
+                var style = {{ this.style|tojson }};
+                style.renderer = renderer;
+                data.forEach(function (row) {
+                    var marker = L.circleMarker([row[0], row[1]], style);
+                    if (row.length > 2) {
+                        marker.bindPopup(function () { return row[2]; }, {maxWidth: 300});
+                    }
+                    layer.addLayer(marker);
+                });
+                layer.addTo({{ this._parent.get_name() }});
+                return layer;
+            })();
+        {% endmacro %}""")
+
+    def __init__(self, data, color="#3388ff", radius=4, name=None, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "CanvasPointLayer"
+        self.data = data if isinstance(data, Markup) else rows_json(data)
+        self.style = {"radius": radius, "color": color, "weight": 1, "fillOpacity": 0.7}
+
+    def render(self, **kwargs):
+        # The script is mostly data: add it without the template compilation of MacroElement.render
+        script = self._template.module.__dict__["script"]
+        self.get_root().script.add_child(_RawScript(script(self, kwargs)), name=self.get_name())
+
+
+def point_rows(lat, lon, popups=None):
+    """Compact ``[lat, lon(, popup)]`` rows built column-wise."""
+    rows = np.round(np.column_stack((np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))),
+                    COORD_DECIMALS).tolist()
+    if popups is not None:
+        for row, popup in zip(rows, popups):
+            row.append(str(popup))
+    return rows
+
+
+def rows_json(rows):
+    """Rows serialized for embedding in a map script (as Jinja's ``tojson`` does)."""
+    return htmlsafe_json_dumps(rows, separators=(",", ":"))
+
+
+def add_point_layer(map_obj, lat, lon, popups=None, tooltips=None, name=None, color="blue",
+                    mode="auto", threshold=CLUSTER_THRESHOLD):
+    """Add a point layer to ``map_obj`` and return it.
+
+    ``mode`` is ``"markers"`` (one ``folium.Marker`` each), ``"cluster"``
+    (client-side clustering), ``"canvas"`` (circle markers on one canvas) or
+    ``"auto"``, which uses markers up to ``threshold`` points and clusters
+    above it. ``color`` is a ``folium.Icon`` color: clustered points get that
+    marker and their cluster bubbles its fill. Tooltips are only rendered in
+    marker mode.
+    """
+    n = len(lat)
+    if mode == "auto":
+        mode = "markers" if n <= threshold else "cluster"
+
+    if mode == "markers":
+        layer = folium.FeatureGroup(name=name) if name else map_obj
+        popups = [None] * n if popups is None else popups
+        tooltips = [None] * n if tooltips is None else tooltips
+        for y, x, popup, tooltip in zip(np.asarray(lat).tolist(), np.asarray(lon).tolist(), popups, tooltips):
+            folium.Marker(
+                location=[y, x],
+                popup=folium.Popup(str(popup), max_width=300) if popup is not None else None,
+                tooltip=str(tooltip) if tooltip is not None else None,
+                icon=folium.Icon(color=color),
+            ).add_to(layer)
+        if name:
+            layer.add_to(map_obj)
+        return layer
+    if mode == "cluster":
+        return FastMarkerCluster(
+            point_rows(lat, lon, popups), callback=_CLUSTER_CALLBACK % {"color": json.dumps(color)}, name=name,
+            icon_create_function=_CLUSTER_ICON % {"fill": json.dumps(_CLUSTER_FILLS.get(color, color))},
+        ).add_to(map_obj)
+    if mode == "canvas":
+        return CanvasPointLayer(point_rows(lat, lon, popups), color=color, name=name).add_to(map_obj)
+    raise ValueError(f"Unknown point layer mode '{mode}', expected 'auto', 'markers', 'cluster' or 'canvas'")
+
@@ -6,42 +6,81 @@ import folium
 from streamlit_folium import st_folium
 from shapely.geometry import Point, LineString, Polygon
 import json
+import markers
+import ingest
+import fieldstore
+import figcache
 
-# Initialize session state
-if 'data' not in st.session_state:
-    st.session_state['data'] = pd.DataFrame()
-if 'gdf' not in st.session_state:
-    st.session_state['gdf'] = gpd.GeoDataFrame(columns=['geometry'])
-if 'columns' not in st.session_state:
-    st.session_state['columns'] = ['ID', 'name', 'latitude', 'longitude', 'class', 'quantity']
+DEFAULT_COLUMNS = ['ID', 'name', 'latitude', 'longitude', 'class', 'quantity']
+
+# Function to open the field database shared by all sessions (SQLite, WAL mode)
+@st.cache_resource
+def load_store():
+    return fieldstore.FieldStore()
+
+# Function to open the collected records
+@st.cache_resource
+def load_records():
+    return load_store().dataset('odk_data', DEFAULT_COLUMNS)
+
+# Function to open the digitized features, stored with their geometries
+@st.cache_resource
+def load_features():
+    return load_store().dataset('odk_features')
+
+# Function to compute the initial map center once per set of records, so adding a record does not move the map
+@st.cache_data(max_entries=4)
+def map_center(epoch, _data):
+    if _data.empty:
+        return [-1.2921, 36.8219]
+    return [float(_data['latitude'].mean()), float(_data['longitude'].mean())]
+
+# Function to open the figure cache shared by all sessions (LRU, capped at figcache.MAX_BYTES)
+@st.cache_resource
+def load_figure_cache():
+    return figcache.FigureCache()
+
+data_records = load_records()
+feature_records = load_features()
 
 def save_uploaded_file(uploaded_file):
+    # Load each upload once; the uploader keeps returning it on every rerun
+    file_hash = ingest.content_hash(uploaded_file)
+    if st.session_state.get('loaded_csv') == file_hash:
+        return
     try:
-        df = pd.read_csv(uploaded_file)
-        st.session_state['data'] = df
-        st.session_state['columns'] = df.columns.tolist()
-        st.success("File uploaded successfully!")
+        df = ingest.load_csv(uploaded_file, digest=file_hash)
+        # The records are shared by every session: add the uploaded rows, never replace what others collected
+        data_records.extend(df)
+        st.session_state['loaded_csv'] = file_hash
+        st.success(f"File uploaded successfully! {len(df):,} rows added.")
     except Exception as e:
         st.error(f"Error: {e}")
 
 def save_uploaded_shapefile(uploaded_file):
+    file_hash = ingest.content_hash(uploaded_file)
+    if st.session_state.get('loaded_shapefile') == file_hash:
+        return
     try:
         gdf = gpd.read_file(uploaded_file)
-        st.session_state['gdf'] = gdf
-        st.success("Shapefile uploaded successfully!")
+        feature_records.extend(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)), geometries=gdf.geometry)
+        st.session_state['loaded_shapefile'] = file_hash
+        st.success(f"Shapefile uploaded successfully! {len(gdf):,} features added.")
     except Exception as e:
         st.error(f"Error: {e}")
 
 def add_data(row):
-    new_row = pd.DataFrame([row])
-    st.session_state['data'] = pd.concat([st.session_state['data'], new_row], ignore_index=True)
+    data_records.append(row)
 
 def add_geometry(geometry, attributes):
-    new_gdf = gpd.GeoDataFrame([attributes], geometry=[geometry])
-    st.session_state['gdf'] = pd.concat([st.session_state['gdf'], new_gdf], ignore_index=True)
+    feature_records.append(attributes, geometry=geometry)
+
+# Function to materialize the digitized features as a GeoDataFrame
+def features_gdf():
+    return gpd.GeoDataFrame(feature_records.frame(geometry=True), geometry='geometry', crs="EPSG:4326")
 
 def save_data_to_csv():
-    csv = st.session_state['data'].to_csv(index=False)
+    csv = data_records.frame().to_csv(index=False)
     st.download_button(
         label="Download data as CSV",
         data=csv,
@@ -50,7 +89,7 @@ def save_data_to_csv():
     )
 
 def save_shapefile():
-    st.session_state['gdf'].to_file("digitized_features.shp")
+    features_gdf().to_file("digitized_features.shp")
     st.success("Shapefile saved successfully!")
     with open("digitized_features.shp", "rb") as shp:
         st.download_button(
@@ -60,16 +99,9 @@ def save_shapefile():
             mime="application/octet-stream",
         )
 
-def create_map(data, map_type):
-    # Initialize the map centered around the mean latitude and longitude of the data
-    if not data.empty:
-        center_lat = data['latitude'].mean()
-        center_lon = data['longitude'].mean()
-    else:
-        center_lat = -1.2921
-        center_lon = 36.8219
-
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=6, tiles=None)
+# Function to build the base map: tiles and controls only, identical on every rerun
+def create_map(center, map_type):
+    m = folium.Map(location=center, zoom_start=6, tiles=None)
 
     # Add selected tile layer
     if map_type == 'OpenStreetMap':
@@ -91,13 +123,6 @@ def create_map(data, map_type):
             attr='Map data: &copy; <a href="https://www.opentopomap.org">OpenTopoMap</a> contributors'
         ).add_to(m)
 
-    # Add markers to the map
-    for idx, row in data.iterrows():
-        folium.Marker(
-            location=[row['latitude'], row['longitude']],
-            popup=folium.Popup(f"<b>Name:</b> {row['name']}<br><b>Class:</b> {row['class']}<br><b>Quantity:</b> {row['quantity']}", max_width=300)
-        ).add_to(m)
-
     # Add draw control
     draw = folium.plugins.Draw(export=True)
     draw.add_to(m)
@@ -107,6 +132,30 @@ def create_map(data, map_type):
 
     return m
 
+# Function to build the record markers as one feature group, clustered automatically for large collections.
+# Cached on the records version: reruns that add nothing reuse the layer. streamlit-folium has no
+# incremental updates, so when a record is added the whole layer is rebuilt and re-sent to the browser.
+@st.cache_resource(max_entries=2)
+def marker_layer(version, _data):
+    popups = ("<b>Name:</b> " + _data['name'].astype(str) + "<br><b>Class:</b> " + _data['class'].astype(str)
+              + "<br><b>Quantity:</b> " + _data['quantity'].astype(str))
+    group = folium.FeatureGroup(name='Records')
+    markers.add_point_layer(group, _data['latitude'].to_numpy(), _data['longitude'].to_numpy(), popups=popups)
+    return group
+
+# Function to build the Plotly figure for the selected chart type
+def make_chart(data, chart_type):
+    if chart_type == "Line Graph":
+        return px.line(data, x='name', y='quantity', title='Line Graph of Quantity by Name')
+    elif chart_type == "Bar Graph":
+        return px.bar(data, x='name', y='quantity', title='Bar Graph of Quantity by Name')
+    elif chart_type == "Pie Chart":
+        return px.pie(data, names='name', values='quantity', title='Pie Chart of Quantity by Name')
+    elif chart_type == "Histogram":
+        return px.histogram(data, x='quantity', title='Histogram of Quantity')
+    elif chart_type == "Scatter Plot":
+        return px.scatter(data, x='longitude', y='latitude', size='quantity', color='name', title='Scatter Plot of Locations by Quantity')
+
 st.title("Open Data Collection Kit")
 
 # Upload CSV file
@@ -141,22 +190,24 @@ st.sidebar.header("Add Custom Columns")
 custom_column = st.sidebar.text_input("Custom Column Name:")
 if st.sidebar.button("Add Column"):
     if custom_column:
-        st.session_state['columns'].append(custom_column)
-        st.session_state['data'][custom_column] = ""
+        data_records.add_column(custom_column, "")
         st.sidebar.success(f"Column '{custom_column}' added successfully!")
     else:
         st.sidebar.error("Please enter a column name.")
 
 # Display current data
+# The version is read before the frame, so a write in between leaves a newer version for the next rerun
+version = data_records.version
+data = data_records.frame()
 st.write("### Current Data")
-st.write(st.session_state['data'])
+st.write(data)
 
 # Save data to CSV
 st.write("### Save Data")
 save_data_to_csv()
 
 # Save shapefile
-if not st.session_state['gdf'].empty:
+if not feature_records.empty:
     st.write("### Save Shapefile")
     save_shapefile()
 
@@ -164,22 +215,10 @@ if not st.session_state['gdf'].empty:
 st.write("### Data Visualization")
 chart_type = st.selectbox("Select Chart Type:", ["Line Graph", "Bar Graph", "Pie Chart", "Histogram", "Scatter Plot"])
 
-if not st.session_state['data'].empty:
-    if chart_type == "Line Graph":
-        fig = px.line(st.session_state['data'], x='name', y='quantity', title='Line Graph of Quantity by Name')
-        st.plotly_chart(fig)
-    elif chart_type == "Bar Graph":
-        fig = px.bar(st.session_state['data'], x='name', y='quantity', title='Bar Graph of Quantity by Name')
-        st.plotly_chart(fig)
-    elif chart_type == "Pie Chart":
-        fig = px.pie(st.session_state['data'], names='name', values='quantity', title='Pie Chart of Quantity by Name')
-        st.plotly_chart(fig)
-    elif chart_type == "Histogram":
-        fig = px.histogram(st.session_state['data'], x='quantity', title='Histogram of Quantity')
-        st.plotly_chart(fig)
-    elif chart_type == "Scatter Plot":
-        fig = px.scatter(st.session_state['data'], x='longitude', y='latitude', size='quantity', color='name', title='Scatter Plot of Locations by Quantity')
-        st.plotly_chart(fig)
+if not data.empty:
+    # Figures are cached on (records version, column, chart type, parameters): reruns that change neither reuse it
+    fig = load_figure_cache().get((version, None, chart_type, ()), lambda: make_chart(data, chart_type))
+    st.plotly_chart(fig)
 else:
     st.warning("No data available for visualization")
 
@@ -187,9 +226,12 @@ else:
 st.write("### Map Visualization")
 map_type = st.selectbox("Select Map Type:", ["OpenStreetMap", "Imagery", "Terrain"])
 
-if not st.session_state['data'].empty:
-    map_object = create_map(st.session_state['data'], map_type)
-    output = st_folium(map_object, width=700, height=500)
+if not data.empty:
+    # The base map stays the same between reruns, so st_folium keeps it (and the view) and only
+    # replaces the marker layer, which is sent in full whenever the records change
+    epoch = version[0]
+    map_object = create_map(map_center(epoch, data), map_type)
+    output = st_folium(map_object, key="odk_map", width=700, height=500, feature_group_to_add=marker_layer(version, data))
 
     if 'last_active_drawing' in output['last_object'] and output['last_object'] is not None:
         drawing = output['last_object']['geometry']
@@ -207,7 +249,7 @@ if not st.session_state['data'].empty:
 
         st.write("### Add Attributes for Digitized Feature")
         attributes = {}
-        for col in st.session_state['columns']:
+        for col in data_records.columns:
             attributes[col] = st.text_input(f"Enter value for {col}:")
         
         if st.button("Save Feature"):
@@ -0,0 +1,116 @@
+"""Many-to-many origin-destination cost matrices over a :class:`roadnet.RoadNetwork`.
+
+Each origin gets one single-source Dijkstra over the network's CSR arrays
+(``scipy.sparse.csgraph``); origins are fanned out in chunks across a process
+pool, so a few hundred origins on a city network take seconds.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+
+CHUNK_SIZE = 32  # origins per Dijkstra batch; bounds worker memory to CHUNK_SIZE x n_nodes floats
+
+_graphs = {}
+
+
+def _init_worker(graphs):
+    _graphs.update(graphs)
+
+
+def _solve_chunk(weight, sources, targets):
+    dist = dijkstra(_graphs[weight], directed=True, indices=sources)
+    return dist[:, targets]
+
+
+class ODMatrix:
+    """Dense distance (m), travel time (s) and fare matrices between node positions."""
+
+    def __init__(self, origins, destinations, distance, travel_time, fare_per_km):
+        self.origins = origins
+        self.destinations = destinations
+        self.distance = distance
+        self.travel_time = travel_time
+        self.fare_per_km = fare_per_km
+
+    @property
+    def cost(self):
+        return self.distance / 1000.0 * self.fare_per_km
+
+    def to_frame(self, origin_labels=None, destination_labels=None):
+        """Long-format table with one row per origin-destination pair."""
+        origin_labels = self.origins if origin_labels is None else origin_labels
+        destination_labels = self.destinations if destination_labels is None else destination_labels
+        n_o, n_d = self.distance.shape
+        return pd.DataFrame({
+            "origin": np.repeat(np.asarray(origin_labels), n_d),
+            "destination": np.tile(np.asarray(destination_labels), n_o),
+            "distance_km": self.distance.ravel() / 1000.0,
+            "travel_time_min": self.travel_time.ravel() / 60.0,
+            "cost": self.cost.ravel(),
+        })
+
+
+def cost_matrix(network, origins, destinations, weight="length", workers=None):
+    """Shortest-path cost from every origin to every destination node position.
+
+    Searches run from whichever side has fewer distinct nodes (backwards over the
+    reversed graph when that is the destinations), and duplicate nodes are solved
+    once. Unreachable pairs are ``inf``.
+    """
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    unique_origins, origin_inverse = np.unique(origins, return_inverse=True)
+    unique_destinations, destination_inverse = np.unique(destinations, return_inverse=True)
+    backward = len(unique_destinations) < len(unique_origins)
+    if backward:
+        key, graph = weight + ":reversed", network.csr(weight).T.tocsr()
+        sources, targets = unique_destinations, unique_origins
+    else:
+        key, graph = weight, network.csr(weight)
+        sources, targets = unique_origins, unique_destinations
+    chunks = [sources[i:i + CHUNK_SIZE] for i in range(0, len(sources), CHUNK_SIZE)]
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers <= 1 or len(chunks) <= 1:
+        _graphs[key] = graph
+        parts = [_solve_chunk(key, chunk, targets) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_worker, initargs=({key: graph},)) as pool:
+            parts = list(pool.map(_solve_chunk, [key] * len(chunks), chunks, [targets] * len(chunks)))
+
+    matrix = np.vstack(parts) if parts else np.empty((0, len(targets)))
+    if backward:
+        matrix = matrix.T
+    return matrix[origin_inverse][:, destination_inverse]
+
+
+def od_matrix(network, origins, destinations, fare_per_km, workers=None):
+    """Distance, travel-time and fare matrices between origin and destination node positions.
+
+    Distance and travel time are each minimised separately (shortest vs fastest route).
+    """
+    distance = cost_matrix(network, origins, destinations, "length", workers)
+    travel_time = cost_matrix(network, origins, destinations, "travel_time", workers)
+    return ODMatrix(np.asarray(origins), np.asarray(destinations), distance, travel_time, fare_per_km)
+
+
+def shortest_path_tree(network, origin, weight="length"):
+    """Predecessor array of the shortest-path tree rooted at node position ``origin``."""
+    _, predecessors = dijkstra(network.csr(weight), directed=True, indices=int(origin), return_predecessors=True)
+    return predecessors
+
+
+def tree_path(predecessors, origin, destination):
+    """Node positions from ``origin`` to ``destination`` in its tree, or ``[]`` if unreachable."""
+    path = [int(destination)]
+    while path[-1] != origin:
+        previous = predecessors[path[-1]]
+        if previous < 0:
+            return []
+        path.append(int(previous))
+    path.reverse()
+    return path
@@ -0,0 +1,119 @@
+"""Append-optimized in-memory record table.
+
+Submitted rows are appended to a short Python list in O(1). Every
+``chunk_rows`` rows the list is turned into one columnar chunk (a DataFrame).
+The full DataFrame is only materialized when something asks for it
+(display, export, charts) and stays cached until the next append; the
+chunks are consolidated into it at that point, so later materializations
+only concatenate what was added since.
+
+``fieldstore.Dataset`` keeps the rows it has read from the database in a
+``RecordBuffer``, so a rerun only fetches and appends the rows added since.
+"""
+import threading
+
+import pandas as pd
+
+CHUNK_ROWS = 4096
+
+
+class RecordBuffer:
+    """Append-only table of dict rows, materialized to a DataFrame on demand.
+
+    Safe to share between sessions: all methods take an internal lock.
+    """
+
+    def __init__(self, columns=(), chunk_rows=CHUNK_ROWS):
+        self.columns = list(columns)
+        self.defaults = {}
+        self.chunk_rows = chunk_rows
+        self.version = 0
+        self._chunks = []
+        self._pending = []
+        self._rows = 0
+        self._frame = None
+        self._lock = threading.RLock()
+        self._known = set(self.columns)
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def empty(self):
+        return self._rows == 0
+
+    def _flush(self):
+        self._chunks.append(pd.DataFrame.from_records(self._pending))
+        self._pending = []
+
+    def _changed(self):
+        self.version += 1
+        self._frame = None
+
+    # Writing
+
+    def append(self, row):
+        """Add one row (a dict of column -> value) in amortized O(1)."""
+        with self._lock:
+            row = dict(row)
+            new = [key for key in row if key not in self._known]
+            if new:
+                self.columns.extend(new)
+                self._known.update(new)
+            self._pending.append(row)
+            self._rows += 1
+            if len(self._pending) >= self.chunk_rows:
+                self._flush()
+            self._changed()
+
+    def extend(self, rows):
+        """Append many rows, given as dicts or as a DataFrame."""
+        with self._lock:
+            if isinstance(rows, pd.DataFrame):
+                rows = rows.to_dict("records")
+            for row in rows:
+                self.append(row)
+
+    def add_column(self, name, default=""):
+        """Add a column; rows that do not set it read as ``default``."""
+        with self._lock:
+            if name not in self._known:
+                self.columns.append(name)
+                self._known.add(name)
+            self.defaults[name] = default
+            self._changed()
+
+    def replace(self, frame):
+        """Replace all rows (and the column list) with ``frame``."""
+        with self._lock:
+            self.clear()
+            self.columns = [str(column) for column in frame.columns]
+            self.defaults = {}
+            self._known = set(self.columns)
+            self._chunks = [frame.reset_index(drop=True)]
+            self._rows = len(frame)
+            self._changed()
+
+    def clear(self):
+        """Remove all rows, keeping the column list."""
+        with self._lock:
+            self._chunks, self._pending, self._rows = [], [], 0
+            self._changed()
+
+    # Reading
+
+    def frame(self):
+        """All rows as a DataFrame (cached until the next change; treat it as read-only)."""
+        with self._lock:
+            if self._frame is None:
+                pieces = self._chunks + ([pd.DataFrame.from_records(self._pending)] if self._pending else [])
+                pieces = [piece for piece in pieces if len(piece.columns)]
+                frame = pd.concat(pieces, ignore_index=True) if pieces else pd.DataFrame()
+                frame = frame.reindex(columns=self.columns)
+                for column, default in self.defaults.items():
+                    if column in frame:
+                        frame[column] = frame[column].fillna(default)
+                # Later materializations start from this one: keep it as the only chunk in memory
+                self._chunks = [frame.iloc[:len(frame) - len(self._pending)]] if len(frame) else []
+                self._frame = frame
+            return self._frame
@@ -0,0 +1,277 @@
+"""Disk-backed road network store for the GIS tools.
+
+A network is built once from a local OSM extract (GraphML, .osm XML or .pbf),
+or downloaded with OSMnx when no extract is given, and written to a cache
+directory as plain ``.npy`` arrays. Later loads memory-map those arrays, so a
+warm start costs milliseconds instead of a full download and rebuild.
+
+The cache entry is keyed on the place name, the network type and a hash of
+the source file, so replacing the extract invalidates it automatically.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get("ROADNET_CACHE_DIR", ".roadnet_cache")
+
+_ARRAYS = ("node_ids", "x", "y", "indptr", "edge_v", "length", "travel_time")
+EARTH_RADIUS_M = 6371008.8
+
+
+def unit_vectors(lon, lat):
+    """Project lon/lat degrees onto the unit sphere, where chord length orders like great-circle distance."""
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class SnapIndex:
+    """KD-tree over the network nodes for vectorized nearest-node snapping."""
+
+    def __init__(self, x, y):
+        from scipy.spatial import cKDTree
+
+        self.tree = cKDTree(unit_vectors(x, y))
+
+    def query(self, lon, lat, return_dist=False):
+        """Nearest node position for every (lon, lat) pair, optionally with the distance in metres."""
+        chord, pos = self.tree.query(unit_vectors(lon, lat), k=1, workers=-1)
+        if return_dist:
+            return pos, 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(chord / 2, 1.0))
+        return pos
+
+
+class RoadNetwork:
+    """Road graph held as flat node and edge arrays.
+
+    Nodes are addressed by position (0..n-1); ``node_ids`` maps positions back
+    to OSM node ids. Edges are sorted by source node so that ``indptr`` /
+    ``edge_v`` form a CSR adjacency. Parallel edges are collapsed to the
+    cheapest one for each weight and self-loops are dropped, which leaves all
+    shortest paths unchanged.
+    """
+
+    def __init__(self, node_ids, x, y, indptr, edge_v, length, travel_time, key=None, path=None):
+        self.node_ids = node_ids
+        self.x = x
+        self.y = y
+        self.indptr = indptr
+        self.edge_v = edge_v
+        self.length = length
+        self.travel_time = travel_time
+        self.key = key
+        self.path = path
+        self._csr = {}
+        self._graph = None
+        self._positions = None
+        self._snap_index = None
+
+    @property
+    def n_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.edge_v)
+
+    @property
+    def edge_u(self):
+        """Source node position of every edge."""
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    def positions(self, node_ids):
+        """Map OSM node ids to node positions."""
+        if self._positions is None:
+            self._positions = {int(n): i for i, n in enumerate(self.node_ids)}
+        return np.array([self._positions[int(n)] for n in np.atleast_1d(node_ids)], dtype=np.int64)
+
+    @property
+    def snap_index(self):
+        """Nearest-node index, built on first use."""
+        if self._snap_index is None:
+            self._snap_index = SnapIndex(self.x, self.y)
+        return self._snap_index
+
+    def nearest_nodes(self, lon, lat, return_dist=False):
+        """Snap arrays of coordinates to node positions in a single query (note: lon first, like ``x, y``)."""
+        return self.snap_index.query(lon, lat, return_dist=return_dist)
+
+    def csr(self, weight="length"):
+        """Return the adjacency as a ``scipy.sparse.csr_matrix`` weighted by ``weight``."""
+        if weight not in self._csr:
+            from scipy.sparse import csr_matrix
+
+            data = np.asarray(getattr(self, weight), dtype=np.float64)
+            self._csr[weight] = csr_matrix(
+                (data, np.asarray(self.edge_v), np.asarray(self.indptr)),
+                shape=(self.n_nodes, self.n_nodes),
+            )
+        return self._csr[weight]
+
+    @property
+    def graph(self):
+        """NetworkX view of the network, keyed by OSM node id (built lazily)."""
+        if self._graph is None:
+            import networkx as nx
+
+            G = nx.DiGraph()
+            G.add_nodes_from(
+                (int(n), {"x": float(x), "y": float(y)})
+                for n, x, y in zip(self.node_ids, self.x, self.y)
+            )
+            ids = np.asarray(self.node_ids)
+            G.add_edges_from(
+                (int(u), int(v), {"length": float(length), "travel_time": float(tt)})
+                for u, v, length, tt in zip(ids[self.edge_u], ids[self.edge_v], self.length, self.travel_time)
+            )
+            self._graph = G
+        return self._graph
+
+    @classmethod
+    def from_graph(cls, G, key=None):
+        """Build the array representation of an OSMnx (Multi)DiGraph."""
+        node_ids = np.fromiter(G.nodes, dtype=np.int64, count=len(G))
+        position = {n: i for i, n in enumerate(G.nodes)}
+        x = np.array([d["x"] for _, d in G.nodes(data=True)], dtype=np.float64)
+        y = np.array([d["y"] for _, d in G.nodes(data=True)], dtype=np.float64)
+
+        u, v, length, travel_time = [], [], [], []
+        for a, b, d in G.edges(data=True):
+            if a == b:
+                continue
+            u.append(position[a])
+            v.append(position[b])
+            length.append(d.get("length", np.nan))
+            travel_time.append(d.get("travel_time", np.nan))
+        return cls.from_edges(
+            node_ids, x, y,
+            np.array(u, dtype=np.int64), np.array(v, dtype=np.int64),
+            np.array(length, dtype=np.float64), np.array(travel_time, dtype=np.float64),
+            key=key,
+        )
+
+    @classmethod
+    def from_edges(cls, node_ids, x, y, u, v, length, travel_time, key=None):
+        """Build a network from edge lists given as node positions."""
+        n = len(node_ids)
+        pair = u * n + v
+        order = np.argsort(pair, kind="stable")
+        pair = pair[order]
+        starts = np.flatnonzero(np.diff(pair, prepend=-1))
+        length = np.minimum.reduceat(length[order], starts) if len(starts) else length
+        travel_time = np.minimum.reduceat(travel_time[order], starts) if len(starts) else travel_time
+        u = u[order][starts]
+        v = v[order][starts]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=n), out=indptr[1:])
+        return cls(node_ids, x, y, indptr, v.astype(np.int32), length, travel_time, key=key)
+
+    def save(self, path):
+        """Write the arrays to ``path`` atomically."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            for name in _ARRAYS:
+                np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(self, name)))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"format": FORMAT_VERSION, "key": self.key,
+                           "n_nodes": self.n_nodes, "n_edges": self.n_edges}, f)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a network previously written with :meth:`save`."""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported road network cache format in {path}")
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in _ARRAYS}
+        return cls(key=meta["key"], path=path, **arrays)
+
+
+def file_digest(path, cache_dir=DEFAULT_CACHE_DIR):
+    """SHA-256 of a source file, memoised on (path, size, mtime) to skip re-hashing big extracts."""
+    stat = os.stat(path)
+    stamp = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+    memo = os.path.join(cache_dir, "digests.json")
+    try:
+        with open(memo) as f:
+            digests = json.load(f)
+    except (OSError, ValueError):
+        digests = {}
+    entry = digests.get(stamp["path"])
+    if entry and entry["size"] == stamp["size"] and entry["mtime"] == stamp["mtime"]:
+        return entry["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digests[stamp["path"]] = dict(stamp, sha256=h.hexdigest())
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(memo, "w") as f:
+        json.dump(digests, f)
+    return h.hexdigest()
+
+
+def cache_key(place, source=None, network_type="drive", cache_dir=DEFAULT_CACHE_DIR):
+    """Cache key for a place built from ``source`` (``None`` means an OSMnx download)."""
+    source_hash = file_digest(source, cache_dir) if source else "download"
+    raw = json.dumps([FORMAT_VERSION, place, network_type, source_hash])
+    slug = re.sub(r"[^a-z0-9]+", "-", place.lower()).strip("-")
+    return f"{slug}-{hashlib.sha256(raw.encode()).hexdigest()[:16]}"
+
+
+def read_graph(place, source=None, network_type="drive"):
+    """Build an OSMnx graph with edge travel times from a local extract or a download."""
+    import osmnx as ox
+
+    if source is None:
+        G = ox.graph_from_place(place, network_type=network_type)
+    elif source.endswith(".graphml"):
+        G = ox.load_graphml(source)
+    elif source.endswith((".osm", ".xml")):
+        G = ox.graph_from_xml(source)
+    elif source.endswith(".pbf"):
+        try:
+            import pyrosm
+        except ImportError as e:
+            raise ImportError("Reading .pbf extracts requires the 'pyrosm' package") from e
+        osm = pyrosm.OSM(source)
+        nodes, edges = osm.get_network(network_type="driving" if network_type == "drive" else network_type, nodes=True)
+        G = osm.to_graph(nodes, edges, graph_type="networkx")
+    else:
+        raise ValueError(f"Unsupported OSM extract: {source}")
+
+    routing = getattr(ox, "routing", ox)
+    G = routing.add_edge_speeds(G)
+    G = routing.add_edge_travel_times(G)
+    return G
+
+
+def load_network(place, source=None, network_type="drive", cache_dir=DEFAULT_CACHE_DIR):
+    """Load the road network for ``place``, building and caching it on first use."""
+    key = cache_key(place, source, network_type, cache_dir)
+    path = os.path.join(cache_dir, key)
+    if os.path.isfile(os.path.join(path, "meta.json")):
+        try:
+            return RoadNetwork.load(path)
+        except (OSError, ValueError):
+            pass
+    network = RoadNetwork.from_graph(read_graph(place, source, network_type), key=key)
+    network.save(path)
+    return RoadNetwork.load(path)
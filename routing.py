@@ -0,0 +1,139 @@
+"""Point-to-point routing backends for a :class:`roadnet.RoadNetwork`.
+
+``DijkstraRouter`` is the reference: plain NetworkX Dijkstra, exactly what the
+route layer has always run. ``ALTRouter`` answers the same queries with A*
+guided by landmark distance bounds (ALT). Its preprocessing, one forward and
+one backward Dijkstra per landmark, is saved next to the cached network so it
+is paid once per graph version.
+
+Both return ``(cost, path)`` with ``path`` as node positions, and
+``(inf, [])`` when the destination is unreachable.
+"""
+import functools
+import heapq
+import math
+import os
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+N_LANDMARKS = 16
+HEURISTIC_CACHE_SIZE = 64  # destinations whose bound vectors are kept; facility destinations repeat
+
+
+class DijkstraRouter:
+    """Reference backend: NetworkX Dijkstra over the network's graph view."""
+
+    name = "dijkstra"
+
+    def __init__(self, network, weight="length"):
+        self.network = network
+        self.weight = weight
+
+    def route(self, origin, destination):
+        import networkx as nx
+
+        ids = self.network.node_ids
+        try:
+            path = nx.shortest_path(self.network.graph, int(ids[origin]), int(ids[destination]), weight=self.weight)
+        except nx.NetworkXNoPath:
+            return math.inf, []
+        cost = nx.path_weight(self.network.graph, path, self.weight)
+        return cost, self.network.positions(path).tolist()
+
+
+def select_landmarks(graph, k, seed=0):
+    """Pick ``k`` landmarks by farthest-point selection; returns them with their forward distances."""
+    n = graph.shape[0]
+    start = np.random.default_rng(seed).integers(n)
+    first = dijkstra(graph, directed=True, indices=start)
+    candidate = int(np.argmax(np.where(np.isfinite(first), first, -1)))
+    landmarks, rows = [], []
+    nearest = np.full(n, np.inf)
+    for _ in range(min(k, n)):
+        landmarks.append(candidate)
+        rows.append(dijkstra(graph, directed=True, indices=candidate))
+        nearest = np.minimum(nearest, rows[-1])
+        candidate = int(np.argmax(np.where(np.isfinite(nearest), nearest, -1)))
+    return np.array(landmarks), np.vstack(rows)
+
+
+class ALTRouter:
+    """A* search with landmark (ALT) lower bounds; exact, like Dijkstra."""
+
+    name = "alt"
+
+    def __init__(self, network, weight="length", n_landmarks=N_LANDMARKS):
+        self.network = network
+        self.weight = weight
+        self.from_landmark, self.to_landmark = self._landmark_distances(n_landmarks)
+        graph = network.csr(weight)
+        self._indptr = graph.indptr.tolist()
+        self._targets = graph.indices.tolist()
+        self._costs = graph.data.tolist()
+        self.heuristic = functools.lru_cache(maxsize=HEURISTIC_CACHE_SIZE)(self.heuristic)
+
+    def _landmark_distances(self, k):
+        path = None
+        if self.network.path:
+            path = os.path.join(self.network.path, f"alt-{self.weight}-{k}.npy")
+            if os.path.isfile(path):
+                both = np.load(path, mmap_mode="r")
+                return both[0], both[1]
+
+        graph = self.network.csr(self.weight)
+        landmarks, forward = select_landmarks(graph, k)
+        backward = dijkstra(graph.T.tocsr(), directed=True, indices=landmarks)
+        both = np.stack([forward, backward])
+        if path:
+            tmp = path + ".tmp.npy"
+            np.save(tmp, both)
+            os.replace(tmp, path)
+        return both[0], both[1]
+
+    def heuristic(self, destination):
+        """Lower bound on the cost from every node to ``destination``."""
+        with np.errstate(invalid="ignore"):
+            ahead = self.from_landmark[:, destination][:, None] - self.from_landmark
+            behind = self.to_landmark - self.to_landmark[:, destination][:, None]
+            bound = np.fmax(ahead, behind).max(axis=0)
+        bound[~np.isfinite(bound)] = 0.0
+        # Shave rounding error so the bound stays admissible and results match Dijkstra exactly
+        return np.maximum(bound * (1 - 1e-9), 0.0).tolist()
+
+    def route(self, origin, destination):
+        origin, destination = int(origin), int(destination)
+        h = self.heuristic(destination)
+        indptr, targets, costs = self._indptr, self._targets, self._costs
+        g = {origin: 0.0}
+        parent = {origin: -1}
+        heap = [(h[origin], origin)]
+        while heap:
+            f, u = heapq.heappop(heap)
+            gu = g[u]
+            if f > gu + h[u]:
+                continue  # stale entry
+            if u == destination:
+                path = [u]
+                while parent[path[-1]] >= 0:
+                    path.append(parent[path[-1]])
+                return gu, path[::-1]
+            for i in range(indptr[u], indptr[u + 1]):
+                v = targets[i]
+                gv = gu + costs[i]
+                if gv < g.get(v, math.inf):
+                    g[v] = gv
+                    parent[v] = u
+                    heapq.heappush(heap, (gv + h[v], v))
+        return math.inf, []
+
+
+ROUTERS = {ALTRouter.name: ALTRouter, DijkstraRouter.name: DijkstraRouter}
+
+
+def get_router(network, backend="alt", weight="length"):
+    """Instantiate the routing backend registered as ``backend``."""
+    try:
+        return ROUTERS[backend](network, weight=weight)
+    except KeyError:
+        raise ValueError(f"Unknown routing backend '{backend}', expected one of {sorted(ROUTERS)}") from None
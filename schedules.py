@@ -0,0 +1,121 @@
+"""Indexed bus-schedule queries.
+
+The schedule is sorted once by (boarding point, dropping point, departure
+time), with towns stored as categorical codes and times as minutes after
+midnight. Every pair lookup and "next N departures after T" query is then a
+pair of binary searches instead of a scan over the whole table.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p")
+MIN_TRANSFER_MIN = 15
+
+
+def to_minutes(values):
+    """Minutes after midnight for clock-time strings (or datetimes); NaN where unparseable.
+
+    Each distinct value is parsed once, so millions of rows with a few hundred
+    distinct times parse in milliseconds.
+    """
+    codes, uniques = pd.factorize(pd.Series(values).astype(str).str.strip())
+    for fmt in TIME_FORMATS:
+        parsed = pd.to_datetime(pd.Series(uniques), format=fmt, errors="coerce")
+        if parsed.notna().all():
+            break
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques), errors="coerce")
+    minutes = (parsed.dt.hour * 60 + parsed.dt.minute).to_numpy(dtype=np.float64)
+    return np.where(codes >= 0, minutes[codes], np.nan)
+
+
+def _clock(value):
+    if isinstance(value, (datetime.time, datetime.datetime)):
+        return value.hour * 60 + value.minute
+    if isinstance(value, str):
+        return to_minutes([value])[0]
+    return float(value)
+
+
+class ScheduleIndex:
+    """Sorted, categorical-coded view of a bus schedule with ``boarding_point``,
+    ``dropping_point`` and ``departure_time`` columns (``arrival_time`` optional,
+    needed for transfers)."""
+
+    def __init__(self, schedules, towns=()):
+        towns = pd.Index(list(dict.fromkeys(
+            list(towns) + pd.unique(schedules[["boarding_point", "dropping_point"]].to_numpy().ravel()).tolist())))
+        self.towns = towns
+        boarding = pd.Categorical(schedules["boarding_point"], categories=towns)
+        dropping = pd.Categorical(schedules["dropping_point"], categories=towns)
+        departure = to_minutes(schedules["departure_time"])
+
+        pair = boarding.codes.astype(np.int64) * len(towns) + dropping.codes
+        order = np.lexsort((departure, pair))
+        self.frame = schedules.iloc[order].reset_index(drop=True).assign(
+            boarding_point=boarding[order], dropping_point=dropping[order])
+        self.pair = pair[order]
+        self.departure = departure[order]
+        self.arrival = to_minutes(self.frame["arrival_time"]) if "arrival_time" in self.frame else None
+
+        # Direct links, for finding transfer towns
+        links = np.unique(self.pair)
+        self.next_towns = pd.Series(links % len(towns)).groupby(links // len(towns)).agg(set).to_dict()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _range(self, origin, destination):
+        if origin not in self.towns or destination not in self.towns:
+            return 0, 0
+        key = self.towns.get_loc(origin) * len(self.towns) + self.towns.get_loc(destination)
+        return np.searchsorted(self.pair, key, "left"), np.searchsorted(self.pair, key, "right")
+
+    def _after(self, origin, destination, after):
+        lo, hi = self._range(origin, destination)
+        return lo + np.searchsorted(self.departure[lo:hi], after, "left"), hi
+
+    def buses(self, origin, destination):
+        """All departures from ``origin`` to ``destination`` in departure order."""
+        lo, hi = self._range(origin, destination)
+        return self.frame.iloc[lo:hi]
+
+    def next_departures(self, origin, destination, after, n=5):
+        """The first ``n`` direct departures at or after clock time ``after``."""
+        lo, hi = self._after(origin, destination, _clock(after))
+        return self.frame.iloc[lo:min(hi, lo + n)]
+
+    def connections(self, origin, destination, after, n=5, min_transfer=MIN_TRANSFER_MIN):
+        """Up to ``n`` one-transfer journeys leaving at or after ``after``, earliest arrival first."""
+        if self.arrival is None:
+            raise ValueError("Transfers need an 'arrival_time' column in the schedule")
+        if origin not in self.towns or destination not in self.towns:
+            return pd.DataFrame()
+        after = _clock(after)
+        o, d = self.towns.get_loc(origin), self.towns.get_loc(destination)
+        journeys = []
+        for via in self.next_towns.get(o, ()):
+            if via in (o, d) or d not in self.next_towns.get(via, ()):
+                continue
+            lo, hi = self._after(origin, self.towns[via], after)
+            for first in range(lo, min(hi, lo + n)):
+                arrive = self.arrival[first]
+                if np.isnan(arrive) or arrive < self.departure[first]:
+                    continue  # skip legs without arrival times or arriving after midnight
+                lo2, hi2 = self._after(self.towns[via], destination, arrive + min_transfer)
+                # A later onward bus can arrive earlier: take the earliest valid arrival, not the first departure
+                onward = self.arrival[lo2:hi2]
+                onward = np.where(onward >= self.departure[lo2:hi2], onward, np.inf)  # NaN compares False
+                if len(onward) and np.isfinite(onward.min()):
+                    second = lo2 + int(np.argmin(onward))
+                    journeys.append((self.arrival[second], first, second))
+        journeys.sort()
+        rows = []
+        for _, first, second in journeys[:n]:
+            a, b = self.frame.iloc[first], self.frame.iloc[second]
+            rows.append({"boarding_point": origin, "transfer_at": a["dropping_point"], "dropping_point": destination,
+                         "departure_time": a["departure_time"], "transfer_arrival": a["arrival_time"],
+                         "transfer_departure": b["departure_time"], "arrival_time": b["arrival_time"]})
+        return pd.DataFrame(rows)
@@ -0,0 +1,224 @@
+"""N-gram search index over facility names.
+
+Every lower-cased name is cut into character trigrams and bigrams. Each gram
+is packed into one integer from its Unicode code points, and the index keeps,
+per distinct gram, a sorted slice of row positions (a CSR-style posting
+list). The whole build is vectorized with NumPy.
+
+A substring query keeps only the rows present in the posting list of every
+gram of the query, starting from the rarest. Candidates are ranked (prefix
+matches, then shorter names, then row order) and verified lazily, so a top-k
+query stops after ``k`` confirmed hits. Fuzzy ranking scores names by shared
+trigrams, then by ``difflib`` similarity.
+
+Category columns are pre-split into row-position arrays (``groups``), so a
+filter is an array lookup rather than a boolean mask over the frame.
+"""
+import difflib
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 50_000  # names encoded per block while building, bounds peak memory
+VERIFY_BELOW = 64  # stop intersecting posting lists once this few candidates are left
+FUZZY_CANDIDATES = 200  # best trigram-overlap candidates re-ranked by difflib
+_BITS = 21  # Unicode code points fit in 21 bits, so three fit in one int64
+
+
+def _gram_keys(codes, size):
+    """Packed keys of all ``size``-grams in an (n, width) code-point matrix, plus a validity mask."""
+    width = codes.shape[1] - size + 1
+    keys = np.zeros((codes.shape[0], max(width, 0)), dtype=np.int64)
+    for offset in range(size):
+        keys = (keys << _BITS) | codes[:, offset:offset + width]
+    return keys, codes[:, size - 1:size - 1 + width] != 0
+
+
+def _encode(text, size):
+    codes = np.array([ord(c) for c in text], dtype=np.int64)[None, :]
+    keys, _ = _gram_keys(codes, size)
+    return np.unique(keys[0])
+
+
+def _members(values, sorted_rows):
+    """Mask of ``values`` present in the sorted array ``sorted_rows`` (binary search per value)."""
+    if not len(sorted_rows):
+        return np.zeros(len(values), dtype=bool)
+    hit = np.searchsorted(sorted_rows, values)
+    return sorted_rows[np.minimum(hit, len(sorted_rows) - 1)] == values
+
+
+class _Postings:
+    """Sorted distinct gram keys with the row positions of each gram."""
+
+    def __init__(self, names, size):
+        key_parts, row_parts = [], []
+        for start in range(0, len(names), BLOCK_ROWS):
+            block = np.array(names[start:start + BLOCK_ROWS], dtype=str)
+            if block.dtype.itemsize == 0:
+                continue
+            codes = block.view(np.uint32).reshape(len(block), -1).astype(np.int64)
+            keys, valid = _gram_keys(codes, size)
+            rows = np.broadcast_to(np.arange(start, start + len(block), dtype=np.int32)[:, None], keys.shape)
+            key_parts.append(keys[valid])
+            row_parts.append(rows[valid])
+        keys = np.concatenate(key_parts) if key_parts else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32)
+
+        # Hash the wide keys down to dense ids (in key order), then one plain
+        # sort of (id << 32 | row) groups rows by gram and orders them
+        ids, uniques = pd.factorize(keys)
+        order = np.argsort(uniques)
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[order] = np.arange(len(uniques))
+        pairs = np.sort((rank[ids] << 32) | rows)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        gram = pairs >> 32
+        starts = np.flatnonzero(np.r_[True, gram[1:] != gram[:-1]]) if len(pairs) else np.empty(0, dtype=np.int64)
+        self.keys = uniques[order]
+        self.indptr = np.r_[starts, len(pairs)]
+        self.rows = (pairs & 0xFFFFFFFF).astype(np.int32)
+
+    def get(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.rows[:0]
+        return self.rows[self.indptr[i]:self.indptr[i + 1]]
+
+
+class NameIndex:
+    """Substring / fuzzy index over ``names``, with optional ``{value: positions}`` groups."""
+
+    def __init__(self, names, groups=None):
+        self.names = ["" if name is None or name != name else str(name).lower() for name in names]
+        self.lengths = np.fromiter(map(len, self.names), dtype=np.int64, count=len(self.names))
+        # First three code points of every name (0-padded) packed into one key, for the prefix rank
+        heads = np.array([name[:3] for name in self.names], dtype="<U3").view(np.uint32).reshape(-1, 3)
+        self.heads, _ = _gram_keys(heads.astype(np.int64), 3)
+        self.heads = self.heads[:, 0]
+        self.trigrams = _Postings(self.names, 3)
+        self.bigrams = _Postings(self.names, 2)
+        self.groups = {key: np.asarray(rows, dtype=np.int64) for key, rows in (groups or {}).items()}
+
+    @classmethod
+    def from_frame(cls, frame, name_column="name", group_column=None):
+        groups = frame.groupby(group_column, observed=True).indices if group_column else None
+        return cls(frame[name_column].tolist(), groups)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query):
+        """Sorted row positions containing every gram of ``query`` (a superset of the matches)."""
+        if len(query) < 2:
+            return np.arange(len(self.names))
+        postings = self.trigrams if len(query) >= 3 else self.bigrams
+        lists = sorted((postings.get(key) for key in _encode(query, 3 if len(query) >= 3 else 2)), key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if len(candidates) <= VERIFY_BELOW:
+                break
+            candidates = self._intersect(candidates, rows)
+        return candidates.astype(np.int64)
+
+    def _intersect(self, candidates, rows):
+        """Sorted ``candidates`` that also appear in the sorted ``rows``."""
+        if len(candidates) * 16 < len(rows):
+            # Few candidates against a long list: binary search each one
+            return candidates[_members(candidates, rows)]
+        mask = np.zeros(len(self.names), dtype=bool)
+        mask[rows] = True
+        return candidates[mask[candidates]]
+
+    def _ranked(self, candidates, query, k=None):
+        """``candidates`` ordered prefix matches first, then shorter (closer) names, then row order.
+
+        With ``k``, only a head of the ordering large enough to hold ``k``
+        verified matches in the common case is sorted; the rest is sorted only
+        if iteration gets that far.
+        """
+        shift = _BITS * max(3 - len(query), 0)
+        prefix = _encode(query[:3], len(query[:3]))[0] if query else 0
+        rank = (self.lengths[candidates] << 32) | candidates
+        rank[(self.heads[candidates] >> shift) != prefix] |= 1 << 62
+        ordered = self._sorted(candidates, rank, k)
+        if len(query) <= 3:
+            yield from ordered
+            return
+        # Names sharing the query's first three characters come first and are
+        # checked in full as iteration reaches them; the ones that do not start
+        # with the query are merged back among the others
+        demoted = []
+        for i in ordered:
+            if self.heads[i] != prefix:
+                rest = [i]
+                break
+            if self.names[i].startswith(query):
+                yield i
+            else:
+                demoted.append(i)
+        else:
+            rest = []
+        yield from heapq.merge(demoted, itertools.chain(rest, ordered), key=lambda i: (self.lengths[i], i))
+
+    def _sorted(self, candidates, rank, k):
+        head = max(4 * k, 256) if k is not None else len(rank)
+        if head >= len(rank):
+            yield from candidates[np.argsort(rank)].tolist()
+            return
+        part = np.argpartition(rank, head)
+        for chunk in (part[:head], part[head:]):
+            yield from candidates[chunk[np.argsort(rank[chunk])]].tolist()
+
+    def contains(self, query):
+        """Row positions whose name contains ``query`` (case-insensitive), in row order."""
+        query = query.lower()
+        return np.array([i for i in self._candidates(query).tolist() if query in self.names[i]], dtype=np.int64)
+
+    def fuzzy(self, query, k=10):
+        """Up to ``k`` positions of the names most similar to ``query``."""
+        query = query.lower()
+        if len(query) < 3:
+            return np.empty(0, dtype=np.int64)
+        lists = [self.trigrams.get(key) for key in _encode(query, 3)]
+        hits = np.concatenate(lists)
+        if not len(hits):
+            return np.empty(0, dtype=np.int64)
+        overlap = np.bincount(hits, minlength=len(self.names))
+        top = min(FUZZY_CANDIDATES, np.count_nonzero(overlap))
+        candidates = np.argpartition(-overlap, top - 1)[:top]
+        scored = sorted(candidates.tolist(),
+                        key=lambda i: -difflib.SequenceMatcher(None, query, self.names[i]).ratio())
+        return np.array(scored[:k], dtype=np.int64)
+
+    def search(self, query, k=None, fuzzy=False, group=None):
+        """Ranked row positions for ``query``, optionally limited to one group.
+
+        Substring matches come first; with ``fuzzy`` and a ``k``, the list is
+        topped up with the closest non-matching names until it has ``k`` entries.
+        """
+        query = query.strip().lower()
+        candidates = self._candidates(query)
+        if group is not None:
+            candidates = self._intersect(candidates, self.group(group))
+        ranked = []
+        for i in self._ranked(candidates, query, k):
+            if query in self.names[i]:
+                ranked.append(i)
+                if k is not None and len(ranked) >= k:
+                    break
+        if fuzzy and k is not None and len(ranked) < k:
+            members = None if group is None else set(self.group(group).tolist())
+            seen = set(ranked)
+            for i in self.fuzzy(query, k=FUZZY_CANDIDATES).tolist():
+                if len(ranked) >= k:
+                    break
+                if i not in seen and (members is None or i in members):
+                    ranked.append(i)
+        return np.array(ranked, dtype=np.int64)
+
+    def group(self, value):
+        """Row positions of one group (e.g. one ``operator_type``)."""
+        return self.groups.get(value, np.empty(0, dtype=np.int64))
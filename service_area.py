@@ -0,0 +1,143 @@
+"""Network service areas (isochrones) around facilities.
+
+A bounded Dijkstra from the facility node finds everything reachable within
+the largest cut-off. The reachable edges of each cut-off band, with partially
+covered edges clipped at the cut-off, are turned into a polygon: a buffered
+concave hull by default (fast), or the union of the buffered edges themselves
+(more detailed, but seconds for large bands).
+
+Polygons are cached on disk next to the network, keyed by facility node,
+weight, cut-off, method and buffer width, so they are reused for as long as the graph
+version does not change. ``batch_service_areas`` fills that cache for many
+facilities in parallel, e.g. overnight for a whole county.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+import shapely.affinity
+from scipy.sparse.csgraph import dijkstra
+
+DISTANCE_CUTOFFS = (1000, 3000, 5000, 10000)  # metres, for weight='length'
+DRIVE_TIME_CUTOFFS = (300, 600, 900, 1800)  # seconds, for weight='travel_time'
+BUFFER_M = 75
+
+_network = None
+
+
+def _projection(lat):
+    """Metres per degree of longitude and latitude around ``lat``."""
+    return 111320.0 * np.cos(np.radians(lat)), 110540.0
+
+
+def reachable_costs(network, sources, cutoff, weight="length"):
+    """Cost from the nearest of ``sources`` to every node, ``inf`` beyond ``cutoff``."""
+    return dijkstra(network.csr(weight), directed=True, indices=np.atleast_1d(sources),
+                    min_only=True, limit=cutoff)
+
+
+def service_area_polygon(network, costs, cutoff, weight="length", method="hull", buffer_m=BUFFER_M):
+    """Polygon (lon/lat) covering the network reachable within ``cutoff`` given node ``costs``."""
+    if method not in ("hull", "buffer"):
+        raise ValueError(f"Unknown service area method '{method}', expected 'hull' or 'buffer'")
+    x, y = np.asarray(network.x), np.asarray(network.y)
+    inside = costs <= cutoff
+    if not inside.any():
+        return shapely.Polygon()
+    kx, ky = _projection(y[inside].mean())
+
+    u, v = network.edge_u, np.asarray(network.edge_v)
+    w = np.asarray(getattr(network, weight))
+    edges = inside[u]
+    if method == "buffer":
+        # A two-way street only needs buffering once, unless the reverse direction reaches further
+        n = network.n_nodes
+        u64, v64 = u.astype(np.int64), v.astype(np.int64)  # edge keys overflow int32 beyond ~46k nodes
+        twin = np.isin(u64 * n + v64, v64 * n + u64, assume_unique=True)
+        edges &= ~(twin & inside[v] & (u > v))
+    u, v, w = u[edges], v[edges], w[edges]
+    # Fraction of each edge covered before the budget runs out (1 for fully reachable edges)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip(np.where(w > 0, (cutoff - costs[u]) / w, 1.0), 0.0, 1.0)
+    start = np.column_stack((x[u] * kx, y[u] * ky))
+    end = start + fraction[:, None] * (np.column_stack((x[v] * kx, y[v] * ky)) - start)
+    nodes = np.column_stack((x[inside] * kx, y[inside] * ky))
+
+    if method == "hull":
+        points = shapely.multipoints(np.vstack((nodes, end)))
+        area = shapely.buffer(shapely.concave_hull(points, ratio=0.3), buffer_m, quad_segs=4)
+    else:
+        lines = shapely.linestrings(np.stack((start, end), axis=1))
+        area = shapely.union(shapely.multilinestrings(lines), shapely.multipoints(nodes))
+        area = shapely.simplify(shapely.buffer(area, buffer_m, quad_segs=2), buffer_m / 4)
+    return shapely.affinity.scale(area, 1 / kx, 1 / ky, origin=(0, 0))
+
+
+def _cache_path(network, node, cutoff, weight, method, buffer_m):
+    if not network.path:
+        return None
+    return os.path.join(network.path, "service_areas",
+                        f"{weight}-{method}-{buffer_m:g}-{int(node)}-{cutoff:g}.wkb")
+
+
+def service_areas(network, node, cutoffs=DISTANCE_CUTOFFS, weight="length", method="hull", buffer_m=BUFFER_M):
+    """Service-area polygons around node position ``node`` for each cut-off, largest first.
+
+    Uncached cut-offs share a single bounded Dijkstra.
+    """
+    cutoffs = sorted(cutoffs, reverse=True)
+    polygons, missing = {}, []
+    for cutoff in cutoffs:
+        path = _cache_path(network, node, cutoff, weight, method, buffer_m)
+        if path and os.path.isfile(path):
+            with open(path, "rb") as f:
+                polygons[cutoff] = shapely.from_wkb(f.read())
+        else:
+            missing.append(cutoff)
+
+    if missing:
+        costs = reachable_costs(network, node, max(missing), weight)
+        for cutoff in missing:
+            polygons[cutoff] = service_area_polygon(network, costs, cutoff, weight, method, buffer_m)
+            path = _cache_path(network, node, cutoff, weight, method, buffer_m)
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(shapely.to_wkb(polygons[cutoff]))
+                os.replace(path + ".tmp", path)
+    return [(cutoff, polygons[cutoff]) for cutoff in cutoffs]
+
+
+def combined_service_areas(network, nodes, cutoffs=DISTANCE_CUTOFFS, weight="length", method="hull",
+                           buffer_m=BUFFER_M):
+    """Joint coverage of several facilities: one multi-source search, one polygon per cut-off."""
+    cutoffs = sorted(cutoffs, reverse=True)
+    costs = reachable_costs(network, nodes, max(cutoffs), weight)
+    return [(cutoff, service_area_polygon(network, costs, cutoff, weight, method, buffer_m)) for cutoff in cutoffs]
+
+
+def _init_worker(network):
+    global _network
+    _network = network
+
+
+def _solve(node, cutoffs, weight, method, buffer_m):
+    return node, service_areas(_network, node, cutoffs, weight, method, buffer_m)
+
+
+def batch_service_areas(network, nodes, cutoffs=DISTANCE_CUTOFFS, weight="length", method="hull", buffer_m=BUFFER_M,
+                        workers=None):
+    """Service areas for every node in ``nodes`` across a process pool.
+
+    Returns ``{node: [(cutoff, polygon), ...]}`` and leaves every polygon in the disk cache.
+    """
+    nodes = [int(n) for n in dict.fromkeys(np.atleast_1d(nodes).tolist())]
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers <= 1 or len(nodes) <= 1:
+        return {node: service_areas(network, node, cutoffs, weight, method, buffer_m) for node in nodes}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(network,)) as pool:
+        n = len(nodes)
+        results = pool.map(_solve, nodes, [cutoffs] * n, [weight] * n, [method] * n, [buffer_m] * n,
+                           chunksize=max(1, n // (workers * 4)))
+        return dict(results)
@@ -0,0 +1,76 @@
+"""Read zipped shapefiles straight from the uploaded bytes.
+
+Nothing is extracted to disk. GDAL reads the archive through its in-memory
+``/vsimem/`` and ``/vsizip/`` filesystems (via pyogrio), so sessions never
+share files and there is no copy of the upload on disk. GDAL only finds
+shapefiles at the root of an archive. For one stored in a subfolder, or
+one of several in the same archive, the parts of that one layer are
+repacked into a small in-memory archive (stored, not recompressed).
+
+Reads can be limited to a bounding box, a subset of attribute columns or a
+number of features, so a large archive can be previewed without building
+the whole GeoDataFrame.
+"""
+import io
+import posixpath
+import zipfile
+
+import geopandas as gpd
+import pyogrio
+
+# Files that belong to one shapefile layer, by extension
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg", ".sbn", ".sbx", ".qix")
+
+
+def _open(data):
+    return zipfile.ZipFile(io.BytesIO(data) if isinstance(data, (bytes, memoryview)) else data)
+
+
+def layers(data):
+    """``{layer: [member names]}`` for every shapefile in the archive, keyed by its path without ``.shp``."""
+    with _open(data) as zf:
+        names = [info.filename for info in zf.infolist()
+                 if not info.is_dir() and not posixpath.basename(info.filename).startswith("._")]
+    stems = {posixpath.splitext(name)[0] for name in names if name.lower().endswith(".shp")}
+    found = {stem: [] for stem in sorted(stems)}
+    for name in names:
+        stem, extension = posixpath.splitext(name)
+        if stem in found and extension.lower() in SHAPEFILE_PARTS:
+            found[stem].append(name)
+    return found
+
+
+def layer_source(data, layer=None):
+    """Bytes GDAL can open for one shapefile ``layer`` (default: the only or first one).
+
+    Archives with a single shapefile at their root are passed through as-is.
+    """
+    found = layers(data)
+    if not found:
+        raise ValueError("The ZIP file does not contain a shapefile (.shp)")
+    layer = layer if layer is not None else next(iter(found))
+    if layer not in found:
+        raise ValueError(f"Shapefile '{layer}' not found in the ZIP file")
+    source = data.getvalue() if hasattr(data, "getvalue") else bytes(data)
+    if len(found) == 1 and posixpath.dirname(layer) == "":
+        return source
+
+    out = io.BytesIO()
+    with _open(source) as zf, zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as repacked:
+        for name in found[layer]:
+            repacked.writestr(posixpath.basename(name), zf.read(name))
+    return out.getvalue()
+
+
+def read_info(data, layer=None):
+    """Feature count, bounds, CRS and fields of a layer, without reading its features."""
+    return pyogrio.read_info(layer_source(data, layer))
+
+
+def read_zip(data, layer=None, bbox=None, columns=None, max_features=None):
+    """GeoDataFrame of a zipped shapefile, optionally limited to ``bbox``, ``columns`` and ``max_features``.
+
+    ``bbox`` is ``(minx, miny, maxx, maxy)`` in the layer's own CRS.
+    """
+    return gpd.read_file(layer_source(data, layer), engine="pyogrio", bbox=bbox, columns=columns,
+                         max_features=max_features)
@@ -0,0 +1,129 @@
+"""Zoom-dependent simplification of polygon/line layers for Folium rendering.
+
+Sending every vertex of detailed boundaries to the browser makes pages of
+100+ MB. A ``SimplifiedLayer`` precomputes one simplified copy of the layer
+per level in ``LEVEL_ZOOMS``, with a tolerance of ``PIXEL_TOLERANCE`` screen
+pixels at that zoom, and coordinates rounded to the same precision. The map
+then asks for the level matching its current zoom. Levels are computed from
+the finest down, each from the previous one, which is several times faster
+than simplifying the full-detail layer at every tolerance.
+
+From ``CLIP_ZOOM`` on, only the features around the current view are sent
+(the view padded by ``VIEW_PADDING`` on each side, found with an STRtree).
+The same padded area is reused while the map stays inside it.
+
+Polygon layers that form a valid coverage (no overlaps, e.g. wards or
+constituencies) are simplified with ``shapely.coverage_simplify``, so
+neighbouring polygons keep sharing their edges. Anything else falls back to
+per-geometry ``simplify(preserve_topology=True)``.
+"""
+import math
+
+import numpy as np
+import shapely
+
+LEVEL_ZOOMS = (4, 6, 8, 10, 12, 14)
+PIXEL_TOLERANCE = 0.5  # maximum deviation, in screen pixels at the level's zoom
+TILE_SIZE = 256
+CLIP_ZOOM = 10  # levels from this zoom on are clipped to the view
+VIEW_PADDING = 0.5  # fraction of the view's width/height added on every side when clipping
+
+
+def degrees_per_pixel(zoom):
+    """Width of one screen pixel in degrees of longitude at ``zoom`` (Web Mercator)."""
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def fit_zoom(bounds, width=700, height=500):
+    """Largest integer zoom at which ``bounds`` (minx, miny, maxx, maxy in degrees) fits a map of this size."""
+    minx, miny, maxx, maxy = bounds
+
+    def mercator_y(lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+    span_x = max(maxx - minx, 1e-9) / 360.0
+    span_y = max(mercator_y(maxy) - mercator_y(miny), 1e-9) / (2 * math.pi)
+    zoom = math.log2(min(width / (TILE_SIZE * span_x), height / (TILE_SIZE * span_y)))
+    return int(max(0, min(18, math.floor(zoom))))
+
+
+def is_coverage(geometries):
+    """True for non-empty polygon arrays without overlaps or gaps along shared edges."""
+    polygonal = np.isin(shapely.get_type_id(geometries), (3, 6))  # Polygon, MultiPolygon
+    return bool(len(geometries)) and bool(polygonal.all()) and bool(shapely.coverage_is_valid(geometries))
+
+
+def simplify_geometries(geometries, tolerance, coverage=None):
+    """Simplify an array of geometries, preserving shared edges when they form a polygon coverage.
+
+    ``coverage`` skips the coverage check when the caller already knows.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if coverage is None:
+        coverage = is_coverage(geometries)
+    if coverage:
+        simplified = shapely.coverage_simplify(geometries, tolerance)
+    else:
+        simplified = shapely.simplify(geometries, tolerance, preserve_topology=True)
+    decimals = max(0, math.ceil(-math.log10(tolerance)) + 1)
+    return shapely.transform(simplified, lambda coords: np.round(coords, decimals))
+
+
+class SimplifiedLayer:
+    """A GeoDataFrame in EPSG:4326 with one precomputed simplification per level zoom."""
+
+    def __init__(self, gdf, zooms=LEVEL_ZOOMS, pixel_tolerance=PIXEL_TOLERANCE):
+        if gdf.crs is None:
+            gdf = gdf.set_crs(4326)  # assume longitude/latitude, as folium.GeoJson did
+        elif gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs(4326)
+        self.frame = gdf
+        self.zooms = tuple(sorted(zooms))
+        geometries = np.asarray(gdf.geometry.array, dtype=object)
+        self.tree = shapely.STRtree(geometries)
+        coverage = is_coverage(geometries)
+        self.levels = {}
+        for zoom in reversed(self.zooms):
+            geometries = simplify_geometries(geometries, pixel_tolerance * degrees_per_pixel(zoom), coverage)
+            self.levels[zoom] = geometries
+
+    @property
+    def bounds(self):
+        return tuple(self.frame.total_bounds)
+
+    def level(self, zoom):
+        """Level used at map ``zoom``: the finest level not finer than needed (clamped to the range)."""
+        coarser = [level for level in self.zooms if level <= zoom]
+        return coarser[-1] if coarser else self.zooms[0]
+
+    def view(self, zoom, bounds=None, previous=None):
+        """``(level, clip)`` to render at map ``zoom`` showing ``bounds`` (minx, miny, maxx, maxy).
+
+        ``clip`` is ``None`` below ``CLIP_ZOOM`` (or without ``bounds``), else
+        the padded view. ``previous`` is returned unchanged while it has the
+        same level and its clip still contains ``bounds``, so panning within
+        the padded area keeps the rendered layer as it is.
+        """
+        level = self.level(zoom)
+        if level < CLIP_ZOOM or bounds is None:
+            return level, None
+        if previous is not None and previous[0] == level and previous[1] is not None:
+            minx, miny, maxx, maxy = previous[1]
+            if minx <= bounds[0] and miny <= bounds[1] and bounds[2] <= maxx and bounds[3] <= maxy:
+                return previous
+        pad_x = (bounds[2] - bounds[0]) * VIEW_PADDING
+        pad_y = (bounds[3] - bounds[1]) * VIEW_PADDING
+        return level, (bounds[0] - pad_x, bounds[1] - pad_y, bounds[2] + pad_x, bounds[3] + pad_y)
+
+    def frame_at(self, zoom, clip=None):
+        """The layer's GeoDataFrame with the geometries of the level for ``zoom``, limited to features in ``clip``."""
+        geometries = self.levels[self.level(zoom)]
+        if clip is None:
+            return self.frame.set_geometry(geometries, crs=self.frame.crs)
+        rows = np.sort(self.tree.query(shapely.box(*clip), predicate="intersects"))
+        return self.frame.iloc[rows].set_geometry(geometries[rows], crs=self.frame.crs)
+
+    def geojson(self, zoom, clip=None):
+        """GeoJSON string of the layer at ``zoom``, limited to features in ``clip``."""
+        return self.frame_at(zoom, clip).to_json(drop_id=True)
@@ -1,13 +1,56 @@
+import hashlib
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
 import folium
 from streamlit_folium import st_folium
+import ingest
+import shapezip
+import simplify
+import vectortiles
+
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+
+# Function to list the shapefiles in an uploaded ZIP, cached by its content hash
+@st.cache_data
+def list_shapefiles(file_hash, _data):
+    return list(shapezip.layers(_data))
+
+# Function to read a layer's feature count, bounds and fields without reading its features
+@st.cache_data
+def shapefile_info(file_hash, _data, layer):
+    info = shapezip.read_info(_data, layer)
+    return {"features": info["features"], "fields": list(info["fields"]),
+            "bounds": tuple(info["total_bounds"]), "crs": info["crs"]}
+
+# Function to parse a shapefile from the ZIP bytes, cached per file, layer, bounding box and columns
+@st.cache_data
+def load_shapefile(file_hash, _data, layer, bbox=None, columns=None):
+    return shapezip.read_zip(_data, layer, bbox=bbox, columns=columns)
+
+# Function to precompute the zoom-level simplifications of a loaded layer
+@st.cache_resource
+def load_render_layer(layer_key, _gdf):
+    return simplify.SimplifiedLayer(_gdf)
+
+# Function to cut a loaded layer into vector tiles under static/, written once per layer
+@st.cache_resource
+def load_vector_tiles(layer_key, _render_layer):
+    tile_key = hashlib.sha256(repr(layer_key).encode()).hexdigest()[:16]
+    vectortiles.build_tiles(_render_layer.frame, tile_key)
+    return tile_key
+
+# Function to convert the bounds returned by st_folium to (minx, miny, maxx, maxy)
+def map_bounds(bounds):
+    if not bounds or not bounds.get("_southWest") or not bounds.get("_northEast"):
+        return None
+    south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+    return (south_west["lng"], south_west["lat"], north_east["lng"], north_east["lat"])
 
 # Function to read shapefiles
-def read_shapefile(file):
+def read_shapefile(file_hash, data, layer, bbox=None, columns=None):
     try:
-        gdf = gpd.read_file(file)
+        gdf = load_shapefile(file_hash, data, layer, bbox, columns)
         return gdf
     except Exception as e:
         st.error(f"Error reading the shapefile: {e}")
@@ -20,32 +63,73 @@ st.title("Spatial Data Collection and Visualization App")
 uploaded_file = st.file_uploader("Upload a Shapefile (zip format containing .shp, .shx, .dbf, etc.)", type="zip")
 
 if uploaded_file is not None:
-    # Unzipping the uploaded file
-    with open("uploaded_file.zip", "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    import zipfile
-    with zipfile.ZipFile("uploaded_file.zip", "r") as zip_ref:
-        zip_ref.extractall("temp_shapefile")
-    
-    # Reading the shapefile
-    shapefile_path = "temp_shapefile"
-    gdf = read_shapefile(shapefile_path)
+    # Read the shapefile straight from the uploaded bytes, nothing is extracted to disk
+    file_hash = ingest.content_hash(uploaded_file)
+    data = uploaded_file.getvalue()
+    gdf = None
+    try:
+        shapefiles = list_shapefiles(file_hash, data)
+        layer = st.selectbox("Shapefile", shapefiles) if len(shapefiles) > 1 else shapefiles[0]
+        info = shapefile_info(file_hash, data, layer)
+    except Exception as e:
+        st.error(f"Error reading the shapefile: {e}")
+    else:
+        st.caption(f"{info['features']:,} features, CRS {info['crs']}")
+        
+        # Read options: only some attribute columns and/or a bounding box
+        with st.expander("Read options"):
+            columns = st.multiselect("Columns", info["fields"], default=info["fields"])
+            bbox = None
+            if st.checkbox("Only read features in a bounding box"):
+                minx, miny, maxx, maxy = info["bounds"]
+                col1, col2 = st.columns(2)
+                minx = col1.number_input("Min X", value=float(minx), format="%.6f")
+                miny = col1.number_input("Min Y", value=float(miny), format="%.6f")
+                maxx = col2.number_input("Max X", value=float(maxx), format="%.6f")
+                maxy = col2.number_input("Max Y", value=float(maxy), format="%.6f")
+                bbox = (minx, miny, maxx, maxy)
+        
+        # Reading the shapefile
+        gdf = read_shapefile(file_hash, data, layer, bbox, tuple(columns))
     
-    if gdf is not None:
+    if gdf is not None and gdf.empty:
+        st.warning("No features match the read options.")
+    elif gdf is not None:
         st.subheader("Shapefile Data")
         st.write(gdf)
         
         # Visualization on a map
         st.subheader("Map Visualization")
-        map_center = [gdf.geometry.iloc[0].centroid.y, gdf.geometry.iloc[0].centroid.x]
-        m = folium.Map(location=map_center, zoom_start=10)
+        layer_key = (file_hash, layer, bbox, tuple(columns))
+        render_layer = load_render_layer(layer_key, gdf)
+        minx, miny, maxx, maxy = render_layer.bounds
+        map_center = [(miny + maxy) / 2, (minx + maxx) / 2]
+        start_zoom = simplify.fit_zoom(render_layer.bounds, MAP_WIDTH, MAP_HEIGHT)
+        map_key = "spatial_map_" + hashlib.sha256(repr(layer_key).encode()).hexdigest()[:16]
+        view_key = map_key + "_view"  # st_folium owns the widget key, the rendered level lives next to it
+        rendering = st.radio("Rendering", ["Simplified GeoJSON", "Vector tiles"], horizontal=True)
+        m = folium.Map(location=map_center, zoom_start=start_zoom)
 
-        # Add the shapefile to the map
-        folium.GeoJson(gdf).add_to(m)
-        
-        # Display the map
-        st_folium(m, width=700, height=500)
+        if rendering == "Vector tiles":
+            # Tiles are served from static/ (server.enableStaticServing in .streamlit/config.toml)
+            with st.spinner("Building vector tiles..."):
+                tile_key = load_vector_tiles(layer_key, render_layer)
+            vectortiles.tile_layer(tile_key, name=layer).add_to(m)
+            st_folium(m, key=map_key + "_tiles", width=MAP_WIDTH, height=MAP_HEIGHT, returned_objects=[])
+        else:
+            # Send the simplification level for the current zoom, clipped to the view when zoomed in
+            view = st.session_state.get(view_key, (render_layer.level(start_zoom), None))
+            shapes = folium.FeatureGroup(name=layer)
+            folium.GeoJson(render_layer.geojson(view[0], view[1])).add_to(shapes)
+            
+            # Display the map
+            output = st_folium(m, key=map_key, width=MAP_WIDTH, height=MAP_HEIGHT, feature_group_to_add=shapes,
+                               returned_objects=["zoom", "bounds"])
+            if output and output.get("zoom") is not None:
+                new_view = render_layer.view(output["zoom"], map_bounds(output.get("bounds")), previous=view)
+                if new_view != view:
+                    st.session_state[view_key] = new_view
+                    st.rerun()
 else:
     st.info("Please upload a shapefile to visualize.")
 
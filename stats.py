@@ -0,0 +1,360 @@
+"""Single-pass, bounded-memory statistics for large CSV uploads.
+
+The CSV is read in blocks with the pyarrow streaming reader, keeping only
+the numeric columns (as float64 with NaN for missing values). Every block
+is folded into mergeable accumulators, so memory depends on the number of
+columns, not rows:
+
+* ``Comoments``: pairwise counts, means, sums of squares and co-moments,
+  combined with Chan et al.'s parallel form of Welford's update. Its
+  diagonal gives count/mean/std, the rest the pairwise-complete Pearson
+  correlation (what ``DataFrame.corr`` computes).
+* ``QuantileSketch``: a KLL sketch per column for the quartiles and box plot
+  statistics (rank error about 1% of the rows with the default ``k``).
+* ``Histogram``: exact counts on an equal-width grid that doubles its bin
+  width whenever a value falls outside the current range.
+
+``Profile`` bundles them for a set of columns; ``profile_csv`` runs the pass.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+BLOCK_BYTES = 1 << 20  # CSV bytes parsed per block; larger blocks raise the reader's peak memory, not its speed
+SKETCH_K = 200  # KLL accuracy parameter; rank error is roughly 1.7 / k
+HISTOGRAM_BINS = 1024  # fine bins kept per column; displays coarsen them
+DISPLAY_BINS = 30
+PREVIEW_ROWS = 5
+
+
+def _to_frame(matrix, columns, index):
+    return pd.DataFrame(matrix, index=index, columns=columns)
+
+
+class Comoments:
+    """Pairwise moments of ``k`` columns, updated from blocks that may contain NaN.
+
+    Entry ``[i, j]`` of ``n``, ``mean`` and ``m2`` covers the rows where both
+    column ``i`` and column ``j`` are present (``mean[i, j]`` and ``m2[i, j]``
+    are those of column ``i``); ``c[i, j]`` is their co-moment.
+    """
+
+    def __init__(self, k):
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.c = np.zeros((k, k))
+
+    def update(self, block):
+        """Fold in a ``rows x k`` float array."""
+        valid = ~np.isnan(block)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            shift = np.nan_to_num(np.nanmean(block, axis=0))
+        # Shifting by the block mean keeps the sums small (no cancellation below)
+        x = np.where(valid, block - shift, 0.0)
+        v = valid.astype(np.float64)
+        n = v.T @ v
+        s = x.T @ v
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s / n, 0.0)
+            m2 = (x * x).T @ v - s * mean
+            c = x.T @ x - s * mean.T
+        self._merge(n, mean + shift[:, None], m2, c)
+
+    def merge(self, other):
+        """Combine with the moments of other rows (Chan et al.)."""
+        self._merge(other.n, other.mean, other.m2, other.c)
+
+    def _merge(self, n_b, mean_b, m2_b, c_b):
+        n = self.n + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(n > 0, n_b / n, 0.0)
+        delta = np.where(n > 0, mean_b - self.mean, 0.0)
+        weight = self.n * ratio
+        self.mean = self.mean + delta * ratio
+        self.m2 = self.m2 + m2_b + delta * delta * weight
+        self.c = self.c + c_b + delta * delta.T * weight
+        self.n = n
+
+    def count(self):
+        return np.diag(self.n).copy()
+
+    def means(self):
+        return np.where(np.diag(self.n) > 0, np.diag(self.mean), np.nan)
+
+    def std(self):
+        n = np.diag(self.n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 1, np.sqrt(np.maximum(np.diag(self.m2), 0.0) / (n - 1)), np.nan)
+
+    def corr(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.n > 1, np.clip(corr, -1.0, 1.0), np.nan)
+        np.fill_diagonal(corr, np.where(np.diag(self.n) > 1, 1.0, np.nan))
+        return corr
+
+
+class QuantileSketch:
+    """KLL quantile sketch of one column (Karnin, Lang and Liberty, 2016).
+
+    Level ``h`` holds items that each stand for ``2**h`` values. A level over
+    its capacity is sorted and compacted: every other item (random offset)
+    moves up one level. Capacities shrink geometrically towards the bottom,
+    so only about ``3k`` items are kept however many values are added.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                self.levels[level] = items[:odd]
+                promoted = items[odd + self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add an array of values (NaN and infinities are skipped)."""
+        values = values[np.isfinite(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantiles(self, qs):
+        """Approximate quantiles for the fractions ``qs`` (NaN when the sketch is empty)."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        return items[np.minimum(positions, len(items) - 1)]
+
+    def lowest_at_least(self, bound):
+        """Smallest kept item that is ``>= bound`` (used for box plot whiskers)."""
+        items = np.concatenate(self.levels)
+        items = items[items >= bound]
+        return items.min() if len(items) else np.nan
+
+    def highest_at_most(self, bound):
+        items = np.concatenate(self.levels)
+        items = items[items <= bound]
+        return items.max() if len(items) else np.nan
+
+
+class Histogram:
+    """Exact equal-width histogram over a range that grows as values arrive.
+
+    The grid starts at the range of the first values. When a value falls
+    outside it, adjacent bins are merged in pairs and the grid is extended
+    to twice its width, so counts stay exact. ``merge`` adds another
+    histogram's bins at their centers, which is exact when the two grids
+    line up and otherwise off by at most one bin.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins + bins % 2
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.start = None
+        self.width = None
+
+    @property
+    def end(self):
+        return self.start + self.bins * self.width
+
+    def _cover(self, lo, hi):
+        if self.start is None:
+            self.start = lo
+            self.width = (hi - lo) / self.bins if hi > lo else max(abs(lo), 1.0) / self.bins
+        half = np.zeros(self.bins // 2, dtype=np.int64)
+        while lo < self.start:
+            self.counts = np.concatenate([half, self.counts.reshape(-1, 2).sum(axis=1)])
+            self.start -= self.bins * self.width
+            self.width *= 2
+        while hi > self.end:
+            self.counts = np.concatenate([self.counts.reshape(-1, 2).sum(axis=1), half])
+            self.width *= 2
+
+    def _add(self, values, weights=None):
+        positions = np.clip(((values - self.start) / self.width).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(positions, weights=weights, minlength=self.bins).astype(np.int64)
+
+    def update(self, values):
+        """Add an array of values (NaN and infinities are skipped)."""
+        values = values[np.isfinite(values)]
+        if len(values):
+            self._cover(values.min(), values.max())
+            self._add(values)
+
+    def merge(self, other):
+        if other.start is None:
+            return
+        used = np.flatnonzero(other.counts)
+        centers = other.start + (used + 0.5) * other.width
+        self._cover(centers.min(), centers.max())
+        self._add(centers, other.counts[used])
+
+    def display(self, bins=DISPLAY_BINS):
+        """``(counts, edges)`` with at most ``bins`` bins over the occupied part of the grid."""
+        used = np.flatnonzero(self.counts)
+        if not len(used):
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        counts = self.counts[used[0]:used[-1] + 1]
+        factor = -(-len(counts) // bins)
+        counts = np.pad(counts, (0, -len(counts) % factor)).reshape(-1, factor).sum(axis=1)
+        edges = self.start + (used[0] + np.arange(len(counts) + 1) * factor) * self.width
+        return counts, edges
+
+
+class Profile:
+    """Summary statistics of numeric columns, built block by block."""
+
+    def __init__(self, columns, k=SKETCH_K, bins=HISTOGRAM_BINS):
+        self.columns = list(columns)
+        self.rows = 0
+        self.minimum = np.full(len(self.columns), np.nan)
+        self.maximum = np.full(len(self.columns), np.nan)
+        self.moments = Comoments(len(self.columns))
+        self.sketches = [QuantileSketch(k) for _ in self.columns]
+        self.histograms = [Histogram(bins) for _ in self.columns]
+
+    def update(self, block):
+        """Fold in a ``rows x columns`` float array (NaN for missing values)."""
+        if not len(block):
+            return
+        self.rows += len(block)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            self.minimum = np.fmin(self.minimum, np.nanmin(block, axis=0))
+            self.maximum = np.fmax(self.maximum, np.nanmax(block, axis=0))
+        self.moments.update(block)
+        for i, (sketch, histogram) in enumerate(zip(self.sketches, self.histograms)):
+            sketch.update(block[:, i])
+            histogram.update(block[:, i])
+
+    def merge(self, other):
+        """Combine with the profile of other rows of the same columns."""
+        self.rows += other.rows
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.moments.merge(other.moments)
+        for mine, theirs in zip(self.sketches + self.histograms, other.sketches + other.histograms):
+            mine.merge(theirs)
+
+    def describe(self):
+        """The table of ``DataFrame.describe()`` for the numeric columns."""
+        quartiles = np.array([sketch.quantiles([0.25, 0.5, 0.75]) for sketch in self.sketches]).reshape(-1, 3)
+        rows = [self.moments.count(), self.moments.means(), self.moments.std(), self.minimum,
+                quartiles[:, 0], quartiles[:, 1], quartiles[:, 2], self.maximum]
+        return _to_frame(np.array(rows), self.columns, ["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
+
+    def corr(self):
+        """Pairwise-complete Pearson correlation, like ``DataFrame.corr()``."""
+        return _to_frame(self.moments.corr(), self.columns, self.columns)
+
+    def histogram(self, column, bins=DISPLAY_BINS):
+        return self.histograms[self.columns.index(column)].display(bins)
+
+    def box(self, column):
+        """Box plot statistics for ``matplotlib.axes.Axes.bxp`` (whiskers at 1.5 IQR, no fliers)."""
+        i = self.columns.index(column)
+        sketch = self.sketches[i]
+        q1, median, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low = max(self.minimum[i], sketch.lowest_at_least(q1 - 1.5 * iqr))
+        high = min(self.maximum[i], sketch.highest_at_most(q3 + 1.5 * iqr))
+        return {"label": column, "med": median, "q1": q1, "q3": q3, "whislo": low, "whishi": high, "fliers": []}
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def numeric_columns(source, block_bytes=BLOCK_BYTES):
+    """Names of the columns inferred as integer or floating point in the first block."""
+    _rewind(source)
+    schema = pv.open_csv(source, read_options=pv.ReadOptions(block_size=block_bytes)).schema
+    return [field.name for field in schema if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)]
+
+
+def numeric_blocks(source, columns, block_bytes=BLOCK_BYTES):
+    """Yield ``rows x len(columns)`` float64 arrays of the CSV, one per block.
+
+    Uses the pyarrow streaming reader with the columns typed as float64. If a
+    later block has text in one of them, pyarrow fails; callers restart with
+    ``numeric_blocks_pandas``, which turns such values into NaN.
+    """
+    _rewind(source)
+    reader = pv.open_csv(source, read_options=pv.ReadOptions(block_size=block_bytes),
+                         convert_options=pv.ConvertOptions(include_columns=columns,
+                                                           column_types={c: pa.float64() for c in columns}))
+    for batch in reader:
+        yield np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in columns]) \
+            if columns else np.empty((batch.num_rows, 0))
+
+
+def numeric_blocks_pandas(source, columns, chunk_rows=1 << 18):
+    """Like ``numeric_blocks`` with the pandas chunked reader; values that are not numbers become NaN."""
+    _rewind(source)
+    for chunk in pd.read_csv(source, usecols=columns, chunksize=chunk_rows):
+        yield chunk.reindex(columns=columns).apply(pd.to_numeric, errors="coerce").to_numpy(np.float64)
+
+
+def profile_csv(source, columns=None, block_bytes=BLOCK_BYTES, k=SKETCH_K, bins=HISTOGRAM_BINS):
+    """``Profile`` of the numeric columns of a CSV (path or file object) in one chunked pass."""
+    columns = numeric_columns(source, block_bytes) if columns is None else list(columns)
+    profile = Profile(columns, k, bins)
+    try:
+        for block in numeric_blocks(source, columns, block_bytes):
+            profile.update(block)
+    except pa.ArrowInvalid:
+        profile = Profile(columns, k, bins)
+        for block in numeric_blocks_pandas(source, columns):
+            profile.update(block)
+    return profile
+
+
+def read_column(source, column, block_bytes=BLOCK_BYTES):
+    """One numeric column of a CSV as a float64 array, read without parsing the other columns."""
+    try:
+        blocks = list(numeric_blocks(source, [column], block_bytes))
+    except pa.ArrowInvalid:
+        blocks = list(numeric_blocks_pandas(source, [column]))
+    return np.concatenate(blocks)[:, 0] if blocks else np.empty(0)
+
+
+def preview(source, rows=PREVIEW_ROWS):
+    """The first ``rows`` rows of a CSV, all columns."""
+    _rewind(source)
+    return pd.read_csv(source, nrows=rows)
@@ -3,6 +3,9 @@ import numpy as np
 import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta
+import tickets
+
+PAGE_ROWS = 500  # tickets shown per page of the editor; the analytics cover every ticket
 
 # Page title
 st.set_page_config(page_title='Support Ticket Workflow', page_icon='🎫')
@@ -59,22 +62,21 @@ data = {'Issue': issue_list,
     }
 df = pd.DataFrame(data)
 df.insert(0, 'ID', id_values)
-df = df.sort_values(by=['Status', 'ID'], ascending=[False, False])
 
-## Create DataFrame
-if 'df' not in st.session_state:
-    st.session_state.df = df
+## Create the ticket store (kept in Status/ID order, with running counts for the analytics)
+if 'tickets' not in st.session_state:
+    st.session_state.tickets = tickets.TicketStore.from_frame(df)
+store = st.session_state.tickets
 
-# Sort dataframe
-def sort_df():
-    st.session_state.df = edited_df.copy().sort_values(by=['Status', 'ID'], ascending=[False, False])
+# Apply the cells edited in the ticket table to the store
+def apply_edits(editor_key, ticket_ids):
+    for position, changes in st.session_state[editor_key]['edited_rows'].items():
+        store.update(ticket_ids[position], status=changes.get('Status'), priority=changes.get('Priority'))
 
 
 # Tabs for app layout
 tabs = st.tabs(['Write a ticket', 'Ticket Status and Analytics'])
 
-recent_ticket_number = int(max(st.session_state.df.ID).split('-')[1])
-
 with tabs[0]:
   with st.form('addition'):
     issue = st.text_area('Description of issue')
@@ -82,29 +84,36 @@ with tabs[0]:
     submit = st.form_submit_button('Submit')
 
   if submit:
-      today_date = datetime.now().strftime('%m-%d-%Y')
-      df2 = pd.DataFrame([{'ID': f'TICKET-{recent_ticket_number+1}',
+      today_date = datetime.now()
+      ticket_id = store.add(issue, priority, submitted=today_date)
+      df2 = pd.DataFrame([{'ID': ticket_id,
                            'Issue': issue,
                            'Status': 'Open',
                            'Priority': priority,
-                           'Date Submitted': today_date
+                           'Date Submitted': today_date.strftime('%m-%d-%Y')
                           }])
       st.write('Ticket submitted!')
       st.dataframe(df2, use_container_width=True, hide_index=True)
-      st.session_state.df = pd.concat([st.session_state.df, df2], axis=0).sort_values(by=['Status', 'ID'], ascending=[False, False])
 
 with tabs[1]:
   status_col = st.columns((3,1))
   with status_col[0]:
       st.subheader('Support Ticket Status')
   with status_col[1]:
-      st.write(f'No. of tickets: `{len(st.session_state.df)}`')
+      st.write(f'No. of tickets: `{len(store)}`')
 
   st.markdown('**Things to try:**')
   st.info('1️⃣ Update Ticket **Status** or **Priority** and see how plots are updated in real-time!')
-  st.success('2️⃣ Change values in **Status** column from *"Open"* to either *"In Progress"* or *"Closed"*, then click on the **Sort DataFrame by the Status column** button to see the refreshed DataFrame with the sorted **Status** column.')
-
-  edited_df = st.data_editor(st.session_state.df, use_container_width=True, hide_index=True, height=212,
+  st.success('2️⃣ Change values in **Status** column from *"Open"* to either *"In Progress"* or *"Closed"* and see the ticket move to its place in the table, which stays sorted by the **Status** column.')
+
+  # Show one page of the sorted tickets; a new editor key per store version drops edits already applied
+  pages = max(1, -(-len(store) // PAGE_ROWS))
+  page = st.number_input('Page', min_value=1, max_value=pages, value=1) if pages > 1 else 1
+  page_df = store.page((page - 1) * PAGE_ROWS, PAGE_ROWS)
+  editor_key = f'ticket_editor_{store.version}'
+  st.data_editor(page_df, key=editor_key, use_container_width=True, hide_index=True, height=212,
+                disabled=['ID', 'Issue', 'Date Submitted'],
+                on_change=apply_edits, args=(editor_key, page_df['ID'].tolist()),
                 column_config={'Status': st.column_config.SelectboxColumn(
                                             'Status',
                                             help='Ticket status',
@@ -126,14 +135,13 @@ with tabs[1]:
                                             required=True,
                                             ),
                              })
-  st.button('🔄 Sort DataFrame by the Status column', on_click=sort_df)
   
   # Status plot
   st.subheader('Support Ticket Analytics')
   col = st.columns((1,3,1))
     
   with col[0]:
-      n_tickets_queue = len(st.session_state.df[st.session_state.df.Status=='Open'])
+      n_tickets_queue = store.count('Open')
       
       st.metric(label='First response time (hr)', value=5.2, delta=-1.5)
       st.metric(label='No. of tickets in the queue', value=n_tickets_queue, delta='')
@@ -141,17 +149,17 @@ with tabs[1]:
       
       
   with col[1]:
-      status_plot = alt.Chart(edited_df).mark_bar().encode(
-          x='month(Date Submitted):O',
-          y='count():Q',
+      status_plot = alt.Chart(store.status_by_month()).mark_bar().encode(
+          x=alt.X('month(Month):O', title='Date Submitted'),
+          y=alt.Y('sum(Tickets):Q', title='Count of Records'),
           xOffset='Status:N',
           color = 'Status:N'
       ).properties(title='Ticket status in the past 6 months', height=300).configure_legend(orient='bottom', titleFontSize=14, labelFontSize=14, titlePadding=5)
       st.altair_chart(status_plot, use_container_width=True, theme='streamlit')
       
   with col[2]:
-      priority_plot = alt.Chart(edited_df).mark_arc().encode(
-                          theta="count():Q",
+      priority_plot = alt.Chart(store.priority_counts()).mark_arc().encode(
+                          theta="Tickets:Q",
                           color="Priority:N"
                       ).properties(title='Current ticket priority', height=300).configure_legend(orient='bottom', titleFontSize=14, labelFontSize=14, titlePadding=5)
       st.altair_chart(priority_plot, use_container_width=True, theme='streamlit')
@@ -1,6 +1,11 @@
 import streamlit as st
-import pandas as pd
 from io import StringIO
+import fieldstore
+
+# Function to open the student records, stored in the shared field database
+@st.cache_resource
+def load_student_records():
+    return fieldstore.FieldStore().dataset("students", ["Name", "Age", "Grade"])
 
 def main():
     st.title("Student Data Collection App")
@@ -10,8 +15,7 @@ def main():
     age = st.number_input("Enter Student Age:", min_value=1, max_value=100, step=1)
     grade = st.selectbox("Select Grade Level:", ["Grade 1", "Grade 2", "Grade 3", "Grade 4", "Grade 5","Garde 6","Grade 7","Grade 8"])
 
-    if 'student_data' not in st.session_state:
-        st.session_state.student_data = pd.DataFrame(columns=["Name", "Age", "Grade"])
+    student_records = load_student_records()
 
     if st.button("Submit"):
         # Create a dictionary to store the student data
@@ -21,20 +25,18 @@ def main():
             "Grade": grade
         }
 
-        # Convert the dictionary to a DataFrame
-        new_data = pd.DataFrame([student_data])
-
-        # Append new data to the session state DataFrame using pd.concat
-        st.session_state.student_data = pd.concat([st.session_state.student_data, new_data], ignore_index=True)
+        # Append the record; the table is only rebuilt when it is displayed
+        student_records.append(student_data)
 
         st.success("Data added successfully!")
 
     # Display the data in a table
-    st.dataframe(st.session_state.student_data)
+    student_data = student_records.frame()
+    st.dataframe(student_data)
 
     # Provide an option to download the data as a CSV file
-    if not st.session_state.student_data.empty:
-        csv = st.session_state.student_data.to_csv(index=False)
+    if not student_data.empty:
+        csv = student_data.to_csv(index=False)
         st.download_button(
             label="Download data as CSV",
             data=csv,
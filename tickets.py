@@ -0,0 +1,264 @@
+"""Columnar support-ticket store with incrementally maintained analytics.
+
+Tickets are held in typed column arrays that grow by doubling: integer ids,
+status and priority codes, ``datetime64`` submission dates and the issue
+text. Two structures are kept up to date on every insert or edit, so
+nothing is recomputed from the full table:
+
+* the display order (Status: Open, In Progress, Closed, then newest ID
+  first) as sorted integer keys held in blocks of at most
+  ``2 * BLOCK_KEYS`` (``SortedKeys``). An insert or status edit bisects the
+  block maxima, then shifts keys within one block, and a Fenwick tree over
+  the block sizes maps a row number to its block, so placing a ticket and
+  slicing a page are O(log n) and the table is never re-sorted;
+* counters of tickets per status, per priority and per (month, status),
+  which the dashboards read directly. Their size depends on the number of
+  months, not on the number of tickets.
+"""
+import bisect
+
+import numpy as np
+import pandas as pd
+
+STATUSES = ("Open", "In Progress", "Closed")  # also the display order
+PRIORITIES = ("High", "Medium", "Low")
+ID_PREFIX = "TICKET-"
+INITIAL_CAPACITY = 1024
+BLOCK_KEYS = 1024  # display-order keys per block; blocks split at twice this
+_ID_BITS = 40
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def ticket_number(ticket_id):
+    """``1042`` for ``'TICKET-1042'`` (numbers pass through)."""
+    return int(str(ticket_id).rsplit("-", 1)[-1])
+
+
+def _code(value, categories):
+    try:
+        return categories.index(value)
+    except ValueError:
+        raise ValueError(f"Unknown value '{value}', expected one of {categories}") from None
+
+
+def _sort_key(status, number):
+    # Ascending keys: status in display order, then the highest ticket number first
+    return (int(status) << _ID_BITS) | (_ID_MASK - int(number))
+
+
+class SortedKeys:
+    """Sorted integer keys in blocks, with O(log n) insert, remove and slicing by position."""
+
+    def __init__(self, keys=()):
+        keys = list(keys)  # already sorted
+        self._blocks = [keys[i:i + BLOCK_KEYS] for i in range(0, len(keys), BLOCK_KEYS)]
+        self._reindex()
+
+    def __len__(self):
+        return self._size
+
+    def _reindex(self):
+        # Block maxima and a Fenwick tree of block sizes, rebuilt in O(blocks) after a split or merge
+        self._maxes = [block[-1] for block in self._blocks]
+        self._tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+        self._size = sum(map(len, self._blocks))
+
+    def _resize(self, block, delta):
+        self._size += delta
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _locate(self, index):
+        """``(block, offset)`` of the key at sorted position ``index``."""
+        block, step = 0, 1 << len(self._tree).bit_length()
+        while step:
+            if block + step < len(self._tree) and self._tree[block + step] <= index:
+                block += step
+                index -= self._tree[block]
+            step >>= 1
+        return block, index
+
+    def add(self, key):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._reindex()
+            return
+        b = min(bisect.bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[b]
+        bisect.insort(block, key)
+        self._maxes[b] = block[-1]
+        if len(block) > 2 * BLOCK_KEYS:
+            self._blocks[b:b + 1] = [block[:BLOCK_KEYS], block[BLOCK_KEYS:]]
+            self._reindex()
+        else:
+            self._resize(b, 1)
+
+    def remove(self, key):
+        b = bisect.bisect_left(self._maxes, key)
+        block = self._blocks[b] if b < len(self._blocks) else []
+        i = bisect.bisect_left(block, key)
+        if i == len(block) or block[i] != key:
+            raise KeyError(key)
+        del block[i]
+        if not block:
+            del self._blocks[b]
+            self._reindex()
+        else:
+            self._maxes[b] = block[-1]
+            self._resize(b, -1)
+
+    def slice(self, start=0, stop=None):
+        """Keys at sorted positions ``start:stop`` as a list."""
+        stop = self._size if stop is None else min(stop, self._size)
+        if start >= stop:
+            return []
+        b, offset = self._locate(start)
+        keys = []
+        while len(keys) < stop - start:
+            keys.extend(self._blocks[b][offset:offset + stop - start - len(keys)])
+            b, offset = b + 1, 0
+        return keys
+
+
+class TicketStore:
+    """Tickets addressed by number, kept in display order, with per-status/priority/month counts."""
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._size = 0
+        self._numbers = np.empty(capacity, dtype=np.int64)
+        self._status = np.empty(capacity, dtype=np.int8)
+        self._priority = np.empty(capacity, dtype=np.int8)
+        self._submitted = np.empty(capacity, dtype="datetime64[ns]")
+        self._issue = np.empty(capacity, dtype=object)
+        self._row_of = {}
+        self._order = SortedKeys()
+        self.status_totals = np.zeros(len(STATUSES), dtype=np.int64)
+        self.priority_totals = np.zeros(len(PRIORITIES), dtype=np.int64)
+        self._month_status = {}  # numpy month -> tickets per status
+        self.next_number = 1
+        self.version = 0
+
+    @classmethod
+    def from_frame(cls, frame, date_format="%m-%d-%Y"):
+        """Bulk-load a frame with ID, Issue, Status, Priority and Date Submitted columns."""
+        store = cls(capacity=max(INITIAL_CAPACITY, 2 * len(frame)))
+        n = len(frame)
+        numbers = frame["ID"].astype(str).str.rsplit("-", n=1).str[-1].to_numpy(dtype=np.int64)
+        status = pd.Categorical(frame["Status"], categories=STATUSES).codes
+        priority = pd.Categorical(frame["Priority"], categories=PRIORITIES).codes
+        if (status < 0).any() or (priority < 0).any():
+            raise ValueError(f"Status must be one of {STATUSES} and Priority one of {PRIORITIES}")
+        store._numbers[:n] = numbers
+        store._status[:n] = status
+        store._priority[:n] = priority
+        # Tickets share few distinct dates, so each one is parsed once
+        codes, dates = pd.factorize(frame["Date Submitted"], use_na_sentinel=False)
+        store._submitted[:n] = pd.to_datetime(dates, format=date_format).to_numpy()[codes]
+        store._issue[:n] = frame["Issue"].to_numpy(dtype=object)
+        store._size = n
+        store._row_of = dict(zip(numbers.tolist(), range(n)))
+        if len(store._row_of) != n:
+            raise ValueError("Ticket IDs must be unique")
+        keys = (status.astype(np.int64) << _ID_BITS) | (_ID_MASK - numbers)
+        store._order = SortedKeys(np.sort(keys).tolist())
+        store.status_totals += np.bincount(status, minlength=len(STATUSES))
+        store.priority_totals += np.bincount(priority, minlength=len(PRIORITIES))
+        months = store._submitted[:n].astype("datetime64[M]").astype(np.int64)
+        pairs, counts = np.unique(months * len(STATUSES) + status, return_counts=True)
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            month, code = divmod(pair, len(STATUSES))
+            store._month_counts(np.datetime64(month, "M"))[code] += count
+        store.next_number = int(numbers.max(initial=0)) + 1
+        return store
+
+    def __len__(self):
+        return self._size
+
+    def _month_counts(self, month):
+        counts = self._month_status.get(month)
+        if counts is None:
+            counts = self._month_status[month] = np.zeros(len(STATUSES), dtype=np.int64)
+        return counts
+
+    def _grow(self):
+        for name in ("_numbers", "_status", "_priority", "_submitted", "_issue"):
+            column = getattr(self, name)
+            grown = np.empty(2 * len(column), dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def add(self, issue, priority, status="Open", submitted=None):
+        """Insert a new ticket in display order and count it; returns its ID (``'TICKET-n'``)."""
+        status, priority = _code(status, STATUSES), _code(priority, PRIORITIES)
+        submitted = np.datetime64(pd.Timestamp.now() if submitted is None else pd.Timestamp(submitted), "ns")
+        if self._size == len(self._numbers):
+            self._grow()
+        row, number = self._size, self.next_number
+        self._numbers[row], self._status[row], self._priority[row] = number, status, priority
+        self._submitted[row], self._issue[row] = submitted, issue
+        self._size += 1
+        self._row_of[number] = row
+        self.next_number += 1
+        self._order.add(_sort_key(status, number))
+        self.status_totals[status] += 1
+        self.priority_totals[priority] += 1
+        self._month_counts(submitted.astype("datetime64[M]"))[status] += 1
+        self.version += 1
+        return f"{ID_PREFIX}{number}"
+
+    def update(self, ticket_id, status=None, priority=None):
+        """Change a ticket's status and/or priority, moving it in the order and in the counters."""
+        number = ticket_number(ticket_id)
+        row = self._row_of[number]
+        if status is not None and _code(status, STATUSES) != self._status[row]:
+            old, new = int(self._status[row]), _code(status, STATUSES)
+            self._order.remove(_sort_key(old, number))
+            self._order.add(_sort_key(new, number))
+            self._status[row] = new
+            self.status_totals[old] -= 1
+            self.status_totals[new] += 1
+            counts = self._month_status[self._submitted[row].astype("datetime64[M]")]
+            counts[old] -= 1
+            counts[new] += 1
+            self.version += 1
+        if priority is not None and _code(priority, PRIORITIES) != self._priority[row]:
+            old, new = int(self._priority[row]), _code(priority, PRIORITIES)
+            self._priority[row] = new
+            self.priority_totals[old] -= 1
+            self.priority_totals[new] += 1
+            self.version += 1
+
+    def count(self, status):
+        return int(self.status_totals[_code(status, STATUSES)])
+
+    def page(self, start=0, rows=None):
+        """Tickets ``start:start + rows`` of the display order as a typed frame (categorical Status/Priority)."""
+        keys = np.array(self._order.slice(start, None if rows is None else start + rows), dtype=np.int64)
+        numbers = _ID_MASK - (keys & _ID_MASK)
+        index = np.array([self._row_of[number] for number in numbers.tolist()], dtype=np.int64)
+        return pd.DataFrame({
+            "ID": [f"{ID_PREFIX}{number}" for number in numbers.tolist()],
+            "Issue": self._issue[index],
+            "Status": pd.Categorical.from_codes(self._status[index], categories=STATUSES),
+            "Priority": pd.Categorical.from_codes(self._priority[index], categories=PRIORITIES),
+            "Date Submitted": self._submitted[index],
+        })
+
+    def status_by_month(self):
+        """Long table of (Month, Status, Tickets), one row per month and status."""
+        months = sorted(self._month_status)
+        counts = np.array([self._month_status[month] for month in months]).reshape(len(months), len(STATUSES))
+        return pd.DataFrame({
+            "Month": np.repeat(np.array(months, dtype="datetime64[ns]"), len(STATUSES)),
+            "Status": np.tile(STATUSES, len(months)),
+            "Tickets": counts.ravel(),
+        })
+
+    def priority_counts(self):
+        return pd.DataFrame({"Priority": PRIORITIES, "Tickets": self.priority_totals})
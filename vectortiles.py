@@ -0,0 +1,50 @@
+"""Cut a GeoDataFrame into Mapbox Vector Tiles (MVT/PBF) served by Streamlit.
+
+Tiles are written with GDAL's MVT driver (via pyogrio) as an uncompressed
+``{z}/{x}/{y}.pbf`` directory under ``TILE_DIR``, which Streamlit serves at
+``/app/static/...`` when ``server.enableStaticServing`` is on. GDAL
+simplifies and clips per tile, so the page only loads the tiles in view at
+their own level of detail. A tile set is written once per cache key and
+reused until its directory is removed.
+"""
+import os
+import shutil
+import tempfile
+
+import folium.plugins
+import pyogrio
+
+TILE_DIR = os.path.join("static", "tiles")
+TILE_URL = "/app/static/tiles"
+MIN_ZOOM = 0
+MAX_ZOOM = 12  # deeper zooms overzoom the level-12 tiles in the browser
+LAYER_NAME = "features"
+
+
+def build_tiles(gdf, key, tile_dir=TILE_DIR, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, layer=LAYER_NAME):
+    """Write the tile set for ``gdf`` under ``tile_dir/key`` unless it already exists; returns its directory."""
+    target = os.path.join(tile_dir, key)
+    if os.path.isdir(target):
+        return target
+    os.makedirs(tile_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".tiles-", dir=tile_dir)
+    try:
+        out = os.path.join(staging, key)
+        pyogrio.write_dataframe(gdf, out, driver="MVT", layer=layer,
+                                dataset_options={"FORMAT": "DIRECTORY", "COMPRESS": "NO", "MINZOOM": min_zoom,
+                                                 "MAXZOOM": max_zoom})
+        try:
+            os.replace(out, target)
+        except OSError:
+            if not os.path.isdir(target):  # otherwise another session finished the same tiles first
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def tile_layer(key, name=None, color="#3388ff", max_zoom=MAX_ZOOM, layer=LAYER_NAME, url=TILE_URL):
+    """Folium ``VectorGridProtobuf`` layer for a tile set written by ``build_tiles``."""
+    style = {"weight": 1, "color": color, "fill": True, "fillColor": color, "fillOpacity": 0.2}
+    options = {"vectorTileLayerStyles": {layer: style}, "maxNativeZoom": max_zoom, "maxZoom": 22}
+    return folium.plugins.VectorGridProtobuf(f"{url}/{key}/{{z}}/{{x}}/{{y}}.pbf", name=name, options=options)
@@ -0,0 +1,291 @@
+"""Capacitated vehicle routing over a precomputed distance matrix.
+
+The matrix (e.g. ``odmatrix.cost_matrix`` over the road network, so it may
+be asymmetric) covers the depot and every stop. A solution is a set of
+routes that each start and end at the depot, carry at most ``capacity``
+and use at most ``vehicles`` vehicles, with the smallest total distance.
+
+Each start builds routes with the Clarke-Wright savings heuristic. Start 0
+uses the classic savings; the others randomize its shape parameter and
+perturb the savings for diversity. When that needs more routes than there
+are vehicles, the smallest routes are dissolved into the others. Local
+search then runs until no move improves or the time budget is spent:
+
+* relocate: move one stop to the best position in another route with spare
+  capacity (all stops and positions evaluated at once);
+* 2-opt: reverse a segment of a route (asymmetric costs are handled with
+  prefix sums of the forward and backward arc costs);
+* or-opt: move a run of 1-3 consecutive stops elsewhere in its route.
+
+Starts are fanned out across a process pool and the best solution wins.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TIME_BUDGET_S = 5.0
+STARTS = 8
+OR_OPT_LENGTHS = (1, 2, 3)
+EPS = 1e-9
+
+_problem = {}
+
+
+def _init_worker(problem):
+    _problem.update(problem)
+
+
+class Solution:
+    """Routes as lists of stop indices (depot excluded), in the indices of the input matrix."""
+
+    def __init__(self, routes, distances, loads, unreachable=()):
+        self.routes = routes
+        self.distances = distances
+        self.loads = loads
+        self.unreachable = list(unreachable)
+
+    @property
+    def cost(self):
+        return float(sum(self.distances))
+
+    @property
+    def vehicles(self):
+        return len(self.routes)
+
+
+def route_cost(d, route):
+    """Cost of depot -> ``route`` -> depot, with the depot at index 0 of ``d``."""
+    sequence = np.concatenate([[0], route, [0]]).astype(np.int64)
+    return float(d[sequence[:-1], sequence[1:]].sum())
+
+
+def _best(delta):
+    delta = np.where(np.isnan(delta), np.inf, delta)
+    position = int(np.argmin(delta))
+    return position, delta.flat[position]
+
+
+# Construction
+
+def savings_routes(d, demand, capacity, shape=1.0, noise=0.0, rng=None):
+    """Clarke-Wright savings routes (parallel version) for stops ``1..n-1`` of ``d``.
+
+    Merging the route ending at ``i`` with the one starting at ``j`` saves
+    ``d[i, 0] + d[0, j] - shape * d[i, j]``; merges are made from the largest
+    saving down while the load fits.
+    """
+    m = len(d) - 1
+    savings = d[1:, :1] + d[:1, 1:] - shape * d[1:, 1:]
+    if noise:
+        savings = savings * rng.uniform(1 - noise, 1 + noise, savings.shape)
+    np.fill_diagonal(savings, -np.inf)
+    candidates = np.flatnonzero(savings > 0)
+    candidates = candidates[np.argsort(-savings.ravel()[candidates], kind="stable")]
+
+    routes = {i: [i] for i in range(1, m + 1)}
+    route_of = np.arange(m + 1)
+    loads = {i: demand[i] for i in range(1, m + 1)}
+    for i, j in zip(*np.divmod(candidates, m)):
+        ri, rj = route_of[i + 1], route_of[j + 1]
+        if ri == rj or routes[ri][-1] != i + 1 or routes[rj][0] != j + 1 or loads[ri] + loads[rj] > capacity:
+            continue
+        routes[ri].extend(routes[rj])
+        route_of[routes.pop(rj)] = ri
+        loads[ri] += loads.pop(rj)
+    return list(routes.values())
+
+
+def _cheapest_insertion(d, route, stop):
+    sequence = np.concatenate([[0], route, [0]]).astype(np.int64)
+    a, b = sequence[:-1], sequence[1:]
+    return _best(d[a, stop] + d[stop, b] - d[a, b])
+
+
+def reduce_fleet(d, routes, demand, capacity, vehicles):
+    """Dissolve the smallest routes into the others (cheapest feasible insertion) while there are too many."""
+    routes = [list(route) for route in routes]
+    while len(routes) > vehicles:
+        smallest = min(range(len(routes)), key=lambda r: (len(routes[r]), route_cost(d, routes[r])))
+        others = [list(route) for r, route in enumerate(routes) if r != smallest]
+        loads = [sum(demand[stop] for stop in route) for route in others]
+        for stop in sorted(routes[smallest], key=lambda s: -demand[s]):
+            options = [(cost, r, position) for r, route in enumerate(others)
+                       if loads[r] + demand[stop] <= capacity
+                       for position, cost in [_cheapest_insertion(d, route, stop)]]
+            if not options or min(options)[0] == np.inf:
+                return routes
+            _, r, position = min(options)
+            others[r].insert(position, stop)
+            loads[r] += demand[stop]
+        routes = others
+    return routes
+
+
+# Local search
+
+def two_opt(d, route):
+    """Best segment reversal of ``route``, as ``(delta, new route)``, or ``None`` if none improves."""
+    if len(route) < 2:
+        return None
+    sequence = np.concatenate([[0], route, [0]]).astype(np.int64)
+    forward = np.concatenate([[0.0], np.cumsum(d[sequence[:-1], sequence[1:]])])
+    backward = np.concatenate([[0.0], np.cumsum(d[sequence[1:], sequence[:-1]])])
+    i, j = np.triu_indices(len(sequence) - 2, k=1)
+    i, j = i + 1, j + 1  # reverse sequence[i..j], both stops
+    with np.errstate(invalid="ignore"):
+        delta = (d[sequence[i - 1], sequence[j]] + d[sequence[i], sequence[j + 1]] + backward[j] - backward[i]
+                 - d[sequence[i - 1], sequence[i]] - d[sequence[j], sequence[j + 1]] - forward[j] + forward[i])
+    best, gain = _best(delta)
+    if gain >= -EPS:
+        return None
+    start, stop = i[best], j[best]
+    sequence[start:stop + 1] = sequence[start:stop + 1][::-1]
+    return gain, sequence[1:-1].tolist()
+
+
+def or_opt(d, route):
+    """Best move of 1-3 consecutive stops within ``route``, as ``(delta, new route)``, or ``None``."""
+    sequence = np.concatenate([[0], route, [0]]).astype(np.int64)
+    k = len(sequence)
+    best = None
+    for length in OR_OPT_LENGTHS:
+        if length >= len(route):
+            break
+        i = np.arange(1, k - length)[:, None]  # segment sequence[i..i+length-1]
+        p = np.arange(k - 1)[None, :]  # insert between sequence[p] and sequence[p+1]
+        first, last = sequence[i], sequence[i + length - 1]
+        before, after = sequence[i - 1], sequence[i + length]
+        removed = d[before, first] + d[last, after] - d[before, after]
+        with np.errstate(invalid="ignore"):
+            delta = d[sequence[p], first] + d[last, sequence[p + 1]] - d[sequence[p], sequence[p + 1]] - removed
+        delta = np.where((p <= i - 2) | (p >= i + length), delta, np.inf)
+        position, gain = _best(delta)
+        if gain < -EPS and (best is None or gain < best[0]):
+            best = (gain, length, *np.unravel_index(position, delta.shape))
+    if best is None:
+        return None
+    gain, length, row, p = best
+    start = row + 1
+    segment = sequence[start:start + length].tolist()
+    rest = sequence.tolist()
+    del rest[start:start + length]
+    insert_at = p + 1 if p < start else p + 1 - length
+    rest[insert_at:insert_at] = segment
+    return gain, rest[1:-1]
+
+
+def relocate(d, routes, loads, demand, capacity):
+    """Apply the best move of one stop into another route; returns whether one improved."""
+    stops, owners, previous, following = [], [], [], []
+    arc_from, arc_to, arc_route = [], [], []
+    for r, route in enumerate(routes):
+        sequence = [0] + route + [0]
+        stops += route
+        owners += [r] * len(route)
+        previous += sequence[:-2]
+        following += sequence[2:]
+        arc_from += sequence[:-1]
+        arc_to += sequence[1:]
+        arc_route += [r] * (len(sequence) - 1)
+    if len(routes) < 2 or not stops:
+        return False
+    stops, owners = np.array(stops), np.array(owners)
+    previous, following = np.array(previous), np.array(following)
+    arc_from, arc_to, arc_route = np.array(arc_from), np.array(arc_to), np.array(arc_route)
+
+    removed = d[previous, stops] + d[stops, following] - d[previous, following]
+    with np.errstate(invalid="ignore"):
+        delta = (d[arc_from[None, :], stops[:, None]] + d[stops[:, None], arc_to[None, :]]
+                 - d[arc_from, arc_to][None, :] - removed[:, None])
+    fits = np.asarray(loads)[arc_route][None, :] + demand[stops][:, None] <= capacity
+    delta = np.where(fits & (arc_route[None, :] != owners[:, None]), delta, np.inf)
+    position, gain = _best(delta)
+    if gain >= -EPS:
+        return False
+    row, arc = np.unravel_index(position, delta.shape)
+    stop, source, target = int(stops[row]), owners[row], arc_route[arc]
+    insert_at = int(np.flatnonzero(arc_route == target).tolist().index(arc))
+    routes[source].remove(stop)
+    routes[target].insert(insert_at, stop)
+    loads[source] -= demand[stop]
+    loads[target] += demand[stop]
+    if not routes[source]:
+        del routes[source]
+        del loads[source]
+    return True
+
+
+def improve(d, routes, demand, capacity, deadline):
+    """Local search until no move improves or ``deadline`` (``time.time()``) passes."""
+    routes = [list(route) for route in routes]
+    loads = [sum(demand[stop] for stop in route) for route in routes]
+    improved = True
+    while improved and time.time() < deadline:
+        improved = False
+        for r in range(len(routes)):
+            while time.time() < deadline:
+                moves = [move for move in (two_opt(d, routes[r]), or_opt(d, routes[r])) if move is not None]
+                if not moves:
+                    break
+                routes[r] = min(moves)[1]
+        while time.time() < deadline and relocate(d, routes, loads, demand, capacity):
+            improved = True
+    return routes
+
+
+def _solve_start(start, seed, deadline):
+    d, demand, capacity, vehicles = _problem["d"], _problem["demand"], _problem["capacity"], _problem["vehicles"]
+    rng = np.random.default_rng([seed, start])
+    if start == 0:
+        routes = savings_routes(d, demand, capacity)
+    else:
+        routes = savings_routes(d, demand, capacity, shape=rng.uniform(0.6, 1.8), noise=0.1, rng=rng)
+    routes = improve(d, reduce_fleet(d, routes, demand, capacity, vehicles), demand, capacity, deadline)
+    return sum(route_cost(d, route) for route in routes), routes
+
+
+def solve(distance, depot=0, demands=None, vehicles=1, capacity=None, time_budget=TIME_BUDGET_S, starts=STARTS,
+          workers=None, seed=0):
+    """Solve the capacitated VRP on the square ``distance`` matrix; returns a ``Solution``.
+
+    ``demands`` defaults to 1 per stop and ``capacity`` to unlimited. Stops
+    that cannot be reached from the depot or cannot get back to it are left
+    out and listed in ``Solution.unreachable``. Raises ``ValueError`` when the
+    fleet cannot carry the demand. The route count may exceed ``vehicles``
+    only if no feasible way to merge the routes was found.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    n = len(distance)
+    demands = np.ones(n) if demands is None else np.asarray(demands, dtype=np.float64)
+    capacity = np.inf if capacity is None else float(capacity)
+    others = np.array([i for i in range(n) if i != depot], dtype=np.int64)
+    reachable = np.isfinite(distance[depot, others]) & np.isfinite(distance[others, depot])
+    unreachable, stops = others[~reachable], others[reachable]
+    if (demands[stops] > capacity).any():
+        raise ValueError("A stop's demand is larger than the vehicle capacity")
+    if demands[stops].sum() > vehicles * capacity:
+        raise ValueError(f"{vehicles} vehicles of capacity {capacity:g} cannot carry a total demand of "
+                         f"{demands[stops].sum():g}")
+    if not len(stops):
+        return Solution([], [], [], unreachable.tolist())
+
+    # Work on a matrix with the depot at 0 and the reachable stops at 1..m
+    index = np.concatenate([[depot], stops])
+    problem = {"d": distance[np.ix_(index, index)], "demand": np.concatenate([[0.0], demands[stops]]),
+               "capacity": capacity, "vehicles": vehicles}
+    deadline = time.time() + time_budget
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers <= 1 or starts <= 1:
+        _problem.update(problem)
+        results = [_solve_start(start, seed, deadline) for start in range(starts)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, starts), initializer=_init_worker,
+                                 initargs=(problem,)) as pool:
+            results = list(pool.map(_solve_start, range(starts), [seed] * starts, [deadline] * starts))
+
+    _, routes = min(results, key=lambda result: result[0])
+    d, demand = problem["d"], problem["demand"]
+    return Solution([index[route].tolist() for route in routes], [route_cost(d, route) for route in routes],
+                    [float(demand[route].sum()) for route in routes], unreachable.tolist())